@@ -0,0 +1,95 @@
+"""SSE 分片编码基准测试
+
+对比原先每个分片构造完整字典并 json.dumps 的做法（create_chunk + f-string）
+与预序列化编码器 SSEChunkEncoder 的耗时，并校验两者输出逐字节一致。
+
+用法：
+    python benchmarks/bench_sse_encoder.py
+    python benchmarks/bench_sse_encoder.py --chunks 50000 --text-length 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.sse import SSEChunkEncoder
+
+
+def create_chunk(id: str, created: int, model: str, delta: dict, finish_reason: Union[str, None]) -> str:
+    """原实现：每个分片都序列化整个信封"""
+    chunk = {
+        "id": id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "delta": delta,
+            "logprobs": None,
+            "finish_reason": finish_reason
+        }],
+        "system_fingerprint": None
+    }
+    return json.dumps(chunk)
+
+
+def run_create_chunk(chat_id: str, created: int, model: str, texts: list) -> int:
+    total = 0
+    for text in texts:
+        chunk = create_chunk(chat_id, created, model, {"content": text}, None)
+        total += len(f"data: {chunk}\n\n".encode())
+    return total
+
+
+def run_encoder(chat_id: str, created: int, model: str, texts: list) -> int:
+    encoder = SSEChunkEncoder(chat_id, created, model)
+    total = 0
+    for text in texts:
+        total += len(encoder.content(text))
+    return total
+
+
+def verify(chat_id: str, created: int, model: str) -> None:
+    encoder = SSEChunkEncoder(chat_id, created, model)
+    samples = ["hello", "中文\"引号\"\n换行", "\\", "emoji😀", ""]
+    for text in samples:
+        for field, encoded in (("content", encoder.content(text)), ("reasoning_content", encoder.reasoning(text))):
+            expected = f"data: {create_chunk(chat_id, created, model, {field: text}, None)}\n\n".encode()
+            assert encoded == expected, (encoded, expected)
+    assert encoder.role("assistant") == f"data: {create_chunk(chat_id, created, model, {'role': 'assistant'}, None)}\n\n".encode()
+    assert encoder.finish("stop") == f"data: {create_chunk(chat_id, created, model, {}, 'stop')}\n\n".encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000, help="每轮编码的分片数量")
+    parser.add_argument("--text-length", type=int, default=4, help="每个分片的文本长度（字符）")
+    parser.add_argument("--rounds", type=int, default=10, help="重复轮数")
+    args = parser.parse_args()
+
+    chat_id = f"chatcmpl-{uuid.uuid4()}"
+    created = int(time.time())
+    model = "gemini-2.5-pro"
+    texts = [("字a\"" * args.text_length)[:args.text_length] for _ in range(args.chunks)]
+
+    verify(chat_id, created, model)
+    print(f"分片数: {args.chunks}, 文本长度: {args.text_length}, 轮数: {args.rounds}（输出已校验一致）")
+
+    results = {}
+    for name, func in (("create_chunk", run_create_chunk), ("encoder", run_encoder)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            func(chat_id, created, model, texts)
+        elapsed = (time.perf_counter() - start) / args.rounds
+        results[name] = elapsed
+        print(f"{name:<14} {elapsed * 1000:9.3f} ms/轮  {elapsed / args.chunks * 1e6:7.3f} µs/分片")
+    print(f"加速比: {results['create_chunk'] / results['encoder']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""widgetStreamAssist 流式解析基准测试
+
+对比逐行解析器（parse_json_array_stream）与字节块增量解析器
+（parse_json_array_bytes）在相同负载下的耗时。
+
+用法：
+    python benchmarks/bench_streaming_parser.py
+    python benchmarks/bench_streaming_parser.py --payload recorded.json --chunk-size 1024
+
+--payload 指定一份录制的上游原始响应体（包含 ")]}'" 前缀的 JSON 数组）；
+未指定时使用与 widgetStreamAssist 结构一致的合成负载。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.streaming_parser import parse_json_array_bytes, parse_json_array_stream
+
+
+def build_synthetic_payload(replies: int) -> bytes:
+    """构造与 widgetStreamAssist 相同结构的响应体（每个对象携带一段增量文本）"""
+    objects = []
+    for i in range(replies):
+        objects.append({
+            "streamAssistResponse": {
+                "answer": {
+                    "replies": [{
+                        "groundedContent": {
+                            "content": {
+                                "text": f"第 {i} 段输出：The quick brown fox \"jumps\" over the lazy dog.\\n",
+                                "thought": i % 5 == 0,
+                            }
+                        }
+                    }],
+                    "state": "IN_PROGRESS",
+                },
+                "sessionInfo": {"session": "collections/default_collection/engines/agentspace-engine/sessions/1234567890"},
+            }
+        })
+    return (")]}'\n" + json.dumps(objects, ensure_ascii=False, indent=2)).encode("utf-8")
+
+
+def split_chunks(payload: bytes, chunk_size: int) -> list:
+    return [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+
+
+def run_line_parser(payload: bytes, chunk_size: int) -> int:
+    # 模拟 aiter_lines：先按块解码再切行
+    text = b"".join(split_chunks(payload, chunk_size)).decode("utf-8")
+    return sum(1 for _ in parse_json_array_stream(text.splitlines()))
+
+
+def run_bytes_parser(payload: bytes, chunk_size: int) -> int:
+    return sum(1 for _ in parse_json_array_bytes(split_chunks(payload, chunk_size)))
+
+
+def bench(name: str, func, payload: bytes, chunk_size: int, rounds: int) -> float:
+    count = func(payload, chunk_size)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(payload, chunk_size)
+    elapsed = (time.perf_counter() - start) / rounds
+    mb_per_s = len(payload) / elapsed / 1024 / 1024
+    print(f"{name:<14} {elapsed * 1000:9.3f} ms/轮  {mb_per_s:8.2f} MB/s  对象数={count}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload", help="录制的 widgetStreamAssist 原始响应体文件")
+    parser.add_argument("--replies", type=int, default=2000, help="合成负载中的对象数量")
+    parser.add_argument("--chunk-size", type=int, default=4096, help="模拟网络分块大小（字节）")
+    parser.add_argument("--rounds", type=int, default=20, help="每个解析器的重复轮数")
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            payload = f.read()
+    else:
+        payload = build_synthetic_payload(args.replies)
+
+    print(f"负载大小: {len(payload) / 1024:.1f} KB, 分块: {args.chunk_size} 字节, 轮数: {args.rounds}")
+    line_time = bench("line-parser", run_line_parser, payload, args.chunk_size, args.rounds)
+    bytes_time = bench("bytes-parser", run_bytes_parser, payload, args.chunk_size, args.rounds)
+    print(f"加速比: {line_time / bytes_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 负责账户配置、多账户协调和会话缓存管理
 """
 import asyncio
+import heapq
 import json
 import logging
 import os
@@ -11,12 +12,16 @@ import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, TYPE_CHECKING
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
 
 from fastapi import HTTPException
 
 # 导入存储层（支持数据库）
 from core import storage
+from core.circuit_breaker import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker
+from core.cooldown import DEFAULT_RATE_LIMIT_BASE_COOLDOWN_SECONDS, AdaptiveCooldown
+from core.session_cache import ConversationLocks, SessionCache
 
 if TYPE_CHECKING:
     from core.jwt import JWTManager
@@ -38,12 +43,23 @@ QUOTA_TYPES = {
     "videos": "视频"
 }
 
+# 会话缓存最大条目数
+SESSION_CACHE_MAX_SIZE = 1000
+# 凭证字段：变化时需作废账户的 JWT 缓存
+CREDENTIAL_FIELDS = ("secure_c_ses", "host_c_oses", "csesidx", "config_id")
+
+# 冷却等待的唤醒余量（should_retry 要求冷却时间严格超过设定值）
+COOLDOWN_WAKE_SLACK_SECONDS = 0.05
+
 # 配置文件路径 - 自动检测环境
 if os.path.exists("/data"):
     ACCOUNTS_FILE = "/data/accounts.json"  # HF Pro 持久化
 else:
     ACCOUNTS_FILE = "data/accounts.json"  # 本地存储（统一到 data 目录）
 
+# 本进程最近一次写入账户文件后的 mtime（文件监听据此跳过自己的写入）
+_own_accounts_file_mtime: Optional[int] = None
+
 
 @dataclass
 class AccountConfig:
@@ -68,24 +84,18 @@ class AccountConfig:
     mail_domain: Optional[str] = None
     mail_api_key: Optional[str] = None
 
-    def get_remaining_hours(self) -> Optional[float]:
-        """计算账户剩余小时数"""
+    def expires_at_timestamp(self) -> Optional[float]:
+        """过期时间戳（未设置或格式错误返回 None）"""
         if not self.expires_at:
             return None
-        try:
-            # 解析过期时间（假设为北京时间）
-            beijing_tz = timezone(timedelta(hours=8))
-            expire_time = datetime.strptime(self.expires_at, "%Y-%m-%d %H:%M:%S")
-            expire_time = expire_time.replace(tzinfo=beijing_tz)
+        return _parse_expires_at(self.expires_at)
 
-            # 当前时间（北京时间）
-            now = datetime.now(beijing_tz)
-
-            # 计算剩余时间
-            remaining = (expire_time - now).total_seconds() / 3600
-            return remaining
-        except Exception:
+    def get_remaining_hours(self) -> Optional[float]:
+        """计算账户剩余小时数"""
+        expires_ts = self.expires_at_timestamp()
+        if expires_ts is None:
             return None
+        return (expires_ts - time.time()) / 3600
 
     def is_expired(self) -> bool:
         """检查账户是否已过期"""
@@ -95,6 +105,17 @@ class AccountConfig:
         return remaining <= 0
 
 
+@lru_cache(maxsize=4096)
+def _parse_expires_at(expires_at: str) -> Optional[float]:
+    """解析过期时间（假设为北京时间）为时间戳，结果缓存，避免每次选择账户都执行 strptime"""
+    try:
+        beijing_tz = timezone(timedelta(hours=8))
+        expire_time = datetime.strptime(expires_at, "%Y-%m-%d %H:%M:%S")
+        return expire_time.replace(tzinfo=beijing_tz).timestamp()
+    except Exception:
+        return None
+
+
 def format_account_expiration(remaining_hours: Optional[float]) -> tuple:
     """
     格式化账户过期时间显示（基于12小时过期周期）
@@ -123,39 +144,162 @@ class AccountManager:
         self.http_client = http_client
         self.user_agent = user_agent
         self.account_failure_threshold = account_failure_threshold
-        self.rate_limit_cooldown_seconds = rate_limit_cooldown_seconds
+        self.rate_limit_cooldown_seconds = rate_limit_cooldown_seconds  # 冷却时长上限（401/403 固定使用）
+        self.rate_limit_base_cooldown_seconds = DEFAULT_RATE_LIMIT_BASE_COOLDOWN_SECONDS  # 429 初始冷却时长
         self.jwt_manager: Optional['JWTManager'] = None  # 延迟初始化
-        self.is_available = True
+        # 可用状态变化回调（由 MultiAccountManager 注册，用于维护可用账户索引）
+        self.on_state_change: Optional[Callable[["AccountManager"], None]] = None
+        self._is_available = True
         self.last_error_time = 0.0
         self.last_cooldown_time = 0.0  # 冷却时间戳（401/403/429错误）
+        self.cooldown_duration = float(rate_limit_cooldown_seconds)  # 本次冷却时长
         self.quota_cooldowns: Dict[str, float] = {}  # 按配额类型的冷却时间戳 {"text": timestamp, "images": timestamp, "videos": timestamp}
+        self.quota_cooldown_durations: Dict[str, float] = {}  # 按配额类型的本次冷却时长
+        self.rate_limit_backoff: Dict[Optional[str], AdaptiveCooldown] = {}  # 429 自适应冷却（None 为账户整体）
         self.error_count = 0
         self.conversation_count = 0  # 累计对话次数（用于统计展示）
         self.session_usage_count = 0  # 本次启动后使用次数（用于均衡轮询）
+        self.breaker = CircuitBreaker()  # 普通错误熔断器（替代达到阈值后的永久禁用）
 
-    def handle_non_http_error(self, error_context: str = "", request_id: str = "") -> None:
+    @property
+    def is_available(self) -> bool:
+        return self._is_available
+
+    @is_available.setter
+    def is_available(self, value: bool) -> None:
+        if value == self._is_available:
+            return
+        self._is_available = value
+        self._state_changed()
+
+    def _state_changed(self) -> None:
+        if self.on_state_change is not None:
+            self.on_state_change(self)
+
+    def _mark_unavailable(self) -> None:
+        """标记不可用（已不可用时同样通知，以便按新的冷却/熔断时间重新安排检查）"""
+        if self._is_available:
+            self.is_available = False
+        else:
+            self._state_changed()
+
+    def record_success(self, quota_type: Optional[str] = None) -> None:
+        """请求成功：关闭熔断器、清零失败计数，并结束账户整体与该配额的连续限流
+
+        冷却窗口内的探测请求成功时提前结束对应的 429 冷却。
         """
-        统一处理非HTTP错误（网络错误、解析错误等）
+        now = time.time()
+        self.breaker.record_success(now)
+        reinstated = []
+        for key in (None, quota_type) if quota_type else (None,):
+            backoff = self.rate_limit_backoff.get(key)
+            if backoff is None:
+                continue
+            started_at = self.last_cooldown_time if key is None else self.quota_cooldowns.get(key)
+            if not backoff.on_success(now) or not started_at or started_at != backoff.limited_at:
+                continue
+            if key is None:
+                until = self.last_cooldown_time + self.cooldown_duration
+                self.last_cooldown_time = 0.0
+            else:
+                until = started_at + self.quota_cooldown_durations.pop(key, self.rate_limit_cooldown_seconds)
+                del self.quota_cooldowns[key]
+            if now < until:
+                reinstated.append(QUOTA_TYPES.get(key, "账户"))
+        self.error_count = 0
+        if reinstated:
+            logger.info(
+                f"[ACCOUNT] [{self.config.account_id}] 探测请求成功，"
+                f"{'、'.join(reinstated)}限流冷却提前结束"
+            )
+            self._state_changed()
+        self.is_available = True
 
-        Args:
-            error_context: 错误上下文（如"JWT获取"、"聊天请求"）
-            request_id: 请求ID（用于日志）
+    def _next_rate_limit_cooldown(self, quota_type: Optional[str], now: float) -> float:
+        """记录一次 429 并返回本次冷却时长（连续限流时指数增长）"""
+        backoff = self.rate_limit_backoff.get(quota_type)
+        if backoff is None:
+            backoff = self.rate_limit_backoff[quota_type] = AdaptiveCooldown()
+        return backoff.on_rate_limited(now, self.rate_limit_base_cooldown_seconds, self.rate_limit_cooldown_seconds)
+
+    def _rate_limit_check_at(self, key: Optional[str], started_at: float, until: float, now: float) -> float:
+        """冷却窗口（started_at ~ until）内下一次可放行的时间
+
+        只有当前冷却正是该维度最近一次 429 引起的才提前探测（401/403 冷却等到窗口结束）。
         """
-        req_tag = f"[req_{request_id}] " if request_id else ""
+        backoff = self.rate_limit_backoff.get(key)
+        if backoff is None or backoff.limited_at != started_at:
+            return until
+        return backoff.next_check_at(until, now)
+
+    def _end_probes(self) -> None:
+        """请求以错误结束：释放限流冷却中的探测名额（429 会重新开始冷却）"""
+        for backoff in self.rate_limit_backoff.values():
+            backoff.end_probe()
+
+    def begin_trial(self, quota_type: Optional[str] = None) -> None:
+        """被选中的请求占用试探名额（试探结束前不再被选择）
+
+        - 熔断器半开时的试探请求
+        - 429 冷却窗口内（账户整体或 quota_type 配额）的提前探测请求
+        """
+        now = time.time()
+        changed = False
+        if self.breaker.state == BREAKER_HALF_OPEN:
+            self.breaker.begin_trial(now)
+            changed = True
+        windows = []
+        if not self.is_available and self.last_cooldown_time > 0:
+            windows.append((None, self.last_cooldown_time, self.last_cooldown_time + self.cooldown_duration))
+        if quota_type and self.quota_cooldowns.get(quota_type):
+            started_at = self.quota_cooldowns[quota_type]
+            duration = self.quota_cooldown_durations.get(quota_type, self.rate_limit_cooldown_seconds)
+            windows.append((quota_type, started_at, started_at + duration))
+        for key, started_at, until in windows:
+            if now < until and self._rate_limit_check_at(key, started_at, until, now) <= now:
+                self.rate_limit_backoff[key].begin_probe(now)
+                changed = True
+                logger.info(
+                    f"[ACCOUNT] [{self.config.account_id}] {QUOTA_TYPES.get(key, '账户')}限流冷却中，"
+                    f"放行提前探测请求（剩余{int(until - now)}秒）"
+                )
+        if changed:
+            self._state_changed()
+
+    def _record_error(self, description: str, req_tag: str, detail: str = "") -> None:
+        """普通错误计数，达到阈值或半开试探失败时打开熔断器"""
         self.last_error_time = time.time()
         self.error_count += 1
-        if self.error_count >= self.account_failure_threshold:
-            self.is_available = False
+        if self.breaker.state == BREAKER_HALF_OPEN or self.error_count >= self.account_failure_threshold:
+            if self.breaker.state == BREAKER_HALF_OPEN:
+                reason = f"{description}试探失败"
+            else:
+                reason = f"{description}连续失败{self.error_count}次"
+            window = self.breaker.trip(reason)
+            self.error_count = 0
+            self._mark_unavailable()
             logger.error(
                 f"[ACCOUNT] [{self.config.account_id}] {req_tag}"
-                f"{error_context}连续失败{self.error_count}次，账户已永久禁用"
+                f"{reason}，账户熔断{int(window)}秒（第{self.breaker.trips}次）{detail}"
             )
         else:
             logger.warning(
                 f"[ACCOUNT] [{self.config.account_id}] {req_tag}"
-                f"{error_context}失败({self.error_count}/{self.account_failure_threshold})"
+                f"{description}({self.error_count}/{self.account_failure_threshold}){detail}"
             )
 
+    def handle_non_http_error(self, error_context: str = "", request_id: str = "") -> None:
+        """
+        统一处理非HTTP错误（网络错误、解析错误等）
+
+        Args:
+            error_context: 错误上下文（如"JWT获取"、"聊天请求"）
+            request_id: 请求ID（用于日志）
+        """
+        req_tag = f"[req_{request_id}] " if request_id else ""
+        self._end_probes()
+        self._record_error(f"{error_context}失败", req_tag)
+
     def handle_http_error(self, status_code: int, error_detail: str = "", request_id: str = "", quota_type: Optional[str] = None) -> None:
         """
         统一处理HTTP错误（参考 business-gemini-2api-main 的 raise_for_account_response）
@@ -170,13 +314,20 @@ class AccountManager:
             - 400: 参数错误，不计入失败（客户端问题）
             - 429 + quota_type: 按配额类型冷却（对话/绘图/视频独立冷却）
             - 429 无quota_type: 全局冷却（整个账户不可用）
+            - 429 冷却时长自适应：从初始时长开始，连续限流时翻倍，上限为 rate_limit_cooldown_seconds；
+              冷却窗口后段放行一个探测请求，成功即提前恢复（见 core.cooldown）
             - 401/403: 全局冷却（认证错误）
-            - 其他HTTP错误: 计入error_count，达到阈值后永久禁用
+            - 其他HTTP错误: 计入error_count，达到阈值后打开熔断器（半开试探失败时立即重新打开）
         """
         req_tag = f"[req_{request_id}] " if request_id else ""
+        detail = f"{': ' + error_detail[:100] if error_detail else ''}"
+        self._end_probes()
 
         # 400参数错误：不计入失败（客户端问题）
         if status_code == 400:
+            if self.breaker.trial_started_at:
+                self.breaker.end_trial()
+                self._state_changed()
             logger.warning(
                 f"[ACCOUNT] [{self.config.account_id}] {req_tag}"
                 f"HTTP 400参数错误（不计入失败次数）{': ' + error_detail[:100] if error_detail else ''}"
@@ -185,29 +336,39 @@ class AccountManager:
 
         # 429限流错误：按配额类型冷却或全局冷却
         if status_code == 429:
+            self.breaker.end_trial()
+            now = time.time()
             if quota_type and quota_type in QUOTA_TYPES:
                 # 按配额类型冷却（不影响账户整体可用性）
-                self.quota_cooldowns[quota_type] = time.time()
+                duration = self._next_rate_limit_cooldown(quota_type, now)
+                self.quota_cooldowns[quota_type] = now
+                self.quota_cooldown_durations[quota_type] = duration
+                self._state_changed()
                 logger.warning(
                     f"[ACCOUNT] [{self.config.account_id}] {req_tag}"
-                    f"{QUOTA_TYPES[quota_type]}配额限流，将在{self.rate_limit_cooldown_seconds}秒后自动恢复"
+                    f"{QUOTA_TYPES[quota_type]}配额限流，将在{int(duration)}秒后自动恢复"
+                    f"（连续第{self.rate_limit_backoff[quota_type].strikes}次）"
                     f"{': ' + error_detail[:100] if error_detail else ''}"
                 )
             else:
                 # 全局冷却（未指定配额类型）
-                self.last_cooldown_time = time.time()
-                self.is_available = False
+                self.cooldown_duration = self._next_rate_limit_cooldown(None, now)
+                self.last_cooldown_time = now
+                self._mark_unavailable()
                 logger.warning(
                     f"[ACCOUNT] [{self.config.account_id}] {req_tag}"
-                    f"遇到429限流，账户将休息{self.rate_limit_cooldown_seconds}秒后自动恢复"
+                    f"遇到429限流，账户将休息{int(self.cooldown_duration)}秒后自动恢复"
+                    f"（连续第{self.rate_limit_backoff[None].strikes}次）"
                     f"{': ' + error_detail[:100] if error_detail else ''}"
                 )
             return
 
         # 401/403认证错误：全局冷却
         if status_code in (401, 403):
+            self.breaker.end_trial()
+            self.cooldown_duration = float(self.rate_limit_cooldown_seconds)
             self.last_cooldown_time = time.time()
-            self.is_available = False
+            self._mark_unavailable()
             error_type = HTTP_ERROR_NAMES.get(status_code, "HTTP错误")
             logger.warning(
                 f"[ACCOUNT] [{self.config.account_id}] {req_tag}"
@@ -217,24 +378,10 @@ class AccountManager:
             return
 
         # 其他HTTP错误：计入error_count
-        self.last_error_time = time.time()
-        self.error_count += 1
-        if self.error_count >= self.account_failure_threshold:
-            self.is_available = False
-            logger.error(
-                f"[ACCOUNT] [{self.config.account_id}] {req_tag}"
-                f"HTTP {status_code}错误连续失败{self.error_count}次，账户已永久禁用"
-                f"{': ' + error_detail[:100] if error_detail else ''}"
-            )
-        else:
-            logger.warning(
-                f"[ACCOUNT] [{self.config.account_id}] {req_tag}"
-                f"HTTP {status_code}错误({self.error_count}/{self.account_failure_threshold})"
-                f"{': ' + error_detail[:100] if error_detail else ''}"
-            )
+        self._record_error(f"HTTP {status_code}错误", req_tag, detail)
 
-    async def get_jwt(self, request_id: str = "") -> str:
-        """获取 JWT token (带错误处理)"""
+    async def get_jwt(self, request_id: str = "", touch: bool = True) -> str:
+        """获取 JWT token (带错误处理)，touch=False 表示后台调用，不计入最近使用时间"""
         # 检查账户是否过期
         if self.config.is_expired():
             self.is_available = False
@@ -246,9 +393,10 @@ class AccountManager:
                 # 延迟初始化 JWTManager (避免循环依赖)
                 from core.jwt import JWTManager
                 self.jwt_manager = JWTManager(self.config, self.http_client, self.user_agent)
-            jwt = await self.jwt_manager.get(request_id)
-            self.is_available = True
-            self.error_count = 0
+            jwt = await self.jwt_manager.get(request_id, touch=touch)
+            if self.breaker.state == BREAKER_CLOSED:  # 熔断中的账户只由完整请求的成功结果恢复
+                self.is_available = True
+                self.error_count = 0
             return jwt
         except Exception as e:
             # 使用统一的错误处理入口
@@ -258,8 +406,13 @@ class AccountManager:
                 self.handle_non_http_error("JWT获取", request_id)
             raise
 
+    def invalidate_jwt(self) -> None:
+        """作废缓存的 JWT 与签名密钥（上游返回 401 时调用）"""
+        if self.jwt_manager is not None:
+            self.jwt_manager.invalidate()
+
     def should_retry(self) -> bool:
-        """检查账户是否可重试（冷却期后自动恢复，普通错误永久禁用）"""
+        """检查账户是否可重试（冷却期后自动恢复，熔断的账户在半开时放行一个试探请求）"""
         if self.is_available:
             return True
 
@@ -267,16 +420,53 @@ class AccountManager:
 
         # 检查冷却期（401/403/429错误冷却期后自动恢复）
         if self.last_cooldown_time > 0:
-            if current_time - self.last_cooldown_time > self.rate_limit_cooldown_seconds:
+            until = self.last_cooldown_time + self.cooldown_duration
+            if current_time <= until:
+                # 仍在冷却期：429 冷却走过提前探测点后放行一个探测请求（熔断中的账户仍由熔断器决定）
+                return (
+                    self.breaker.state == BREAKER_CLOSED
+                    and self._rate_limit_check_at(None, self.last_cooldown_time, until, current_time) <= current_time
+                )
+            self.last_cooldown_time = 0.0
+            if self.breaker.state == BREAKER_CLOSED:
                 # 冷却期已过，自动恢复账户可用性
                 self.is_available = True
-                self.last_cooldown_time = 0.0
                 logger.info(f"[ACCOUNT] [{self.config.account_id}] 冷却期已过，账户已自动恢复")
                 return True
-            return False  # 仍在冷却期
 
-        # 普通错误永久禁用
-        return False
+        # 熔断器：打开窗口结束后转为半开（未熔断的其他不可用状态如已过期不会自动恢复）
+        return self.breaker.state != BREAKER_CLOSED and self.breaker.allows_request(current_time)
+
+    def quota_cooldown_until(self, quota_type: str, now: Optional[float] = None) -> Optional[float]:
+        """指定配额下一次可放行的时间（冷却结束或提前探测点，时间戳）；该配额未在冷却或此刻可探测时返回 None"""
+        cooldown_time = self.quota_cooldowns.get(quota_type)
+        if not cooldown_time:
+            return None
+        now = time.time() if now is None else now
+        until = cooldown_time + self.quota_cooldown_durations.get(quota_type, self.rate_limit_cooldown_seconds)
+        if until <= now:
+            return None
+        check_at = self._rate_limit_check_at(quota_type, cooldown_time, until, now)
+        return check_at if check_at > now else None
+
+    def cooldown_expires_at(self, quota_type: Optional[str] = None) -> Optional[float]:
+        """下一次可放行的时间（冷却结束或提前探测点，时间戳），指定 quota_type 时同时考虑该配额与熔断窗口；
+        未在冷却或不会自动恢复时返回 None"""
+        expiries = []
+        if not self.is_available:
+            breaker_at = self.breaker.next_check_at()
+            if self.last_cooldown_time <= 0 and breaker_at is None and self.breaker.state == BREAKER_CLOSED:
+                return None  # 未熔断的不可用状态（如已过期），不会自动恢复
+            if self.last_cooldown_time > 0:
+                until = self.last_cooldown_time + self.cooldown_duration
+                expiries.append(self._rate_limit_check_at(None, self.last_cooldown_time, until, time.time()))
+            if breaker_at is not None:
+                expiries.append(breaker_at)
+        if quota_type:
+            quota_until = self.quota_cooldown_until(quota_type)
+            if quota_until is not None:
+                expiries.append(quota_until)
+        return max(expiries) if expiries else None
 
     def get_cooldown_info(self) -> tuple[int, str | None]:
         """
@@ -291,7 +481,7 @@ class AccountManager:
 
         # 优先检查冷却期（无论账户是否可用）
         if self.last_cooldown_time > 0:
-            remaining = self.rate_limit_cooldown_seconds - (current_time - self.last_cooldown_time)
+            remaining = self.cooldown_duration - (current_time - self.last_cooldown_time)
             if remaining > 0:
                 return (int(remaining), "限流冷却")
             # 冷却期已过
@@ -300,7 +490,13 @@ class AccountManager:
         if self.is_available:
             return (0, None)
 
-        # 普通错误永久禁用
+        # 熔断中：打开窗口剩余时间 / 半开试探中
+        if self.breaker.state == BREAKER_OPEN:
+            return (max(int(self.breaker.open_until - current_time), 0), "错误熔断")
+        if self.breaker.state == BREAKER_HALF_OPEN:
+            return (0, "熔断试探")
+
+        # 其他不可用状态（如已过期）
         return (-1, "错误禁用")
 
     def get_quota_status(self) -> Dict[str, any]:
@@ -340,10 +536,11 @@ class AccountManager:
         for quota_type in QUOTA_TYPES:
             if quota_type in self.quota_cooldowns:
                 cooldown_time = self.quota_cooldowns[quota_type]
-                # 检查冷却时间是否已过（使用统一的 rate_limit_cooldown_seconds）
+                # 检查冷却时间是否已过（使用该配额本次的自适应冷却时长）
                 elapsed = current_time - cooldown_time
-                if elapsed < self.rate_limit_cooldown_seconds:
-                    remaining = int(self.rate_limit_cooldown_seconds - elapsed)
+                duration = self.quota_cooldown_durations.get(quota_type, self.rate_limit_cooldown_seconds)
+                if elapsed < duration:
+                    remaining = int(duration - elapsed)
                     quotas[quota_type] = {
                         "available": False,
                         "remaining_seconds": remaining
@@ -369,94 +566,316 @@ class AccountManager:
         }
 
 
+class AvailabilityPool:
+    """可用账户ID集合：O(1) 增删（交换删除），并支持按下标轮询"""
+
+    __slots__ = ("ids", "_pos")
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, account_id: str) -> bool:
+        return account_id in self._pos
+
+    def add(self, account_id: str) -> None:
+        if account_id not in self._pos:
+            self._pos[account_id] = len(self.ids)
+            self.ids.append(account_id)
+
+    def discard(self, account_id: str) -> None:
+        pos = self._pos.pop(account_id, None)
+        if pos is None:
+            return
+        last_id = self.ids.pop()
+        if last_id != account_id:
+            self.ids[pos] = last_id
+            self._pos[last_id] = pos
+
+
+class AccountBusyError(HTTPException):
+    """并发准入失败（等待队列已满或排队超时），不应按账户失败处理或重试"""
+
+
+class ConcurrencyLimiter:
+    """并发准入控制（单账户并发上限 + 全局并发上限 + 有界等待队列）
+
+    计数按 account_id 记录，账户重载后沿用同一个实例，不会丢失在途请求数。
+    上限为 0 表示不限制。
+    """
+    def __init__(
+        self,
+        max_per_account: int = 0,
+        max_total: int = 0,
+        max_waiters: int = 0,
+        wait_timeout_seconds: float = 0,
+    ):
+        self.max_per_account = max_per_account
+        self.max_total = max_total
+        self.max_waiters = max_waiters
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.in_flight: Dict[str, int] = {}
+        self.total_in_flight = 0
+        self.waiters = 0  # 并发排队中的请求数（受 max_waiters 限制）
+        self.cooldown_waiters = 0  # 冷却等待中的请求数（只受 cooldown_wait_seconds 时限约束）
+        self.rejected = 0  # 队列已满被拒绝的请求数
+        self.timed_out = 0  # 排队超时的请求数
+        self.cooldown_waits = 0  # 因账户全部冷却而等待的请求数
+        self._released = asyncio.Event()
+
+    def configure(self, max_per_account: int, max_total: int, max_waiters: int, wait_timeout_seconds: float) -> None:
+        self.max_per_account = max_per_account
+        self.max_total = max_total
+        self.max_waiters = max_waiters
+        self.wait_timeout_seconds = wait_timeout_seconds
+        self.notify()  # 上限放宽后唤醒等待者重新检查
+
+    def has_total_capacity(self) -> bool:
+        return self.max_total <= 0 or self.total_in_flight < self.max_total
+
+    def has_capacity(self, account_id: str) -> bool:
+        return self.max_per_account <= 0 or self.in_flight.get(account_id, 0) < self.max_per_account
+
+    def acquire(self, account_id: str) -> None:
+        self.in_flight[account_id] = self.in_flight.get(account_id, 0) + 1
+        self.total_in_flight += 1
+
+    def release(self, account_id: str) -> None:
+        count = self.in_flight.get(account_id, 0)
+        if count <= 0:
+            return
+        if count == 1:
+            del self.in_flight[account_id]
+        else:
+            self.in_flight[account_id] = count - 1
+        self.total_in_flight -= 1
+        self.notify()
+
+    def notify(self) -> None:
+        """唤醒所有等待者重新检查（槽位释放、上限变化或账户恢复可用时调用）"""
+        released, self._released = self._released, asyncio.Event()
+        released.set()
+
+    async def wait_for_release(self, timeout: float) -> None:
+        """等待任意槽位释放（或超时）"""
+        try:
+            await asyncio.wait_for(self._released.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def get_stats(self) -> dict:
+        return {
+            "max_per_account": self.max_per_account,
+            "max_total": self.max_total,
+            "max_waiters": self.max_waiters,
+            "wait_timeout_seconds": self.wait_timeout_seconds,
+            "total_in_flight": self.total_in_flight,
+            "waiters": self.waiters,
+            "cooldown_waiters": self.cooldown_waiters,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "cooldown_waits": self.cooldown_waits,
+        }
+
+
+# 账户调度策略
+SCHEDULER_ROUND_ROBIN = "round_robin"  # 轮询（默认）
+SCHEDULER_LEAST_OUTSTANDING = "least_outstanding"  # 在途请求最少
+SCHEDULER_EWMA_TTFT = "ewma_ttft"  # 首字延迟EWMA ×（在途请求 + 1）最小
+SCHEDULER_POWER_OF_TWO = "power_of_two"  # 随机抽两个，取在途请求较少者
+SCHEDULER_STRATEGIES = (
+    SCHEDULER_ROUND_ROBIN,
+    SCHEDULER_LEAST_OUTSTANDING,
+    SCHEDULER_EWMA_TTFT,
+    SCHEDULER_POWER_OF_TWO,
+)
+
+# 首字延迟EWMA平滑系数（新样本权重）
+DEFAULT_TTFT_EWMA_ALPHA = 0.3
+# 两选一策略随机抽样的最大次数（抽不到合格账户时退回轮询扫描）
+POWER_OF_TWO_MAX_PROBES = 8
+
+
+class AccountScheduler:
+    """账户调度器：按策略从可用池中挑选账户
+
+    在途请求数取自 ConcurrencyLimiter.in_flight，首字延迟由聊天路径通过 record_ttft 上报。
+    实例在账户重载后沿用（与 limiter 相同），统计不会丢失。
+    """
+
+    def __init__(self, strategy: str = SCHEDULER_ROUND_ROBIN, ewma_alpha: float = DEFAULT_TTFT_EWMA_ALPHA) -> None:
+        self.strategy = strategy
+        self.ewma_alpha = ewma_alpha
+        self.ttft_ewma: Dict[str, float] = {}  # {account_id: 首字延迟EWMA（秒）}
+        self._ttft_sum = 0.0  # ttft_ewma 之和，用于给无样本账户估计默认值
+        self._counter_lock = threading.Lock()  # 轮询计数器锁
+        self._request_counter = 0  # 请求计数器
+        self._last_account_count = 0  # 可用账户数量
+
+    def configure(self, strategy: str) -> None:
+        if strategy not in SCHEDULER_STRATEGIES:
+            logger.warning(f"[SCHEDULER] 未知调度策略 {strategy}，使用 {SCHEDULER_ROUND_ROBIN}")
+            strategy = SCHEDULER_ROUND_ROBIN
+        if strategy != self.strategy:
+            logger.info(f"[SCHEDULER] 调度策略: {self.strategy} -> {strategy}")
+        self.strategy = strategy
+
+    def record_ttft(self, account_id: str, seconds: float) -> None:
+        """上报一次首字延迟"""
+        old = self.ttft_ewma.get(account_id)
+        new = seconds if old is None else self.ewma_alpha * seconds + (1 - self.ewma_alpha) * old
+        self.ttft_ewma[account_id] = new
+        self._ttft_sum += new - (old or 0.0)
+
+    def forget(self, account_ids: Iterable[str]) -> None:
+        """丢弃已删除账户的延迟统计"""
+        for account_id in account_ids:
+            old = self.ttft_ewma.pop(account_id, None)
+            if old is not None:
+                self._ttft_sum -= old
+
+    def pick(
+        self,
+        ids: List[str],
+        eligible: Callable[[str], bool],
+        in_flight: Dict[str, int],
+    ) -> Optional[str]:
+        """从 ids 中挑选一个满足 eligible 的账户，没有则返回 None"""
+        if not ids:
+            return None
+        if self.strategy == SCHEDULER_POWER_OF_TWO:
+            return self._pick_power_of_two(ids, eligible, in_flight)
+        if self.strategy == SCHEDULER_LEAST_OUTSTANDING:
+            return self._pick_min(ids, eligible, lambda account_id: in_flight.get(account_id, 0))
+        if self.strategy == SCHEDULER_EWMA_TTFT:
+            default_ttft = self._ttft_sum / len(self.ttft_ewma) if self.ttft_ewma else 1.0
+            return self._pick_min(
+                ids, eligible,
+                lambda account_id: self.ttft_ewma.get(account_id, default_ttft) * (in_flight.get(account_id, 0) + 1)
+            )
+        return self._pick_round_robin(ids, eligible)
+
+    def _next_start(self, total: int) -> int:
+        with self._counter_lock:
+            if total != self._last_account_count:
+                self._request_counter = random.randint(0, 999999)
+                self._last_account_count = total
+            start = self._request_counter % total
+            self._request_counter += 1
+        return start
+
+    def _pick_round_robin(self, ids: List[str], eligible: Callable[[str], bool]) -> Optional[str]:
+        # 起点不满足条件（已排除 / 并发已满）时顺延，通常第一个即命中
+        total = len(ids)
+        start = self._next_start(total)
+        for offset in range(total):
+            account_id = ids[(start + offset) % total]
+            if eligible(account_id):
+                return account_id
+        return None
+
+    def _pick_min(self, ids: List[str], eligible: Callable[[str], bool], score: Callable[[str], float]) -> Optional[str]:
+        # 从轮询起点开始扫描，分数相同时各账户轮流被选中
+        total = len(ids)
+        start = self._next_start(total)
+        best_id = None
+        best_score = 0.0
+        for offset in range(total):
+            account_id = ids[(start + offset) % total]
+            if not eligible(account_id):
+                continue
+            account_score = score(account_id)
+            if best_id is None or account_score < best_score:
+                best_id, best_score = account_id, account_score
+        return best_id
+
+    def _pick_power_of_two(
+        self,
+        ids: List[str],
+        eligible: Callable[[str], bool],
+        in_flight: Dict[str, int],
+    ) -> Optional[str]:
+        choices: List[str] = []
+        for _ in range(POWER_OF_TWO_MAX_PROBES):
+            account_id = ids[random.randrange(len(ids))]
+            if account_id not in choices and eligible(account_id):
+                choices.append(account_id)
+                if len(choices) == 2:
+                    break
+        if not choices:
+            return self._pick_round_robin(ids, eligible)
+        return min(
+            choices,
+            key=lambda account_id: (in_flight.get(account_id, 0), self.ttft_ewma.get(account_id, 0.0))
+        )
+
+    def get_stats(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "tracked_accounts": len(self.ttft_ewma),
+        }
+
+
 class MultiAccountManager:
     """多账户协调器"""
     def __init__(self, session_cache_ttl_seconds: int):
         self.accounts: Dict[str, AccountManager] = {}
         self.account_list: List[str] = []  # 账户ID列表 (用于轮询)
         self.current_index = 0
-        self._cache_lock = asyncio.Lock()  # 缓存操作专用锁
-        self._counter_lock = threading.Lock()  # 轮询计数器锁
-        self._request_counter = 0  # 请求计数器
-        self._last_account_count = 0  # 可用账户数量
-        # 全局会话缓存：{conv_key: {"account_id": str, "session_id": str, "updated_at": float}}
-        self.global_session_cache: Dict[str, dict] = {}
-        self.cache_max_size = 1000  # 最大缓存条目数
-        self.cache_ttl = session_cache_ttl_seconds  # 缓存过期时间（秒）
+        # 全局会话缓存：conv_key -> {"account_id": str, "session_id": str, "updated_at": float}
+        self.global_session_cache = SessionCache(SESSION_CACHE_MAX_SIZE, session_cache_ttl_seconds)
         # Session级别锁：防止同一对话的并发请求冲突
-        self._session_locks: Dict[str, asyncio.Lock] = {}
-        self._session_locks_lock = asyncio.Lock()  # 保护锁字典的锁
-        self._session_locks_max_size = 2000  # 最大锁数量
-
-    def _clean_expired_cache(self):
-        """清理过期的缓存条目"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, value in self.global_session_cache.items()
-            if current_time - value["updated_at"] > self.cache_ttl
-        ]
-        for key in expired_keys:
-            del self.global_session_cache[key]
-        if expired_keys:
-            logger.info(f"[CACHE] 清理 {len(expired_keys)} 个过期会话缓存")
-
-    def _ensure_cache_size(self):
-        """确保缓存不超过最大大小（LRU策略）"""
-        if len(self.global_session_cache) > self.cache_max_size:
-            # 按更新时间排序，删除最旧的20%
-            sorted_items = sorted(
-                self.global_session_cache.items(),
-                key=lambda x: x[1]["updated_at"]
-            )
-            remove_count = len(sorted_items) - int(self.cache_max_size * 0.8)
-            for key, _ in sorted_items[:remove_count]:
-                del self.global_session_cache[key]
-            logger.info(f"[CACHE] LRU清理 {remove_count} 个最旧会话缓存")
+        self.session_locks = ConversationLocks()
+        # 并发准入控制与账户调度器
+        self.limiter = ConcurrencyLimiter()
+        self.scheduler = AccountScheduler()
+        # 429 初始冷却时长（对所有账户生效，新增账户沿用）
+        self.rate_limit_base_cooldown_seconds = DEFAULT_RATE_LIMIT_BASE_COOLDOWN_SECONDS
+        # 可用账户索引：在启用/禁用/冷却/过期状态变化时增量维护，选择账户无需遍历
+        # None 为基础池（账户整体可用），其余按配额类型排除该配额冷却中的账户
+        self._pools: Dict[Optional[str], AvailabilityPool] = {None: AvailabilityPool()}
+        for quota_type in QUOTA_TYPES:
+            self._pools[quota_type] = AvailabilityPool()
+        # 定时器堆 [(检查时间, account_id)]：冷却结束时重新纳入，到达过期时间时移出
+        self._timers: List[Tuple[float, str]] = []
+        self._timer_due: Dict[str, float] = {}  # 每个账户当前有效的检查时间（堆中其余条目视为过期）
 
     async def start_background_cleanup(self):
         """启动后台缓存清理任务（每5分钟执行一次）"""
         try:
             while True:
                 await asyncio.sleep(300)  # 5分钟
-                async with self._cache_lock:
-                    self._clean_expired_cache()
-                    self._ensure_cache_size()
+                removed = self.global_session_cache.expire()
+                if removed:
+                    logger.info(f"[CACHE] 清理 {removed} 个过期会话缓存")
         except asyncio.CancelledError:
             logger.info("[CACHE] 后台清理任务已停止")
         except Exception as e:
             logger.error(f"[CACHE] 后台清理任务异常: {e}")
 
     async def set_session_cache(self, conv_key: str, account_id: str, session_id: str):
-        """线程安全地设置会话缓存"""
-        async with self._cache_lock:
-            self.global_session_cache[conv_key] = {
-                "account_id": account_id,
-                "session_id": session_id,
-                "updated_at": time.time()
-            }
-            # 检查缓存大小
-            self._ensure_cache_size()
+        """设置会话缓存（超出容量时淘汰最久未使用的条目）"""
+        self.global_session_cache.put(conv_key, account_id, session_id)
 
     async def update_session_time(self, conv_key: str):
-        """线程安全地更新会话时间戳"""
-        async with self._cache_lock:
-            if conv_key in self.global_session_cache:
-                self.global_session_cache[conv_key]["updated_at"] = time.time()
-
-    async def acquire_session_lock(self, conv_key: str) -> asyncio.Lock:
-        """获取指定对话的锁（用于防止同一对话的并发请求冲突）"""
-        async with self._session_locks_lock:
-            # 清理过多的锁（LRU策略：删除不在缓存中的锁）
-            if len(self._session_locks) > self._session_locks_max_size:
-                # 只保留当前缓存中存在的锁
-                valid_keys = set(self.global_session_cache.keys())
-                keys_to_remove = [k for k in self._session_locks if k not in valid_keys]
-                for k in keys_to_remove[:len(keys_to_remove)//2]:  # 删除一半无效锁
-                    del self._session_locks[k]
-
-            if conv_key not in self._session_locks:
-                self._session_locks[conv_key] = asyncio.Lock()
-            return self._session_locks[conv_key]
+        """更新会话时间戳"""
+        self.global_session_cache.touch(conv_key)
+
+    def session_lock(self, conv_key: str):
+        """获取指定对话的锁（用于防止同一对话的并发请求冲突）
+
+        用法：async with multi_account_mgr.session_lock(conv_key): ...
+        """
+        return self.session_locks.hold(conv_key)
+
+    def configure_rate_limit_cooldown(self, base_seconds: int) -> None:
+        """热更新 429 初始冷却时长（进行中的冷却保持原时长）"""
+        self.rate_limit_base_cooldown_seconds = base_seconds
+        for account_mgr in self.accounts.values():
+            account_mgr.rate_limit_base_cooldown_seconds = base_seconds
 
     def update_http_client(self, http_client):
         """更新所有账户使用的 http_client（用于代理变更后重建客户端）"""
@@ -468,15 +887,217 @@ class MultiAccountManager:
     def add_account(self, config: AccountConfig, http_client, user_agent: str, account_failure_threshold: int, rate_limit_cooldown_seconds: int, global_stats: dict):
         """添加账户"""
         manager = AccountManager(config, http_client, user_agent, account_failure_threshold, rate_limit_cooldown_seconds)
+        manager.rate_limit_base_cooldown_seconds = self.rate_limit_base_cooldown_seconds
         # 从统计数据加载对话次数
         if "account_conversations" in global_stats:
             manager.conversation_count = global_stats["account_conversations"].get(config.account_id, 0)
         self.accounts[config.account_id] = manager
         self.account_list.append(config.account_id)
+        manager.on_state_change = self._on_account_state_change
+        self.refresh_availability(config.account_id)
         logger.info(f"[MULTI] [ACCOUNT] 添加账户: {config.account_id}")
 
+    def remove_account(self, account_id: str) -> None:
+        """移除账户（在途请求持有的账户对象不受影响，释放时照常归还并发槽位）"""
+        account = self.accounts.pop(account_id, None)
+        if account is None:
+            return
+        account.on_state_change = None
+        if account_id in self.account_list:
+            self.account_list.remove(account_id)
+        self._discard_from_pools(account_id)
+        self._timer_due.pop(account_id, None)
+        dropped = self.global_session_cache.drop_accounts({account_id})
+        self.scheduler.forget({account_id})
+        logger.info(f"[MULTI] [ACCOUNT] 移除账户: {account_id}" + (f"（清理 {dropped} 个会话缓存）" if dropped else ""))
+
+    def apply_account_configs(
+        self,
+        configs: List[AccountConfig],
+        http_client,
+        user_agent: str,
+        account_failure_threshold: int,
+        rate_limit_cooldown_seconds: int,
+        global_stats: dict,
+    ) -> Dict[str, int]:
+        """按差异应用完整的账户配置列表，返回 {"added", "removed", "updated", "unchanged"} 计数
+
+        不在列表中的账户会被移除（清理其会话缓存与调度统计），其余账户见 apply_account_config。
+        """
+        new_ids = [config.account_id for config in configs]
+        new_id_set = set(new_ids)
+        removed = [account_id for account_id in self.accounts if account_id not in new_id_set]
+        for account_id in removed:
+            self.remove_account(account_id)
+
+        counts = {"added": 0, "removed": len(removed), "updated": 0, "unchanged": 0}
+        for config in configs:
+            result = self.apply_account_config(
+                config, http_client, user_agent, account_failure_threshold, rate_limit_cooldown_seconds, global_stats,
+                notify=False,
+            )
+            counts[result] += 1
+
+        # 账户列表顺序与配置一致（新增账户位于其在配置中的位置）
+        self.account_list = [account_id for account_id in dict.fromkeys(new_ids) if account_id in self.accounts]
+        if counts["added"] or counts["updated"]:
+            self.limiter.notify()  # 唤醒冷却等待中的请求
+        return counts
+
+    def apply_account_config(
+        self,
+        config: AccountConfig,
+        http_client,
+        user_agent: str,
+        account_failure_threshold: int,
+        rate_limit_cooldown_seconds: int,
+        global_stats: dict,
+        notify: bool = True,
+    ) -> str:
+        """应用单个账户配置，返回 "added" / "updated" / "unchanged"
+
+        - 新账户：添加
+        - 凭证变化（cookie / csesidx / config_id）：替换配置并作废该账户的 JWT，
+          清除认证错误与冷却（配额冷却保留）；config_id 变化时同时清理其会话缓存
+        - 仅其他字段变化（禁用、过期时间、邮箱信息等）：原地更新配置，JWT 保留
+        - 未变化账户：运行时状态（JWT、冷却、错误计数、会话缓存）保持不变
+        """
+        account = self.accounts.get(config.account_id)
+        if account is None:
+            self.add_account(config, http_client, user_agent, account_failure_threshold, rate_limit_cooldown_seconds, global_stats)
+            if config.is_expired():
+                self.accounts[config.account_id].is_available = False
+            if notify:
+                self.limiter.notify()
+            return "added"
+
+        # 全局重试参数对所有账户生效（不影响运行时状态；HTTP 客户端由 update_http_client 统一更新）
+        account.account_failure_threshold = account_failure_threshold
+        account.rate_limit_cooldown_seconds = rate_limit_cooldown_seconds
+
+        old_config = account.config
+        if old_config == config:
+            return "unchanged"
+
+        credentials_changed = any(
+            getattr(old_config, field) != getattr(config, field)
+            for field in CREDENTIAL_FIELDS
+        )
+        account.config = config
+        if credentials_changed:
+            account.jwt_manager = None
+            account.breaker.reset()
+            account.error_count = 0
+            account.last_error_time = 0.0
+            account.last_cooldown_time = 0.0
+            if old_config.config_id != config.config_id:
+                self.global_session_cache.drop_accounts({config.account_id})
+            logger.info(f"[MULTI] [ACCOUNT] 账户凭证已更新: {config.account_id}（JWT 已作废）")
+        elif account.jwt_manager is not None:
+            account.jwt_manager.config = config
+        # 凭证更新或过期时间延长后重新启用（过期加载时被标记为不可用）
+        if (credentials_changed or old_config.is_expired()) and not config.is_expired():
+            account.is_available = True
+        self.refresh_availability(config.account_id)
+        if notify:
+            self.limiter.notify()
+        return "updated"
+
+    # ---------- 可用账户索引 ----------
+
+    def _on_account_state_change(self, account: AccountManager) -> None:
+        # 回调可能来自已被移除的账户对象（在途请求仍持有）
+        if self.accounts.get(account.config.account_id) is account:
+            self._reindex(account)
+
+    def _reindex(self, account: AccountManager) -> None:
+        """重新计算单个账户在各可用池中的归属，并安排下一次状态检查"""
+        account_id = account.config.account_id
+        now = time.time()
+        expires_ts = account.config.expires_at_timestamp()
+        expired = expires_ts is not None and expires_ts <= now
+        if account.config.disabled or expired:
+            self._discard_from_pools(account_id)
+            self._timer_due.pop(account_id, None)
+            return
+
+        if account.should_retry():
+            self._pools[None].add(account_id)
+            next_check = expires_ts  # 到期后移出
+            for quota_type, pool in self._pools.items():
+                if quota_type is None:
+                    continue
+                quota_until = account.quota_cooldown_until(quota_type, now)
+                if quota_until is None:
+                    pool.add(account_id)
+                else:
+                    pool.discard(account_id)
+                    next_check = quota_until if next_check is None else min(next_check, quota_until)
+        else:
+            self._discard_from_pools(account_id)
+            next_check = account.cooldown_expires_at()  # 冷却结束后重新纳入（永久禁用则为 None）
+
+        if next_check is None:
+            self._timer_due.pop(account_id, None)
+        elif self._timer_due.get(account_id) != next_check:
+            self._timer_due[account_id] = next_check
+            heapq.heappush(self._timers, (next_check, account_id))
+
+    def _discard_from_pools(self, account_id: str) -> None:
+        for pool in self._pools.values():
+            pool.discard(account_id)
+
+    def _pool(self, quota_type: Optional[str]) -> AvailabilityPool:
+        """按配额类型获取可用池（未知类型使用基础池）"""
+        pool = self._pools.get(quota_type)
+        return pool if pool is not None else self._pools[None]
+
+    def _run_due_timers(self) -> None:
+        """处理已到期的定时器（冷却结束 / 账户过期）"""
+        now = time.time()
+        timers = self._timers
+        while timers and timers[0][0] <= now:
+            due, account_id = heapq.heappop(timers)
+            if self._timer_due.get(account_id) != due:
+                continue  # 已被更新的检查时间取代
+            del self._timer_due[account_id]
+            account = self.accounts.get(account_id)
+            if account is not None:
+                self._reindex(account)
+
+    def refresh_availability(self, account_id: Optional[str] = None) -> None:
+        """在索引之外修改了账户状态（禁用标记、冷却时长等）后重新计算，未指定账户时全部重算"""
+        if account_id is None:
+            for account in self.accounts.values():
+                self._reindex(account)
+        elif account_id in self.accounts:
+            self._reindex(self.accounts[account_id])
+
+    def available_count(self, exclude: Optional[set] = None, quota_type: Optional[str] = None) -> int:
+        """当前可用账户数（O(1)，exclude 中的账户不计入；指定 quota_type 时排除该配额冷却中的账户）"""
+        self._run_due_timers()
+        pool = self._pool(quota_type)
+        count = len(pool)
+        if exclude:
+            count -= sum(1 for account_id in exclude if account_id in pool)
+        return count
+
     async def get_account(self, account_id: Optional[str] = None, request_id: str = "") -> AccountManager:
         """获取账户 - Round-Robin轮询"""
+        return self._select_account(account_id, request_id)
+
+    def _select_account(
+        self,
+        account_id: Optional[str] = None,
+        request_id: str = "",
+        exclude: Optional[set] = None,
+        require_capacity: bool = False,
+        quota_type: Optional[str] = None,
+    ) -> Optional[AccountManager]:
+        """选择账户；require_capacity 时跳过并发已满的账户，全部已满返回 None
+
+        quota_type 指定时只在该配额未冷却的账户中轮询（指定账户ID时不检查，保持会话绑定）
+        """
         req_tag = f"[req_{request_id}] " if request_id else ""
 
         # 指定账户ID时直接返回
@@ -486,45 +1107,278 @@ class MultiAccountManager:
             account = self.accounts[account_id]
             if not account.should_retry():
                 raise HTTPException(503, f"Account {account_id} temporarily unavailable")
+            if require_capacity and not self.limiter.has_capacity(account_id):
+                return None
+            account.begin_trial(quota_type)
             return account
 
-        # 筛选可用账户
-        available_accounts = [
-            acc for acc in self.accounts.values()
-            if (acc.should_retry() and
-                not acc.config.is_expired() and
-                not acc.config.disabled)
-        ]
-
-        if not available_accounts:
+        # 从可用账户索引中按调度策略选择
+        self._run_due_timers()
+        pool = self._pool(quota_type)
+        total = len(pool)
+        if total == 0 or (exclude and self.available_count(exclude, quota_type) == 0):
             raise HTTPException(503, "No available accounts")
 
-        # 轮询选择
-        with self._counter_lock:
-            if len(available_accounts) != self._last_account_count:
-                self._request_counter = random.randint(0, 999999)
-                self._last_account_count = len(available_accounts)
-            index = self._request_counter % len(available_accounts)
-            self._request_counter += 1
+        limiter = self.limiter
+
+        def eligible(candidate_id: str) -> bool:
+            if exclude and candidate_id in exclude:
+                return False
+            return not require_capacity or limiter.has_capacity(candidate_id)
 
-        selected = available_accounts[index]
+        selected_id = self.scheduler.pick(pool.ids, eligible, limiter.in_flight)
+        if selected_id is None:
+            return None  # 候选账户并发均已满
+        selected = self.accounts[selected_id]
         selected.session_usage_count += 1
+        selected.begin_trial(quota_type)
 
         logger.info(f"[MULTI] [ACCOUNT] {req_tag}选择账户: {selected.config.account_id} "
-                    f"(索引: {index}/{len(available_accounts)}, 使用: {selected.session_usage_count})")
+                    f"(策略: {self.scheduler.strategy}, 可用: {total}, 使用: {selected.session_usage_count})")
         return selected
 
+    def next_cooldown_expiry(
+        self,
+        account_id: Optional[str] = None,
+        exclude: Optional[set] = None,
+        quota_type: Optional[str] = None,
+    ) -> Optional[float]:
+        """候选账户中最早的冷却结束时间（时间戳）；没有会自动恢复的账户时返回 None"""
+        if account_id:
+            account = self.accounts.get(account_id)
+            candidates = [account] if account else []
+            quota_type = None  # 指定账户时不检查配额（与 _select_account 一致）
+        else:
+            candidates = [
+                acc for acc in self.accounts.values()
+                if (not acc.config.is_expired() and
+                    not acc.config.disabled and
+                    not (exclude and acc.config.account_id in exclude))
+            ]
+        expiries = [
+            expiry for expiry in (acc.cooldown_expires_at(quota_type) for acc in candidates)
+            if expiry is not None
+        ]
+        return min(expiries) if expiries else None
+
+    def will_recover_within(
+        self,
+        seconds: float,
+        account_id: Optional[str] = None,
+        exclude: Optional[set] = None,
+        quota_type: Optional[str] = None,
+    ) -> bool:
+        """是否有候选账户会在 seconds 秒内结束冷却"""
+        expiry = self.next_cooldown_expiry(account_id, exclude, quota_type)
+        return expiry is not None and expiry - time.time() <= seconds
+
+    async def acquire_account(
+        self,
+        account_id: Optional[str] = None,
+        request_id: str = "",
+        exclude: Optional[set] = None,
+        cooldown_wait_seconds: float = 0,
+        quota_type: Optional[str] = None,
+    ) -> AccountManager:
+        """选择账户并占用一个并发槽位（用完需调用 release_account）
+
+        全局或候选账户并发已满时进入有界等待队列：
+        - 队列已满：立即返回 429（带 Retry-After）
+        - 等待超过 wait_timeout_seconds：返回 503（带 Retry-After）
+        - 没有任何可用账户：沿用 get_account 的 503
+
+        cooldown_wait_seconds > 0 时启用冷却等待：候选账户全部处于冷却期，
+        且最早的冷却结束时间在等待时限内，则等到该账户恢复（或被提前唤醒）后重新选择，
+        而不是立即返回 503。冷却等待单独计数，不占用并发等待队列名额
+        （max_waiters 为 0 时冷却等待依然生效）。
+
+        quota_type 指定时只选择该配额未冷却的账户（见 _select_account）。
+        """
+        limiter = self.limiter
+        req_tag = f"[req_{request_id}] " if request_id else ""
+        deadline = time.monotonic() + limiter.wait_timeout_seconds
+        cooldown_deadline = time.time() + cooldown_wait_seconds
+        queued = False
+        cooldown_waiting = False
+        cooldown_waited = False
+        try:
+            while True:
+                wake_at = None  # 冷却等待的唤醒时间（时间戳）
+                if limiter.has_total_capacity():
+                    try:
+                        account = self._select_account(
+                            account_id, request_id, exclude, require_capacity=True, quota_type=quota_type
+                        )
+                    except HTTPException as e:
+                        if e.status_code != 503 or cooldown_wait_seconds <= 0:
+                            raise
+                        wake_at = self.next_cooldown_expiry(account_id, exclude, quota_type)
+                        if wake_at is None or wake_at > cooldown_deadline:
+                            raise
+                        account = None
+                    if account is not None:
+                        limiter.acquire(account.config.account_id)
+                        return account
+
+                if wake_at is not None:
+                    if not cooldown_waiting:
+                        limiter.cooldown_waiters += 1
+                        cooldown_waiting = True
+                    delay = max(wake_at - time.time(), 0) + COOLDOWN_WAKE_SLACK_SECONDS
+                    if not cooldown_waited:
+                        cooldown_waited = True
+                        limiter.cooldown_waits += 1
+                        logger.info(f"[MULTI] [ACCOUNT] {req_tag}候选账户均在冷却中，等待 {delay:.1f}秒 后重试")
+                    await limiter.wait_for_release(delay)
+                    # 冷却结束后重新计算并发排队时限
+                    deadline = time.monotonic() + limiter.wait_timeout_seconds
+                    continue
+
+                if cooldown_waiting:
+                    limiter.cooldown_waiters -= 1
+                    cooldown_waiting = False
+                if not queued:
+                    if limiter.waiters >= limiter.max_waiters:
+                        limiter.rejected += 1
+                        logger.warning(f"[MULTI] [ACCOUNT] {req_tag}并发已满且等待队列已满，拒绝请求")
+                        raise AccountBusyError(429, "Server busy, too many queued requests", headers={"Retry-After": "1"})
+                    limiter.waiters += 1
+                    queued = True
+                    logger.info(f"[MULTI] [ACCOUNT] {req_tag}并发已满，进入等待队列 (排队: {limiter.waiters})")
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    limiter.timed_out += 1
+                    logger.warning(f"[MULTI] [ACCOUNT] {req_tag}排队超时 ({limiter.wait_timeout_seconds}秒)")
+                    retry_after = max(1, int(limiter.wait_timeout_seconds))
+                    raise AccountBusyError(503, "Timed out waiting for an available account", headers={"Retry-After": str(retry_after)})
+                await limiter.wait_for_release(remaining)
+        finally:
+            if queued:
+                limiter.waiters -= 1
+            if cooldown_waiting:
+                limiter.cooldown_waiters -= 1
+
+    def release_account(self, account: AccountManager) -> None:
+        """释放 acquire_account 占用的并发槽位"""
+        self.limiter.release(account.config.account_id)
+
 
 # ---------- 配置文件管理 ----------
 
+class AccountsCache:
+    """load_accounts_from_source 的进程内读穿缓存
+
+    以数据源版本为键：环境变量取其内容，数据库取 accounts_version 时间戳，文件取 (mtime, 大小)。
+    版本未变化时直接返回缓存副本，只有数据实际变化才产生读取开销；本进程的写入会立即作废缓存
+    （文件 mtime 精度不足时也不会读到旧数据）。注册/刷新工作线程与事件循环共用，读写加锁。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key: Optional[tuple] = None
+        self._data: Optional[list] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _copy(accounts_data: list) -> list:
+        # 账户记录是扁平字典，浅拷贝即可隔离调用方的修改
+        return [dict(acc) if isinstance(acc, dict) else acc for acc in accounts_data]
+
+    def get(self, key: Optional[tuple]) -> Optional[list]:
+        with self._lock:
+            if key is not None and key == self._key and self._data is not None:
+                self.hits += 1
+                return self._copy(self._data)
+            self.misses += 1
+            return None
+
+    def put(self, key: Optional[tuple], source: str, accounts_data: list) -> None:
+        """仅当数据确实来自键所对应的数据源时缓存（数据库读取失败降级到文件时不缓存）"""
+        if key is None or key[0] != source or not isinstance(accounts_data, list):
+            return
+        with self._lock:
+            self._key = key
+            self._data = self._copy(accounts_data)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._key = None
+            self._data = None
+            self.invalidations += 1
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cached_accounts": len(self._data) if self._data is not None else 0,
+            "source": self._key[0] if self._key else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+accounts_cache = AccountsCache()
+
+
 def _save_to_file(accounts_data: list):
     """保存账户配置到本地文件"""
     os.makedirs(os.path.dirname(ACCOUNTS_FILE) or ".", exist_ok=True)
-    with open(ACCOUNTS_FILE, 'w', encoding='utf-8') as f:
+    tmp_file = f"{ACCOUNTS_FILE}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
         json.dump(accounts_data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, ACCOUNTS_FILE)
+    accounts_cache.invalidate()
+    global _own_accounts_file_mtime
+    _own_accounts_file_mtime = _get_accounts_file_mtime()
     logger.info(f"[CONFIG] 配置已保存到 {ACCOUNTS_FILE}")
 
 
+def _get_accounts_file_mtime() -> Optional[int]:
+    try:
+        return os.stat(ACCOUNTS_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _file_cache_key() -> Optional[tuple]:
+    try:
+        stat = os.stat(ACCOUNTS_FILE)
+    except OSError:
+        return None
+    return ("file", stat.st_mtime_ns, stat.st_size)
+
+
+def _accounts_cache_key() -> Optional[tuple]:
+    """当前数据源的版本键（须在读取数据之前获取：读取期间的写入只会导致下次多读一次）"""
+    env_accounts = os.environ.get('ACCOUNTS_CONFIG')
+    if env_accounts:
+        return ("env", env_accounts)
+    if storage.is_database_enabled():
+        try:
+            version = storage.get_accounts_updated_at_sync()
+        except Exception:
+            version = None
+        return ("db", version) if version is not None else None
+    return _file_cache_key()
+
+
+async def _accounts_cache_key_async() -> Optional[tuple]:
+    env_accounts = os.environ.get('ACCOUNTS_CONFIG')
+    if env_accounts:
+        return ("env", env_accounts)
+    if storage.is_database_enabled():
+        try:
+            version = await storage.get_accounts_updated_at()
+        except Exception:
+            version = None
+        return ("db", version) if version is not None else None
+    return _file_cache_key()
+
+
 def _load_from_file() -> list:
     """从本地文件加载账户配置"""
     if os.path.exists(ACCOUNTS_FILE):
@@ -536,12 +1390,17 @@ def _load_from_file() -> list:
     return None
 
 
+# 以下读写函数均提供同步与异步两个版本：
+# - 同步版本（storage.*_sync）会阻塞调用线程，仅供注册/刷新等浏览器自动化工作线程使用
+# - 异步版本（*_async）直接 await 存储层，文件回退放到线程池，供 FastAPI 请求与后台任务使用
+
 def save_accounts_to_file(accounts_data: list):
     """保存账户配置（优先数据库，降级到文件）"""
     if storage.is_database_enabled():
         try:
             saved = storage.save_accounts_sync(accounts_data)
             if saved:
+                accounts_cache.invalidate()
                 return
         except Exception as e:
             logger.warning(f"[CONFIG] 数据库保存失败: {e}，降级到文件存储")
@@ -549,9 +1408,165 @@ def save_accounts_to_file(accounts_data: list):
     _save_to_file(accounts_data)
 
 
-def load_accounts_from_source() -> list:
-    """从环境变量、数据库或文件加载账户配置"""
-    # 1. 优先从环境变量加载
+async def save_accounts_async(accounts_data: list) -> None:
+    """save_accounts_to_file 的异步版本"""
+    if storage.is_database_enabled():
+        try:
+            saved = await storage.save_accounts(accounts_data)
+            if saved:
+                accounts_cache.invalidate()
+                return
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库保存失败: {e}，降级到文件存储")
+
+    await asyncio.to_thread(_save_to_file, accounts_data)
+
+
+def _find_account_index(accounts_data: list, account_id: str) -> Optional[int]:
+    for i, acc in enumerate(accounts_data, 1):
+        if get_account_id(acc, i) == account_id:
+            return i - 1
+    return None
+
+
+def load_account_record(account_id: str) -> Optional[dict]:
+    """读取单个账户记录（数据库模式只读取该行）"""
+    if storage.is_database_enabled() and not os.environ.get('ACCOUNTS_CONFIG'):
+        try:
+            record = storage.load_account_sync(account_id)
+            if record is not None:
+                return record
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库读取账户失败: {e}")
+    accounts_data = load_accounts_from_source()
+    index = _find_account_index(accounts_data, account_id)
+    return accounts_data[index] if index is not None else None
+
+
+async def load_account_record_async(account_id: str) -> Optional[dict]:
+    """load_account_record 的异步版本"""
+    if storage.is_database_enabled() and not os.environ.get('ACCOUNTS_CONFIG'):
+        try:
+            record = await storage.load_account(account_id)
+            if record is not None:
+                return record
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库读取账户失败: {e}")
+    accounts_data = await load_accounts_from_source_async()
+    index = _find_account_index(accounts_data, account_id)
+    return accounts_data[index] if index is not None else None
+
+
+def upsert_account_record(account_data: dict) -> dict:
+    """新增账户或将字段合并到已有账户（数据库模式只写入该行），返回合并后的记录"""
+    if storage.is_database_enabled():
+        try:
+            record = storage.upsert_account_sync(account_data)
+            if record is not None:
+                accounts_cache.invalidate()
+                return record
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库保存失败: {e}，降级到文件存储")
+
+    accounts_data = load_accounts_from_source()
+    index = _find_account_index(accounts_data, account_data["id"])
+    if index is None:
+        accounts_data.append(dict(account_data))
+        record = accounts_data[-1]
+    else:
+        accounts_data[index].update(account_data)
+        record = accounts_data[index]
+    _save_to_file(accounts_data)
+    return record
+
+
+def patch_account_records(account_ids: List[str], fields: dict) -> int:
+    """批量更新账户的指定字段（数据库模式只更新这些行），返回更新数量"""
+    if storage.is_database_enabled():
+        try:
+            count = storage.patch_accounts_sync(account_ids, fields)
+            if count is not None:
+                accounts_cache.invalidate()
+                return count
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库保存失败: {e}，降级到文件存储")
+
+    return _patch_account_records_in_file(account_ids, fields)
+
+
+async def patch_account_records_async(account_ids: List[str], fields: dict) -> int:
+    """patch_account_records 的异步版本"""
+    if storage.is_database_enabled():
+        try:
+            count = await storage.patch_accounts(account_ids, fields)
+            if count is not None:
+                accounts_cache.invalidate()
+                return count
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库保存失败: {e}，降级到文件存储")
+
+    return await asyncio.to_thread(_patch_account_records_in_file, account_ids, fields)
+
+
+def _patch_account_records_in_file(account_ids: List[str], fields: dict) -> int:
+    accounts_data = load_accounts_from_source()
+    account_id_set = set(account_ids)
+    count = 0
+    for i, acc in enumerate(accounts_data, 1):
+        if get_account_id(acc, i) in account_id_set:
+            acc.update(fields)
+            count += 1
+    if count:
+        _save_to_file(accounts_data)
+    return count
+
+
+def delete_account_records(account_ids: List[str]) -> List[str]:
+    """删除账户记录（数据库模式只删除这些行），返回实际删除的账户ID"""
+    if storage.is_database_enabled():
+        try:
+            deleted = storage.delete_accounts_sync(account_ids)
+            if deleted is not None:
+                accounts_cache.invalidate()
+                return deleted
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库删除失败: {e}，降级到文件存储")
+
+    return _delete_account_records_in_file(account_ids)
+
+
+async def delete_account_records_async(account_ids: List[str]) -> List[str]:
+    """delete_account_records 的异步版本"""
+    if storage.is_database_enabled():
+        try:
+            deleted = await storage.delete_accounts(account_ids)
+            if deleted is not None:
+                accounts_cache.invalidate()
+                return deleted
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库删除失败: {e}，降级到文件存储")
+
+    return await asyncio.to_thread(_delete_account_records_in_file, account_ids)
+
+
+def _delete_account_records_in_file(account_ids: List[str]) -> List[str]:
+    accounts_data = load_accounts_from_source()
+    account_id_set = set(account_ids)
+    kept: list[dict] = []
+    deleted_ids: list[str] = []
+    for i, acc in enumerate(accounts_data, 1):
+        acc_id = get_account_id(acc, i)
+        if acc_id in account_id_set:
+            deleted_ids.append(acc_id)
+        else:
+            kept.append(acc)
+    if deleted_ids:
+        _save_to_file(kept)
+    return deleted_ids
+
+
+def _load_accounts_from_env() -> Optional[list]:
+    """从环境变量 ACCOUNTS_CONFIG 加载（未设置或解析失败时返回 None）"""
     env_accounts = os.environ.get('ACCOUNTS_CONFIG')
     if env_accounts:
         try:
@@ -563,20 +1578,77 @@ def load_accounts_from_source() -> list:
             return accounts_data
         except Exception as e:
             logger.error(f"[CONFIG] 环境变量加载失败: {str(e)}")
+    return None
+
+
+def _log_db_accounts_loaded(accounts_data: list) -> None:
+    if accounts_data:
+        logger.info(f"[CONFIG] 从数据库加载配置，共 {len(accounts_data)} 个账户")
+    else:
+        logger.warning(f"[CONFIG] 数据库中账户配置为空")
+
+
+def load_accounts_from_source() -> list:
+    """从环境变量、数据库或文件加载账户配置（数据源版本未变化时返回缓存副本）"""
+    key = _accounts_cache_key()
+    cached = accounts_cache.get(key)
+    if cached is not None:
+        return cached
+    accounts_data, source = _read_accounts_from_source()
+    accounts_cache.put(key, source, accounts_data)
+    return accounts_data
+
+
+async def load_accounts_from_source_async() -> list:
+    """load_accounts_from_source 的异步版本"""
+    key = await _accounts_cache_key_async()
+    cached = accounts_cache.get(key)
+    if cached is not None:
+        return cached
+    accounts_data, source = await _read_accounts_from_source_async()
+    accounts_cache.put(key, source, accounts_data)
+    return accounts_data
+
+
+def _read_accounts_from_source() -> tuple:
+    """实际读取账户配置，返回 (账户列表, 数据源)"""
+    # 1. 优先从环境变量加载
+    accounts_data = _load_accounts_from_env()
+    if accounts_data is not None:
+        return accounts_data, "env"
 
     # 2. 尝试从数据库加载
     if storage.is_database_enabled():
         try:
             accounts_data = storage.load_accounts_sync()
             if accounts_data is not None:
-                if accounts_data:
-                    logger.info(f"[CONFIG] 从数据库加载配置，共 {len(accounts_data)} 个账户")
-                else:
-                    logger.warning(f"[CONFIG] 数据库中账户配置为空")
-                return accounts_data
+                _log_db_accounts_loaded(accounts_data)
+                return accounts_data, "db"
         except Exception as e:
             logger.warning(f"[CONFIG] 数据库加载失败: {e}，降级到文件存储")
 
+    return _load_accounts_fallback()
+
+
+async def _read_accounts_from_source_async() -> tuple:
+    accounts_data = _load_accounts_from_env()
+    if accounts_data is not None:
+        return accounts_data, "env"
+
+    if storage.is_database_enabled():
+        try:
+            accounts_data = await storage.load_accounts()
+            if accounts_data is not None:
+                _log_db_accounts_loaded(accounts_data)
+                return accounts_data, "db"
+        except Exception as e:
+            logger.warning(f"[CONFIG] 数据库加载失败: {e}，降级到文件存储")
+
+    return await asyncio.to_thread(_load_accounts_fallback)
+
+
+def _load_accounts_fallback() -> tuple:
+    """数据库不可用时从文件加载，文件也不存在时按存储模式处理"""
     # 3. 从文件加载
     accounts_data = _load_from_file()
     if accounts_data is not None:
@@ -584,20 +1656,20 @@ def load_accounts_from_source() -> list:
             logger.info(f"[CONFIG] 从文件加载配置: {ACCOUNTS_FILE}，共 {len(accounts_data)} 个账户")
         else:
             logger.warning(f"[CONFIG] 账户配置为空，请在管理面板添加账户或编辑 {ACCOUNTS_FILE}")
-        return accounts_data
+        return accounts_data, "file"
 
     # 4. 无配置处理
     if storage.is_database_enabled():
         # 数据库模式：不自动创建空配置，避免覆盖数据库
         logger.error(f"[CONFIG] 数据库模式下未找到配置，请检查数据库连接或在管理面板添加账户")
         logger.error(f"[CONFIG] ⚠️ 为防止数据覆盖，不会自动创建空配置")
-        return []
+        return [], "none"
     else:
         # 文件模式：创建空配置文件
         logger.warning(f"[CONFIG] 未找到配置，已创建空配置")
         logger.info(f"[CONFIG] 💡 请在管理面板添加账户，或设置 DATABASE_URL 使用数据库存储")
         save_accounts_to_file([])
-        return []
+        return [], "none"
 
 
 def get_account_id(acc: dict, index: int) -> str:
@@ -605,6 +1677,30 @@ def get_account_id(acc: dict, index: int) -> str:
     return acc.get("id", f"account_{index}")
 
 
+def build_account_config(acc: dict, index: int) -> AccountConfig:
+    """将账户数据转换为 AccountConfig（校验必需字段）"""
+    required_fields = ["secure_c_ses", "csesidx", "config_id"]
+    missing_fields = [f for f in required_fields if f not in acc]
+    if missing_fields:
+        raise ValueError(f"账户 {index} 缺少必需字段: {', '.join(missing_fields)}")
+
+    return AccountConfig(
+        account_id=get_account_id(acc, index),
+        secure_c_ses=acc["secure_c_ses"],
+        host_c_oses=acc.get("host_c_oses"),
+        csesidx=acc["csesidx"],
+        config_id=acc["config_id"],
+        expires_at=acc.get("expires_at"),
+        disabled=acc.get("disabled", False),  # 读取手动禁用状态，默认为False
+        mail_provider=acc.get("mail_provider"),
+        mail_address=acc.get("mail_address"),
+        mail_password=acc.get("mail_password") or acc.get("email_password"),
+        mail_client_id=acc.get("mail_client_id"),
+        mail_refresh_token=acc.get("mail_refresh_token"),
+        mail_tenant=acc.get("mail_tenant"),
+    )
+
+
 def load_multi_account_config(
     http_client,
     user_agent: str,
@@ -619,27 +1715,7 @@ def load_multi_account_config(
     accounts_data = load_accounts_from_source()
 
     for i, acc in enumerate(accounts_data, 1):
-        # 验证必需字段
-        required_fields = ["secure_c_ses", "csesidx", "config_id"]
-        missing_fields = [f for f in required_fields if f not in acc]
-        if missing_fields:
-            raise ValueError(f"账户 {i} 缺少必需字段: {', '.join(missing_fields)}")
-
-        config = AccountConfig(
-            account_id=get_account_id(acc, i),
-            secure_c_ses=acc["secure_c_ses"],
-            host_c_oses=acc.get("host_c_oses"),
-            csesidx=acc["csesidx"],
-            config_id=acc["config_id"],
-            expires_at=acc.get("expires_at"),
-            disabled=acc.get("disabled", False),  # 读取手动禁用状态，默认为False
-            mail_provider=acc.get("mail_provider"),
-            mail_address=acc.get("mail_address"),
-            mail_password=acc.get("mail_password") or acc.get("email_password"),
-            mail_client_id=acc.get("mail_client_id"),
-            mail_refresh_token=acc.get("mail_refresh_token"),
-            mail_tenant=acc.get("mail_tenant"),
-        )
+        config = build_account_config(acc, i)
 
         # 检查账户是否已过期（已过期也加载到管理面板）
         is_expired = config.is_expired()
@@ -657,7 +1733,7 @@ def load_multi_account_config(
     return manager
 
 
-def reload_accounts(
+async def reload_accounts(
     multi_account_mgr: MultiAccountManager,
     http_client,
     user_agent: str,
@@ -666,43 +1742,104 @@ def reload_accounts(
     session_cache_ttl_seconds: int,
     global_stats: dict
 ) -> MultiAccountManager:
-    """重新加载账户配置（重置所有错误状态，仅保留统计数据）"""
-    # 仅保存统计数据（conversation_count）
-    old_stats = {}
-    for account_id, account_mgr in multi_account_mgr.accounts.items():
-        old_stats[account_id] = {
-            "conversation_count": account_mgr.conversation_count
-        }
+    """重新加载账户配置（增量应用：未变化账户的 JWT、冷却、错误计数与会话缓存全部保留）
 
-    # 清空会话缓存并重新加载配置
-    multi_account_mgr.global_session_cache.clear()
-    new_mgr = load_multi_account_config(
+    返回的仍是同一个管理器实例，调用方沿用原有的赋值写法即可。
+    """
+    accounts_data = await load_accounts_from_source_async()
+    configs = [build_account_config(acc, i) for i, acc in enumerate(accounts_data, 1)]
+
+    multi_account_mgr.global_session_cache.configure(ttl_seconds=session_cache_ttl_seconds)
+    diff = multi_account_mgr.apply_account_configs(
+        configs,
         http_client,
         user_agent,
         account_failure_threshold,
         rate_limit_cooldown_seconds,
-        session_cache_ttl_seconds,
         global_stats
     )
 
-    # 仅恢复统计数据，错误状态全部重置
-    for account_id, stats in old_stats.items():
-        if account_id in new_mgr.accounts:
-            account_mgr = new_mgr.accounts[account_id]
-            account_mgr.conversation_count = stats["conversation_count"]
-            # 确保错误状态已重置（虽然load_multi_account_config已经初始化，但显式确认）
-            account_mgr.is_available = True
-            account_mgr.last_error_time = 0.0
-            account_mgr.last_cooldown_time = 0.0
-            account_mgr.error_count = 0
-            account_mgr.session_usage_count = 0
-            logger.debug(f"[CONFIG] 账户 {account_id} 已刷新，错误状态已重置")
+    logger.info(
+        f"[CONFIG] 配置已重载，当前账户数: {len(multi_account_mgr.accounts)}"
+        f"（新增 {diff['added']}，删除 {diff['removed']}，更新 {diff['updated']}，未变化 {diff['unchanged']}）"
+    )
+    return multi_account_mgr
+
+
+async def apply_account_changes(
+    account_ids: Optional[List[str]],
+    multi_account_mgr: MultiAccountManager,
+    http_client,
+    user_agent: str,
+    account_failure_threshold: int,
+    rate_limit_cooldown_seconds: int,
+    session_cache_ttl_seconds: int,
+    global_stats: dict
+) -> MultiAccountManager:
+    """应用其他进程对账户的修改：只重新读取变化的账户；account_ids 为 None 时整体重载"""
+    if account_ids is None:
+        return await reload_accounts(
+            multi_account_mgr,
+            http_client,
+            user_agent,
+            account_failure_threshold,
+            rate_limit_cooldown_seconds,
+            session_cache_ttl_seconds,
+            global_stats
+        )
+
+    counts = {"added": 0, "removed": 0, "updated": 0, "unchanged": 0}
+    for account_id in account_ids:
+        record = await load_account_record_async(account_id)
+        if record is None:
+            if account_id in multi_account_mgr.accounts:
+                multi_account_mgr.remove_account(account_id)
+                counts["removed"] += 1
+            continue
+        config = build_account_config(record, len(multi_account_mgr.accounts) + 1)
+        result = multi_account_mgr.apply_account_config(
+            config,
+            http_client,
+            user_agent,
+            account_failure_threshold,
+            rate_limit_cooldown_seconds,
+            global_stats
+        )
+        counts[result] += 1
+
+    logger.info(
+        f"[CONFIG] 已同步账户变更: {len(account_ids)} 个"
+        f"（新增 {counts['added']}，删除 {counts['removed']}，更新 {counts['updated']}，未变化 {counts['unchanged']}）"
+    )
+    return multi_account_mgr
 
-    logger.info(f"[CONFIG] 配置已重载，当前账户数: {len(new_mgr.accounts)}，所有错误状态已重置")
-    return new_mgr
 
+async def watch_account_changes(on_change: storage.AccountChangeHandler) -> None:
+    """监听其他进程对账户配置的修改，持续运行直到被取消
 
-def update_accounts_config(
+    - PostgreSQL：LISTEN/NOTIFY，通知中携带变化的账户ID
+    - SQLite：监听数据库文件 mtime，读取变更日志中的账户ID
+    - 文件存储：监听账户文件 mtime（无法得知具体账户，整体按差异重载）
+    本进程自己的写入会被跳过。
+    """
+    if os.environ.get('ACCOUNTS_CONFIG'):
+        return
+    if storage.is_database_enabled():
+        await storage.watch_account_changes(on_change)
+        return
+
+    last_mtime = _get_accounts_file_mtime()
+    while True:
+        await asyncio.sleep(storage.ACCOUNT_CHANGE_POLL_SECONDS)
+        mtime = _get_accounts_file_mtime()
+        if mtime == last_mtime:
+            continue
+        last_mtime = mtime
+        if mtime is not None and mtime != _own_accounts_file_mtime:
+            await on_change(None)
+
+
+async def update_accounts_config(
     accounts_data: list,
     multi_account_mgr: MultiAccountManager,
     http_client,
@@ -713,8 +1850,8 @@ def update_accounts_config(
     global_stats: dict
 ) -> MultiAccountManager:
     """更新账户配置（保存到文件并重新加载）"""
-    save_accounts_to_file(accounts_data)
-    return reload_accounts(
+    await save_accounts_async(accounts_data)
+    return await reload_accounts(
         multi_account_mgr,
         http_client,
         user_agent,
@@ -725,7 +1862,7 @@ def update_accounts_config(
     )
 
 
-def delete_account(
+async def delete_account(
     account_id: str,
     multi_account_mgr: MultiAccountManager,
     http_client,
@@ -735,31 +1872,38 @@ def delete_account(
     session_cache_ttl_seconds: int,
     global_stats: dict
 ) -> MultiAccountManager:
-    """删除单个账户"""
-    accounts_data = load_accounts_from_source()
+    """删除单个账户（只删除该账户的记录，其余账户不受影响）"""
+    if not await delete_account_records_async([account_id]):
+        raise ValueError(f"账户 {account_id} 不存在")
 
-    # 过滤掉要删除的账户
-    filtered = [
-        acc for i, acc in enumerate(accounts_data, 1)
-        if get_account_id(acc, i) != account_id
-    ]
+    multi_account_mgr.remove_account(account_id)
+    return multi_account_mgr
 
-    if len(filtered) == len(accounts_data):
-        raise ValueError(f"账户 {account_id} 不存在")
 
-    save_accounts_to_file(filtered)
-    return reload_accounts(
-        multi_account_mgr,
+def apply_account_record(
+    record: dict,
+    multi_account_mgr: MultiAccountManager,
+    http_client,
+    user_agent: str,
+    account_failure_threshold: int,
+    rate_limit_cooldown_seconds: int,
+    global_stats: dict
+) -> MultiAccountManager:
+    """将已保存的单个账户记录增量应用到账户管理器（须在事件循环线程中调用）"""
+    config = build_account_config(record, len(multi_account_mgr.accounts) + 1)
+    result = multi_account_mgr.apply_account_config(
+        config,
         http_client,
         user_agent,
         account_failure_threshold,
         rate_limit_cooldown_seconds,
-        session_cache_ttl_seconds,
         global_stats
     )
+    logger.info(f"[CONFIG] 账户 {config.account_id} 已保存（{result}）")
+    return multi_account_mgr
 
 
-def update_account_disabled_status(
+async def update_account_disabled_status(
     account_id: str,
     disabled: bool,
     multi_account_mgr: MultiAccountManager,
@@ -777,27 +1921,24 @@ def update_account_disabled_status(
 
     account_mgr = multi_account_mgr.accounts[account_id]
     account_mgr.config.disabled = disabled
+    multi_account_mgr.refresh_availability(account_id)
+    if not disabled:
+        multi_account_mgr.limiter.notify()  # 唤醒冷却等待中的请求
 
-    # 保存到文件
-    accounts_data = load_accounts_from_source()
-    for i, acc in enumerate(accounts_data, 1):
-        if get_account_id(acc, i) == account_id:
-            acc["disabled"] = disabled
-            break
-
-    save_accounts_to_file(accounts_data)
+    # 只更新该账户的记录
+    await patch_account_records_async([account_id], {"disabled": disabled})
 
     status_text = "已禁用" if disabled else "已启用"
     logger.info(f"[CONFIG] 账户 {account_id} {status_text}")
     return multi_account_mgr
 
 
-def bulk_update_account_disabled_status(
+async def bulk_update_account_disabled_status(
     account_ids: list[str],
     disabled: bool,
     multi_account_mgr: MultiAccountManager,
 ) -> tuple[int, list[str]]:
-    """批量更新账户禁用状态，单次最多50个，仅读写一次文件"""
+    """批量更新账户禁用状态，单次最多50个，只更新这些账户的记录"""
     success_count = 0
     errors = []
 
@@ -808,27 +1949,20 @@ def bulk_update_account_disabled_status(
             continue
         account_mgr = multi_account_mgr.accounts[account_id]
         account_mgr.config.disabled = disabled
+        multi_account_mgr.refresh_availability(account_id)
         success_count += 1
+    if not disabled and success_count:
+        multi_account_mgr.limiter.notify()  # 唤醒冷却等待中的请求
 
-    # 2. 只读取一次文件
-    accounts_data = load_accounts_from_source()
-    account_id_set = set(account_ids)
-
-    # 3. 批量更新
-    for i, acc in enumerate(accounts_data, 1):
-        acc_id = get_account_id(acc, i)
-        if acc_id in account_id_set:
-            acc["disabled"] = disabled
-
-    # 4. 只保存一次
-    save_accounts_to_file(accounts_data)
+    # 2. 批量更新存储（一次写入）
+    await patch_account_records_async(account_ids, {"disabled": disabled})
 
     status_text = "已禁用" if disabled else "已启用"
     logger.info(f"[CONFIG] 批量{status_text} {success_count}/{len(account_ids)} 个账户")
     return success_count, errors
 
 
-def bulk_delete_accounts(
+async def bulk_delete_accounts(
     account_ids: list[str],
     multi_account_mgr: MultiAccountManager,
     http_client,
@@ -838,36 +1972,18 @@ def bulk_delete_accounts(
     session_cache_ttl_seconds: int,
     global_stats: dict
 ) -> tuple[MultiAccountManager, int, list[str]]:
-    """批量删除账户，单次最多50个，仅读写一次文件"""
+    """批量删除账户，单次最多50个，只删除这些账户的记录"""
     errors = []
     account_id_set = set(account_ids)
 
-    accounts_data = load_accounts_from_source()
-    kept: list[dict] = []
-    deleted_ids: list[str] = []
-
-    for i, acc in enumerate(accounts_data, 1):
-        acc_id = get_account_id(acc, i)
-        if acc_id in account_id_set:
-            deleted_ids.append(acc_id)
-            continue
-        kept.append(acc)
+    deleted_ids = await delete_account_records_async(list(account_id_set))
 
     missing = account_id_set.difference(deleted_ids)
     for account_id in missing:
         errors.append(f"{account_id}: 账户不存在")
 
-    if deleted_ids:
-        save_accounts_to_file(kept)
-        multi_account_mgr = reload_accounts(
-            multi_account_mgr,
-            http_client,
-            user_agent,
-            account_failure_threshold,
-            rate_limit_cooldown_seconds,
-            session_cache_ttl_seconds,
-            global_stats
-        )
+    for account_id in deleted_ids:
+        multi_account_mgr.remove_account(account_id)
 
     success_count = len(deleted_ids)
     logger.info(f"[CONFIG] 批量删除 {success_count}/{len(account_ids)} 个账户")
@@ -12,7 +12,7 @@ from enum import Enum
 from typing import Any, Awaitable, Callable, Deque, Dict, Generic, List, Optional, TypeVar
 from collections import deque
 
-from core.account import update_accounts_config
+from core.account import apply_account_record, upsert_account_record
 
 logger = logging.getLogger("gemini.base_task")
 
@@ -110,6 +110,7 @@ class BaseTaskService(Generic[T]):
         self._current_asyncio_task: Optional[asyncio.Task] = None
         self._cancel_hooks: Dict[str, List[Callable[[], None]]] = {}
         self._cancel_hooks_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # 账户管理器所在的事件循环
 
         self.multi_account_mgr = multi_account_mgr
         self.http_client = http_client
@@ -178,6 +179,7 @@ class BaseTaskService(Generic[T]):
     async def _enqueue_task(self, task: T) -> None:
         """将任务加入队列并启动 worker。"""
         self._pending_task_ids.append(task.id)
+        self._loop = asyncio.get_running_loop()
         if not self._worker_task or self._worker_task.done():
             self._worker_task = asyncio.create_task(self._run_worker())
 
@@ -316,22 +318,45 @@ class BaseTaskService(Generic[T]):
         except Exception:
             pass
 
-    def _apply_accounts_update(self, accounts_data: list) -> None:
+    def _run_on_loop(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在事件循环线程中执行 func 并等待结果
+
+        账户管理器（账户表、可用池、定时堆、会话缓存、并发限制器的 asyncio.Event）
+        只允许在事件循环内修改；注册/刷新在 executor 线程中运行，需经此切回事件循环。
+        """
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return func(*args)
+        try:
+            if asyncio.get_running_loop() is loop:
+                return func(*args)
+        except RuntimeError:
+            pass
+
+        async def _call() -> Any:
+            return func(*args)
+
+        return asyncio.run_coroutine_threadsafe(_call(), loop).result()
+
+    def _apply_account_upsert(self, account_data: dict) -> None:
         """
-        应用账户更新
+        保存单个账户（只写入该账户的记录，其余账户的运行时状态不受影响）
+
+        在 executor 线程中调用：存储写入在当前线程完成，账户管理器的更新切回事件循环执行。
 
         Args:
-            accounts_data: 账户数据列表
+            account_data: 账户数据（必须包含 id，字段与已有记录合并）
         """
+        record = upsert_account_record(account_data)
         global_stats = self.global_stats_provider() or {}
-        new_mgr = update_accounts_config(
-            accounts_data,
+        new_mgr = self._run_on_loop(
+            apply_account_record,
+            record,
             self.multi_account_mgr,
             self.http_client,
             self.user_agent,
             self.account_failure_threshold,
             self.rate_limit_cooldown_seconds,
-            self.session_cache_ttl_seconds,
             global_stats,
         )
         self.multi_account_mgr = new_mgr
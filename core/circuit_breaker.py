@@ -0,0 +1,116 @@
+"""账户熔断器模块
+
+普通错误（网络错误、5xx 等）连续达到阈值后不再永久禁用账户，而是打开熔断器：
+
+- closed: 正常接收请求
+- open: 熔断中，在打开窗口内不参与选择；窗口按连续熔断次数指数增长（有上限）
+- half_open: 窗口结束后只放行一个试探请求，成功则关闭，失败则以更长的窗口重新打开
+
+试探请求因客户端断开等原因既未成功也未失败时，超过 trial_timeout 后视为结束，允许再次试探。
+"""
+import time
+from collections import deque
+from typing import Deque, Optional
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# 首次熔断的打开窗口（秒），之后每次连续熔断翻倍
+DEFAULT_BREAKER_BASE_OPEN_SECONDS = 60
+# 打开窗口上限（秒）
+DEFAULT_BREAKER_MAX_OPEN_SECONDS = 3600
+# 半开状态下试探请求的超时（秒）
+DEFAULT_BREAKER_TRIAL_TIMEOUT_SECONDS = 300
+# 保留的状态变化记录数
+BREAKER_TRANSITION_HISTORY = 10
+
+
+class CircuitBreaker:
+    """单个账户的熔断器（状态由 AccountManager 在事件循环内同步更新，无需加锁）"""
+
+    def __init__(
+        self,
+        base_open_seconds: float = DEFAULT_BREAKER_BASE_OPEN_SECONDS,
+        max_open_seconds: float = DEFAULT_BREAKER_MAX_OPEN_SECONDS,
+        trial_timeout_seconds: float = DEFAULT_BREAKER_TRIAL_TIMEOUT_SECONDS,
+    ) -> None:
+        self.base_open_seconds = base_open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.trial_timeout_seconds = trial_timeout_seconds
+        self.state = BREAKER_CLOSED
+        self.trips = 0  # 连续熔断次数（关闭时清零）
+        self.open_until = 0.0
+        self.trial_started_at = 0.0  # 0 表示没有进行中的试探请求
+        self.transitions: Deque[dict] = deque(maxlen=BREAKER_TRANSITION_HISTORY)
+
+    def _transition(self, state: str, reason: str, now: float) -> None:
+        self.transitions.append({"from": self.state, "to": state, "at": now, "reason": reason})
+        self.state = state
+
+    def _trial_in_flight(self, now: float) -> bool:
+        return self.trial_started_at > 0 and now - self.trial_started_at < self.trial_timeout_seconds
+
+    def trip(self, reason: str, now: Optional[float] = None) -> float:
+        """打开熔断器，返回本次打开窗口（秒）"""
+        now = time.time() if now is None else now
+        window = min(self.base_open_seconds * (2 ** self.trips), self.max_open_seconds)
+        self.trips += 1
+        self.open_until = now + window
+        self.trial_started_at = 0.0
+        self._transition(BREAKER_OPEN, reason, now)
+        return window
+
+    def allows_request(self, now: Optional[float] = None) -> bool:
+        """是否允许请求（打开窗口结束时转为半开，半开时仅在没有试探请求进行中时允许）"""
+        if self.state == BREAKER_CLOSED:
+            return True
+        now = time.time() if now is None else now
+        if self.state == BREAKER_OPEN:
+            if now < self.open_until:
+                return False
+            self._transition(BREAKER_HALF_OPEN, "打开窗口结束", now)
+        return not self._trial_in_flight(now)
+
+    def begin_trial(self, now: Optional[float] = None) -> None:
+        """半开状态下占用唯一的试探名额"""
+        if self.state == BREAKER_HALF_OPEN:
+            self.trial_started_at = time.time() if now is None else now
+
+    def end_trial(self) -> None:
+        """试探请求结束但不代表账户健康状况（如 400/429），释放试探名额"""
+        self.trial_started_at = 0.0
+
+    def record_success(self, now: Optional[float] = None) -> None:
+        if self.state != BREAKER_CLOSED:
+            self._transition(BREAKER_CLOSED, "试探请求成功" if self.state == BREAKER_HALF_OPEN else "请求成功", time.time() if now is None else now)
+        self.trips = 0
+        self.open_until = 0.0
+        self.trial_started_at = 0.0
+
+    def reset(self) -> None:
+        """手动恢复（管理员启用账户时调用）"""
+        if self.state != BREAKER_CLOSED:
+            self._transition(BREAKER_CLOSED, "手动恢复", time.time())
+        self.trips = 0
+        self.open_until = 0.0
+        self.trial_started_at = 0.0
+
+    def next_check_at(self, now: Optional[float] = None) -> Optional[float]:
+        """下一次可能重新放行的时间（时间戳）；关闭或可立即放行时返回 None"""
+        now = time.time() if now is None else now
+        if self.state == BREAKER_OPEN:
+            return self.open_until
+        if self.state == BREAKER_HALF_OPEN and self._trial_in_flight(now):
+            return self.trial_started_at + self.trial_timeout_seconds
+        return None
+
+    def to_dict(self) -> dict:
+        now = time.time()
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "open_remaining_seconds": max(int(self.open_until - now), 0) if self.state == BREAKER_OPEN else 0,
+            "trial_in_flight": self.state == BREAKER_HALF_OPEN and self._trial_in_flight(now),
+            "transitions": list(self.transitions),
+        }
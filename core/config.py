@@ -98,13 +98,40 @@ class RetryConfig(BaseModel):
     max_request_retries: int = Field(default=3, ge=1, le=10, description="请求失败重试次数")
     max_account_switch_tries: int = Field(default=5, ge=1, le=20, description="账户切换尝试次数")
     account_failure_threshold: int = Field(default=3, ge=1, le=10, description="账户失败阈值")
-    rate_limit_cooldown_seconds: int = Field(default=3600, ge=3600, le=43200, description="429冷却时间（秒）")
+    rate_limit_cooldown_seconds: int = Field(default=3600, ge=3600, le=43200, description="429最长冷却时间（秒）")
+    rate_limit_base_cooldown_seconds: int = Field(default=60, ge=0, le=43200, description="429初始冷却时间（秒，连续限流时翻倍直至最长冷却时间，0表示固定使用最长冷却时间）")
     session_cache_ttl_seconds: int = Field(default=3600, ge=0, le=86400, description="会话缓存时间（秒，0表示禁用缓存）")
-    auto_refresh_accounts_seconds: int = Field(default=60, ge=0, le=600, description="自动刷新账号间隔（秒，0禁用）")
+    session_pool_size: int = Field(default=1, ge=0, le=10, description="每个账户预建会话数（0表示禁用预建）")
+    session_pool_ttl_seconds: int = Field(default=1800, ge=60, le=86400, description="预建会话有效期（秒）")
+    max_concurrent_per_account: int = Field(default=5, ge=0, le=100, description="单账户最大并发请求数（0表示不限制）")
+    max_concurrent_total: int = Field(default=200, ge=0, le=5000, description="全局最大并发请求数（0表示不限制）")
+    queue_max_waiters: int = Field(default=100, ge=0, le=5000, description="并发已满时的最大排队请求数（0表示不排队）")
+    queue_timeout_seconds: int = Field(default=30, ge=1, le=600, description="排队等待超时（秒）")
+    cooldown_wait_seconds: int = Field(default=0, ge=0, le=600, description="账户全部冷却时的最长等待时间（秒，0表示立即返回503）")
+    scheduler_strategy: str = Field(default="round_robin", description="账户调度策略：round_robin / least_outstanding / ewma_ttft / power_of_two")
+    auto_refresh_accounts_seconds: int = Field(default=60, ge=0, le=600, description="账号兜底校验间隔（秒，0禁用；账号变化平时由变更推送实时同步）")
     # 定时刷新配置
     scheduled_refresh_enabled: bool = Field(default=False, description="是否启用定时刷新任务")
     scheduled_refresh_interval_minutes: int = Field(default=30, ge=0, le=720, description="定时刷新检测间隔（分钟，0-12小时）")
 
+    @validator("scheduler_strategy")
+    def validate_scheduler_strategy(cls, v):
+        allowed = ["round_robin", "least_outstanding", "ewma_ttft", "power_of_two"]
+        if v not in allowed:
+            raise ValueError(f"scheduler_strategy 必须是 {allowed} 之一")
+        return v
+
+
+class HttpConfig(BaseModel):
+    """HTTP 客户端配置（连接池按用途独立）"""
+    stream_http2: bool = Field(default=True, description="流式对话客户端启用HTTP/2多路复用")
+    chat_max_connections: int = Field(default=200, ge=1, le=2000, description="对话操作客户端最大连接数")
+    chat_max_keepalive_connections: int = Field(default=100, ge=0, le=2000, description="对话操作客户端最大空闲连接数")
+    stream_max_connections: int = Field(default=200, ge=1, le=2000, description="流式对话客户端最大连接数")
+    stream_max_keepalive_connections: int = Field(default=100, ge=0, le=2000, description="流式对话客户端最大空闲连接数")
+    auth_max_connections: int = Field(default=200, ge=1, le=2000, description="账户操作客户端最大连接数")
+    auth_max_keepalive_connections: int = Field(default=100, ge=0, le=2000, description="账户操作客户端最大空闲连接数")
+
 
 class PublicDisplayConfig(BaseModel):
     """公开展示配置"""
@@ -133,6 +160,7 @@ class AppConfig(BaseModel):
     image_generation: ImageGenerationConfig
     video_generation: VideoGenerationConfig = Field(default_factory=VideoGenerationConfig)
     retry: RetryConfig
+    http: HttpConfig = Field(default_factory=HttpConfig)
     public_display: PublicDisplayConfig
     session: SessionConfig
 
@@ -243,6 +271,10 @@ class ConfigManager:
 
         retry_config = RetryConfig(**retry_data)
 
+        http_config = HttpConfig(
+            **yaml_data.get("http", {})
+        )
+
         public_display_config = PublicDisplayConfig(
             **yaml_data.get("public_display", {})
         )
@@ -258,6 +290,7 @@ class ConfigManager:
             image_generation=image_generation_config,
             video_generation=video_generation_config,
             retry=retry_config,
+            http=http_config,
             public_display=public_display_config,
             session=session_config
         )
@@ -441,6 +474,10 @@ class _ConfigProxy:
     def retry(self):
         return config_manager.config.retry
 
+    @property
+    def http(self):
+        return config_manager.config.http
+
     @property
     def public_display(self):
         return config_manager.config.public_display
@@ -0,0 +1,105 @@
+"""自适应限流冷却模块
+
+429 不再固定冷却 rate_limit_cooldown_seconds（1-12 小时），而是：
+
+- 首次限流从较短的初始时长开始（有历史时使用学习到的恢复时间）
+- 连续限流时按 2 的幂次增长，最长不超过 rate_limit_cooldown_seconds
+- 冷却窗口走过 EARLY_PROBE_FRACTION 后放行一个探测请求：成功则提前恢复，
+  再次 429 则以翻倍的时长重新冷却；探测进行中不放行其他请求
+- 限流结束时以「最后一次限流 → 成功」的间隔（不超过该次冷却时长）更新恢复时间估计，
+  探测提前成功时估计随之缩短，账户闲置多久都不会把估计拉长
+"""
+import time
+from typing import Optional
+
+# 默认初始冷却时长（秒）
+DEFAULT_RATE_LIMIT_BASE_COOLDOWN_SECONDS = 60
+# 恢复时间估计的平滑系数（新样本权重）
+RECOVERY_EWMA_ALPHA = 0.5
+# 冷却窗口走过该比例后放行一个提前探测请求
+EARLY_PROBE_FRACTION = 0.5
+# 探测请求因客户端断开等原因既未成功也未失败时，超过该时长后允许再次探测（秒）
+PROBE_TIMEOUT_SECONDS = 300
+
+
+class AdaptiveCooldown:
+    """单个限流维度（账户整体或某一配额类型）的冷却时长计算与提前探测"""
+
+    __slots__ = ("strikes", "limited_at", "recovery_seconds", "duration", "probe_at", "probe_started_at")
+
+    def __init__(self) -> None:
+        self.strikes = 0  # 连续限流次数（成功后清零）
+        self.limited_at = 0.0  # 最近一次限流的时间（即当前冷却窗口的起点）
+        self.recovery_seconds: Optional[float] = None  # 学习到的恢复时间
+        self.duration = 0.0  # 当前冷却时长
+        self.probe_at = 0.0  # 允许提前探测的时间（0 表示不提前探测）
+        self.probe_started_at = 0.0  # 0 表示没有进行中的探测请求
+
+    def on_rate_limited(self, now: float, base_seconds: float, max_seconds: float) -> float:
+        """记录一次 429，返回本次冷却时长；base_seconds 为 0 或不小于上限时固定使用上限（不提前探测）"""
+        if base_seconds <= 0 or base_seconds >= max_seconds:
+            duration = max_seconds
+            self.probe_at = 0.0
+        else:
+            start = base_seconds
+            if self.recovery_seconds is not None:
+                start = min(max(self.recovery_seconds, base_seconds), max_seconds)
+            duration = min(start * (2 ** self.strikes), max_seconds)
+            self.probe_at = now + duration * EARLY_PROBE_FRACTION
+        self.strikes += 1
+        self.limited_at = now
+        self.duration = duration
+        self.probe_started_at = 0.0
+        return duration
+
+    def _probe_in_flight(self, now: float) -> bool:
+        return self.probe_started_at > 0 and now - self.probe_started_at < PROBE_TIMEOUT_SECONDS
+
+    def next_check_at(self, until: float, now: float) -> float:
+        """冷却窗口（结束于 until）内下一次可放行的时间：提前探测点、进行中探测的超时或窗口结束
+
+        返回值不大于 now 表示此刻可以放行一个探测请求。
+        """
+        if self.strikes == 0 or not self.probe_at:
+            return until
+        if now < self.probe_at:
+            return min(self.probe_at, until)
+        if self._probe_in_flight(now):
+            return min(self.probe_started_at + PROBE_TIMEOUT_SECONDS, until)
+        return min(now, until)
+
+    def begin_probe(self, now: float) -> None:
+        """占用冷却窗口内唯一的探测名额"""
+        self.probe_started_at = now
+
+    def end_probe(self) -> None:
+        """探测请求以非 429 的错误结束（不代表限流是否解除），释放探测名额"""
+        self.probe_started_at = 0.0
+
+    def on_success(self, now: float) -> bool:
+        """限流后的请求成功：更新恢复时间估计并清零连续次数，返回是否结束了一轮限流
+
+        样本取最后一次限流到成功的间隔，且不超过该次冷却时长（冷却结束后账户闲置的时间不计入）；
+        早于提前探测点的成功多为限流前已发出的请求，只结束本轮限流，不作为样本。
+        """
+        if self.strikes == 0:
+            return False
+        elapsed = min(max(now - self.limited_at, 0.0), self.duration)
+        if elapsed >= self.duration * EARLY_PROBE_FRACTION:
+            if self.recovery_seconds is None:
+                self.recovery_seconds = elapsed
+            else:
+                self.recovery_seconds += RECOVERY_EWMA_ALPHA * (elapsed - self.recovery_seconds)
+        self.strikes = 0
+        self.probe_at = 0.0
+        self.probe_started_at = 0.0
+        return True
+
+    def to_dict(self) -> dict:
+        now = time.time()
+        return {
+            "strikes": self.strikes,
+            "duration_seconds": int(self.duration),
+            "recovery_seconds": int(self.recovery_seconds) if self.recovery_seconds is not None else None,
+            "probe_in_flight": self.strikes > 0 and self._probe_in_flight(now),
+        }
@@ -82,8 +82,9 @@ async def make_request_with_jwt_retry(
     else:
         raise ValueError(f"Unsupported HTTP method: {method}")
 
-    # 如果401，刷新JWT后重试一次
+    # 如果401，作废签名密钥并重新获取JWT后重试一次
     if resp.status_code == 401:
+        account_mgr.invalidate_jwt()
         jwt = await account_mgr.get_jwt(request_id)
         headers = get_common_headers(jwt, user_agent)
         if extra_headers:
@@ -101,10 +102,11 @@ async def create_google_session(
     account_manager: "AccountManager",
     http_client: httpx.AsyncClient,
     user_agent: str,
-    request_id: str = ""
+    request_id: str = "",
+    touch: bool = True
 ) -> str:
-    """创建Google Session"""
-    jwt = await account_manager.get_jwt(request_id)
+    """创建Google Session（touch=False 表示后台预建，不计入账户最近使用时间）"""
+    jwt = await account_manager.get_jwt(request_id, touch=touch)
     headers = get_common_headers(jwt, user_agent)
     body = {
         "configId": account_manager.config.config_id,
@@ -0,0 +1,104 @@
+"""HTTP 客户端模块
+
+统一构建各用途的 httpx 客户端（可选 HTTP/2、独立连接池大小），
+并通过 httpcore 的 trace 扩展统计连接复用情况。
+"""
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 客户端名称
+CLIENT_CHAT = "chat"  # JWT / 会话 / 上传等短请求
+CLIENT_STREAM = "stream"  # widgetStreamAssist 长连接流式响应
+CLIENT_AUTH = "auth"  # 注册 / 登录 / 刷新
+
+
+def is_http2_available() -> bool:
+    """HTTP/2 依赖 h2 包（httpx[http2]）"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ClientMetrics:
+    """单个客户端的连接复用统计"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.http2_requests = 0
+        self.http2_enabled = False
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+        elif event_name == "http2.send_request_headers.started":
+            self.http2_requests += 1
+
+    def to_dict(self) -> dict:
+        reused = max(self.requests - self.new_connections, 0)
+        return {
+            "http2_enabled": self.http2_enabled,
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "tls_handshakes": self.tls_handshakes,
+            "http2_requests": self.http2_requests,
+            "reused_requests": reused,
+            "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+_metrics: Dict[str, ClientMetrics] = {}
+
+
+def get_client_metrics(name: str) -> ClientMetrics:
+    """获取（或创建）指定客户端的统计对象，客户端重建后统计保持累计"""
+    metrics = _metrics.get(name)
+    if metrics is None:
+        metrics = _metrics[name] = ClientMetrics(name)
+    return metrics
+
+
+def get_all_client_metrics() -> Dict[str, dict]:
+    return {name: metrics.to_dict() for name, metrics in _metrics.items()}
+
+
+def build_http_client(
+    name: str,
+    proxy: Optional[str],
+    timeout: float,
+    max_connections: int,
+    max_keepalive_connections: int,
+    http2: bool = False,
+) -> httpx.AsyncClient:
+    """构建 httpx 客户端（HTTP/2 依赖缺失时自动回退到 HTTP/1.1）"""
+    if http2 and not is_http2_available():
+        logger.warning(f"[HTTP] [{name}] 未安装 h2，HTTP/2 已回退为 HTTP/1.1（pip install httpx[http2]）")
+        http2 = False
+
+    metrics = get_client_metrics(name)
+    metrics.http2_enabled = http2
+    return httpx.AsyncClient(
+        proxy=(proxy or None),
+        verify=False,
+        http2=http2,
+        timeout=httpx.Timeout(timeout, connect=60.0),
+        limits=httpx.Limits(
+            max_keepalive_connections=min(max_keepalive_connections, max_connections),
+            max_connections=max_connections
+        ),
+        event_hooks={"request": [metrics.on_request]},
+    )
@@ -1,6 +1,13 @@
 """JWT管理模块
 
 负责JWT token的生成、刷新和管理
+
+- JWTManager: 单账户 JWT 缓存，采用 stale-while-revalidate：
+  进入提前刷新窗口后仍返回当前 token，并在后台刷新；只有 token 真正过期时请求才会等待刷新。
+  JWT 由 getoxsrf 返回的签名密钥（xsrfToken / keyId）在本地签发，密钥单独缓存，
+  只有密钥未知、超过有效期或上游返回 401 时才重新请求 getoxsrf
+- JWTRefresher: 后台任务，为最近使用过的账户在到期前（带随机抖动）提前刷新 JWT，
+  使对话请求的关键路径上不再出现 getoxsrf 往返
 """
 import asyncio
 import base64
@@ -8,17 +15,41 @@ import hashlib
 import hmac
 import json
 import logging
+import random
 import time
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
 
 import httpx
 from fastapi import HTTPException
 
 if TYPE_CHECKING:
+    from core.account import AccountManager
     from main import AccountConfig
 
 logger = logging.getLogger(__name__)
 
+# JWT 本地缓存有效期（秒，签发有效期为 300 秒，预留余量）
+JWT_TTL_SECONDS = 270
+# 签名密钥（getoxsrf）缓存有效期（秒），期间所有 JWT 均在本地签发
+JWT_KEY_TTL_SECONDS = 1800
+# 提前刷新窗口：距离过期不足该时间时后台刷新（秒）
+JWT_REFRESH_AHEAD_SECONDS = 60
+# 提前刷新时间的随机抖动上限（秒），避免大量账户同时刷新
+JWT_REFRESH_JITTER_SECONDS = 30
+# 仅为最近该时间内使用过的账户提前刷新（秒）
+JWT_ACTIVE_WINDOW_SECONDS = 900
+# 后台巡检间隔（秒）
+DEFAULT_JWT_REFRESH_INTERVAL_SECONDS = 10.0
+# 同时进行的后台刷新请求上限
+DEFAULT_JWT_REFRESH_CONCURRENCY = 4
+
+# 全局计数（所有账户累计）
+_counters = {
+    "key_fetches": 0,  # getoxsrf 请求次数
+    "local_mints": 0,  # 复用缓存密钥在本地签发的次数
+    "key_invalidations": 0,  # 因 401 等原因作废密钥的次数
+}
+
 
 def urlsafe_b64encode(data: bytes) -> str:
     return base64.urlsafe_b64encode(data).decode().rstrip("=")
@@ -63,22 +94,96 @@ class JWTManager:
         self.user_agent = user_agent
         self.jwt: str = ""
         self.expires: float = 0
+        self.refresh_at: float = 0  # 进入提前刷新窗口的时间（含抖动）
+        self.last_used: float = 0  # 最近一次被请求使用的时间
+        # 签名密钥缓存
+        self._key_bytes: Optional[bytes] = None
+        self._key_id: str = ""
+        self.key_expires: float = 0
         self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def has_valid_key(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return self._key_bytes is not None and now < self.key_expires
+
+    def invalidate(self) -> None:
+        """作废签名密钥与当前 JWT（上游返回 401 时调用），下次获取时重新请求 getoxsrf"""
+        if self._key_bytes is not None or self.jwt:
+            _counters["key_invalidations"] += 1
+        self._key_bytes = None
+        self._key_id = ""
+        self.key_expires = 0
+        self.jwt = ""
+        self.expires = 0
+        self.refresh_at = 0
+
+    def is_refresh_due(self, now: Optional[float] = None) -> bool:
+        """是否已进入提前刷新窗口（或已过期）"""
+        now = time.time() if now is None else now
+        return now >= self.refresh_at
+
+    async def get(self, request_id: str = "", touch: bool = True) -> str:
+        """获取JWT token（未过期时直接返回，进入刷新窗口时后台刷新，过期时等待刷新）
 
-    async def get(self, request_id: str = "") -> str:
-        """获取JWT token（自动刷新）"""
+        touch=False 用于后台调用（如会话预建），不计入最近使用时间，避免闲置账户被持续预刷新
+        """
+        now = time.time()
+        if touch:
+            self.last_used = now
+        if self.jwt and now <= self.expires:
+            if self.is_refresh_due(now):
+                self.refresh_in_background()
+            return self.jwt
         async with self._lock:
             if time.time() > self.expires:
                 await self._refresh(request_id)
             return self.jwt
 
+    def refresh_in_background(self) -> None:
+        """异步触发一次刷新（已在刷新中则跳过）"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh_if_due())
+
+    async def refresh_if_due(self) -> bool:
+        """进入刷新窗口时刷新（失败只记录日志，当前 token 在过期前仍可使用），返回是否已刷新"""
+        async with self._lock:
+            if not self.is_refresh_due():
+                return False
+            try:
+                await self._refresh()
+                return True
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else f"{type(e).__name__}: {str(e)[:100]}"
+                logger.warning(f"[AUTH] [{self.config.account_id}] JWT 后台刷新失败: {detail}")
+                return False
+
     async def _refresh(self, request_id: str = "") -> None:
-        """刷新JWT token"""
+        """刷新JWT token（密钥有效时本地签发，否则先获取密钥）"""
+        req_tag = f"[req_{request_id}] " if request_id else ""
+        if self.has_valid_key():
+            _counters["local_mints"] += 1
+            self._mint()
+            logger.debug(f"[AUTH] [{self.config.account_id}] {req_tag}JWT 已本地签发")
+            return
+
+        await self._fetch_key(request_id)
+        self._mint()
+        logger.info(f"[AUTH] [{self.config.account_id}] {req_tag}JWT 刷新成功")
+
+    def _mint(self) -> None:
+        self.jwt      = create_jwt(self._key_bytes, self._key_id, self.config.csesidx)
+        self.expires = time.time() + JWT_TTL_SECONDS
+        self.refresh_at = self.expires - JWT_REFRESH_AHEAD_SECONDS - random.uniform(0, JWT_REFRESH_JITTER_SECONDS)
+
+    async def _fetch_key(self, request_id: str = "") -> None:
+        """请求 getoxsrf 获取签名密钥"""
         cookie = f"__Secure-C_SES={self.config.secure_c_ses}"
         if self.config.host_c_oses:
             cookie += f"; __Host-C_OSES={self.config.host_c_oses}"
 
         req_tag = f"[req_{request_id}] " if request_id else ""
+        _counters["key_fetches"] += 1
         r = await self.http_client.get(
             "https://business.gemini.google/auth/getoxsrf",
             params={"csesidx": self.config.csesidx},
@@ -95,7 +200,72 @@ class JWTManager:
         txt = r.text[4:] if r.text.startswith(")]}'") else r.text
         data = json.loads(txt)
 
-        key_bytes = base64.urlsafe_b64decode(data["xsrfToken"] + "==")
-        self.jwt      = create_jwt(key_bytes, data["keyId"], self.config.csesidx)
-        self.expires = time.time() + 270
-        logger.info(f"[AUTH] [{self.config.account_id}] {req_tag}JWT 刷新成功")
+        self._key_bytes = base64.urlsafe_b64decode(data["xsrfToken"] + "==")
+        self._key_id = data["keyId"]
+        self.key_expires = time.time() + JWT_KEY_TTL_SECONDS
+
+class JWTRefresher:
+    """后台 JWT 预刷新任务
+
+    - 只处理最近使用过、已有 JWT 且状态健康的账户（闲置账户不产生上游请求）
+    - 每个 JWTManager 的刷新时间自带随机抖动，巡检时到期的账户按并发上限分批刷新
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_JWT_REFRESH_INTERVAL_SECONDS,
+        concurrency: int = DEFAULT_JWT_REFRESH_CONCURRENCY,
+        active_window: float = JWT_ACTIVE_WINDOW_SECONDS,
+    ) -> None:
+        self.interval = interval
+        self.active_window = active_window
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.refreshed = 0
+        self.failed = 0
+
+    def _due_managers(self, accounts: Iterable["AccountManager"], now: float) -> list:
+        due = []
+        for account in accounts:
+            manager = account.jwt_manager
+            if manager is None or not manager.jwt:
+                continue
+            if now - manager.last_used > self.active_window or not manager.is_refresh_due(now):
+                continue
+            if account.config.disabled or account.config.is_expired() or not account.should_retry():
+                continue
+            due.append(manager)
+        return due
+
+    async def _refresh(self, manager: JWTManager) -> None:
+        async with self._semaphore:
+            if await manager.refresh_if_due():
+                self.refreshed += 1
+            elif manager.is_refresh_due():
+                self.failed += 1
+
+    async def run_once(self, accounts: Iterable["AccountManager"]) -> int:
+        """刷新所有到期的活跃账户，返回处理的账户数"""
+        due = self._due_managers(accounts, time.time())
+        if due:
+            await asyncio.gather(*(self._refresh(manager) for manager in due))
+        return len(due)
+
+    async def run(self, get_accounts: Callable[[], Iterable["AccountManager"]]) -> None:
+        """后台任务：定期预刷新即将过期的 JWT"""
+        try:
+            while True:
+                try:
+                    await self.run_once(list(get_accounts()))
+                except Exception as e:
+                    # 单轮异常不终止任务，下一轮继续
+                    logger.error(f"[AUTH] JWT 预刷新任务异常: {type(e).__name__}: {str(e)[:100]}")
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            logger.info("[AUTH] JWT 预刷新任务已停止")
+
+    def get_stats(self) -> dict:
+        return {
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            **_counters,
+        }
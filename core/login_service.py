@@ -7,7 +7,7 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from typing import Any, Callable, Dict, List, Optional
 
-from core.account import load_accounts_from_source
+from core.account import load_account_record, load_accounts_from_source_async
 from core.base_task_service import BaseTask, BaseTaskService, TaskCancelledError, TaskStatus
 from core.config import config
 from core.mail_providers import create_temp_mail_client
@@ -135,8 +135,7 @@ class LoginService(BaseTaskService[LoginTask]):
 
     def _refresh_one(self, account_id: str, task: LoginTask) -> dict:
         """刷新单个账户"""
-        accounts = load_accounts_from_source()
-        account = next((acc for acc in accounts if acc.get("id") == account_id), None)
+        account = load_account_record(account_id)
         if not account:
             return {"success": False, "email": account_id, "error": "账号不存在"}
 
@@ -264,18 +263,12 @@ class LoginService(BaseTaskService[LoginTask]):
             config_data["mail_tenant"] = mail_tenant
         config_data["disabled"] = account.get("disabled", False)
 
-        for acc in accounts:
-            if acc.get("id") == account_id:
-                acc.update(config_data)
-                break
-
-        self._apply_accounts_update(accounts)
+        self._apply_account_upsert({**config_data, "id": account_id})
         log_cb("info", "✅ 配置已保存到数据库")
         return {"success": True, "email": account_id, "config": config_data}
 
 
-    def _get_expiring_accounts(self) -> List[str]:
-        accounts = load_accounts_from_source()
+    def _get_expiring_accounts(self, accounts: List[dict]) -> List[str]:
         expiring = []
         beijing_tz = timezone(timedelta(hours=8))
         now = datetime.now(beijing_tz)
@@ -325,7 +318,8 @@ class LoginService(BaseTaskService[LoginTask]):
         if os.environ.get("ACCOUNTS_CONFIG"):
             logger.info("[LOGIN] ACCOUNTS_CONFIG set, skipping refresh")
             return None
-        expiring_accounts = self._get_expiring_accounts()
+        accounts = await load_accounts_from_source_async()
+        expiring_accounts = self._get_expiring_accounts(accounts)
         if not expiring_accounts:
             logger.debug("[LOGIN] no accounts need refresh")
             return None
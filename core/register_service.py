@@ -6,7 +6,6 @@ import uuid
 from dataclasses import dataclass, field
 from typing import Any, Callable, Dict, List, Optional
 
-from core.account import load_accounts_from_source
 from core.base_task_service import BaseTask, BaseTaskService, TaskCancelledError, TaskStatus
 from core.config import config
 from core.mail_providers import create_temp_mail_client
@@ -238,17 +237,7 @@ class RegisterService(BaseTaskService[RegisterTask]):
         else:
             config_data["mail_password"] = getattr(client, "password", "")
 
-        accounts_data = load_accounts_from_source()
-        updated = False
-        for acc in accounts_data:
-            if acc.get("id") == config_data["id"]:
-                acc.update(config_data)
-                updated = True
-                break
-        if not updated:
-            accounts_data.append(config_data)
-
-        self._apply_accounts_update(accounts_data)
+        self._apply_account_upsert(config_data)
 
         log_cb("info", "✅ 配置已保存到数据库")
         log_cb("info", "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
@@ -0,0 +1,259 @@
+"""会话缓存模块
+
+对话指纹 → (账户, Google Session) 的绑定缓存，以及按对话串行化请求的锁。
+
+- SessionCache: 有序 LRU，get / put / touch / 淘汰均为 O(1)。
+  所有条目共用同一个 TTL，且写入和续期时都会移到队尾，
+  因此队列顺序就是过期顺序：队首即最早过期的条目，过期清理只需从队首弹出，
+  不必全量扫描或排序。
+- ConversationLocks: 每个对话一把锁，按持有者引用计数，最后一个持有者退出时回收，
+  锁的数量始终等于正在处理中的对话数。
+- SessionAffinityStore: 将缓存定期落盘（数据库或文件），重启后恢复，
+  避免已有对话全部重建 Session 并重发完整上下文。
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from core import storage
+from core.write_behind import WriteBehind
+
+logger = logging.getLogger(__name__)
+
+# 会话绑定落盘间隔（秒）
+DEFAULT_AFFINITY_FLUSH_INTERVAL_SECONDS = 30.0
+
+
+class SessionCache:
+    """对话会话绑定缓存（LRU + 统一TTL），ttl_seconds 为 0 表示禁用缓存"""
+
+    def __init__(self, max_size: int, ttl_seconds: int) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # {conv_key: {"account_id": str, "session_id": str, "updated_at": float}}，按 updated_at 升序
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # 超出容量被淘汰的条目数
+        self.expirations = 0  # 超过TTL被清理的条目数
+        self.version = 0  # 内容变化时递增（用于判断是否需要落盘）
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, conv_key: str) -> bool:
+        return self.get(conv_key, count=False) is not None
+
+    def _is_expired(self, entry: dict, now: float) -> bool:
+        return now - entry["updated_at"] > self.ttl_seconds
+
+    def configure(self, max_size: Optional[int] = None, ttl_seconds: Optional[int] = None) -> None:
+        """热更新容量与TTL（立即按新值清理）"""
+        if max_size is not None:
+            self.max_size = max_size
+        if ttl_seconds is not None:
+            self.ttl_seconds = ttl_seconds
+        self.expire()
+        self._evict_overflow()
+
+    def get(self, conv_key: str, count: bool = True) -> Optional[dict]:
+        """获取未过期的条目（过期条目顺带删除）"""
+        entry = self._entries.get(conv_key)
+        if entry is not None and self._is_expired(entry, time.time()):
+            del self._entries[conv_key]
+            self.expirations += 1
+            self.version += 1
+            entry = None
+        if count:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, conv_key: str, account_id: str, session_id: str) -> None:
+        """写入或覆盖绑定，并移到队尾"""
+        now = time.time()
+        self._entries[conv_key] = {
+            "account_id": account_id,
+            "session_id": session_id,
+            "updated_at": now,
+        }
+        self._entries.move_to_end(conv_key)
+        self.version += 1
+        self.expire(now)
+        self._evict_overflow()
+
+    def touch(self, conv_key: str) -> None:
+        """续期（对话继续时调用）"""
+        entry = self._entries.get(conv_key)
+        if entry is not None:
+            entry["updated_at"] = time.time()
+            self._entries.move_to_end(conv_key)
+            self.version += 1
+
+    def pop(self, conv_key: str) -> Optional[dict]:
+        entry = self._entries.pop(conv_key, None)
+        if entry is not None:
+            self.version += 1
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.version += 1
+
+    def drop_accounts(self, account_ids: Set[str]) -> int:
+        """删除绑定到指定账户的条目（账户被删除时调用），返回删除数量"""
+        if not account_ids:
+            return 0
+        stale = [key for key, entry in self._entries.items() if entry["account_id"] in account_ids]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self.version += 1
+        return len(stale)
+
+    def snapshot(self) -> List[list]:
+        """可序列化的条目快照 [[conv_key, account_id, session_id, updated_at], ...]"""
+        return [
+            [key, entry["account_id"], entry["session_id"], entry["updated_at"]]
+            for key, entry in self._entries.items()
+        ]
+
+    def restore(self, rows: Iterable[list], valid_account_ids: Set[str]) -> int:
+        """从快照恢复（跳过已过期或账户已不存在的条目），返回恢复数量"""
+        now = time.time()
+        restored = []
+        for row in rows:
+            try:
+                conv_key, account_id, session_id, updated_at = row
+                updated_at = float(updated_at)
+            except (TypeError, ValueError):
+                continue
+            if account_id not in valid_account_ids or now - updated_at > self.ttl_seconds:
+                continue
+            restored.append((updated_at, conv_key, account_id, session_id))
+        restored.sort()
+        for updated_at, conv_key, account_id, session_id in restored:
+            self._entries[conv_key] = {
+                "account_id": account_id,
+                "session_id": session_id,
+                "updated_at": updated_at,
+            }
+            self._entries.move_to_end(conv_key)
+        self.version += 1
+        self._evict_overflow()
+        return len(restored)
+
+    def items(self) -> List[tuple]:
+        """未过期条目的快照（按最近使用时间升序）"""
+        self.expire()
+        return list(self._entries.items())
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """从队首清理过期条目，返回清理数量"""
+        now = time.time() if now is None else now
+        removed = 0
+        entries = self._entries
+        while entries:
+            conv_key, entry = next(iter(entries.items()))
+            if not self._is_expired(entry, now):
+                break
+            del entries[conv_key]
+            removed += 1
+        if removed:
+            self.expirations += removed
+            self.version += 1
+        return removed
+
+    def _evict_overflow(self) -> None:
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            self.version += 1
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class ConversationLocks:
+    """按对话指纹分配的 asyncio 锁，引用计数归零时回收"""
+
+    def __init__(self) -> None:
+        # {conv_key: [lock, 持有或等待中的请求数]}
+        self._locks: Dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, conv_key: str) -> AsyncIterator[None]:
+        """串行化同一对话的请求：async with locks.hold(conv_key): ..."""
+        entry = self._locks.get(conv_key)
+        if entry is None:
+            entry = self._locks[conv_key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and self._locks.get(conv_key) is entry:
+                del self._locks[conv_key]
+
+
+class SessionAffinityStore:
+    """会话绑定持久化（脏版本 + 后台定时落盘，数据库优先，降级到文件，见 core.write_behind）"""
+
+    def __init__(
+        self,
+        cache: SessionCache,
+        affinity_file: str,
+        flush_interval: float = DEFAULT_AFFINITY_FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self.cache = cache
+        self.affinity_file = affinity_file
+        self._persistence = WriteBehind(
+            affinity_file,
+            load_db=storage.load_session_affinity_sync,
+            save_db=storage.save_session_affinity_sync,
+            snapshot=lambda: {"entries": cache.snapshot(), "saved_at": time.time()},
+            version=lambda: cache.version,
+            flush_interval=flush_interval,
+            tag="[CACHE]",
+            label="会话绑定",
+            # 先清理过期条目（会递增 version），再读取版本，避免下一轮重复写入相同快照
+            prepare=cache.expire,
+        )
+
+    async def load(self, valid_account_ids: Set[str]) -> int:
+        """恢复会话绑定（丢弃过期和账户已不存在的条目）"""
+        data = await self._persistence.read()
+        rows = (data or {}).get("entries") or []
+        restored = self.cache.restore(rows, valid_account_ids)
+        self._persistence.mark_clean()
+        return restored
+
+    async def flush(self, force: bool = False) -> None:
+        await self._persistence.flush(force)
+
+    def start(self) -> None:
+        """启动后台落盘任务"""
+        self._persistence.start()
+
+    async def close(self) -> None:
+        """停止后台任务并执行最后一次落盘"""
+        await self._persistence.close()
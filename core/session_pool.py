@@ -0,0 +1,183 @@
+"""会话预热池模块
+
+为每个健康账户在后台预先创建若干个未使用的 Google Session，
+新对话或账户切换时直接取用，省去一次 widgetCreateSession 往返；
+池为空时调用方再回退到同步创建。
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Awaitable, Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from core.account import AccountManager
+
+logger = logging.getLogger(__name__)
+
+# 后台巡检间隔（秒）
+DEFAULT_REFILL_INTERVAL_SECONDS = 30.0
+# 同时进行的补充请求上限（避免启动时对大量账户集中发起请求）
+DEFAULT_REFILL_CONCURRENCY = 4
+# 活跃窗口（秒）：只为窗口内取用过会话的账户在后台补足，避免为闲置账户持续创建会话
+DEFAULT_ACTIVE_WINDOW_SECONDS = 900
+
+
+class SessionPool:
+    """按账户维护的预建会话池
+
+    - take(): 非阻塞地取出一个未过期的会话，并异步触发补充
+    - run(): 后台任务，定期清理过期会话并为近期活跃的健康账户补足深度
+    - 条目记录创建时的 config_id，账户配置变化后旧会话自动作废
+    """
+
+    def __init__(
+        self,
+        create_session: Callable[["AccountManager"], Awaitable[str]],
+        size: int,
+        ttl_seconds: int,
+        refill_interval: float = DEFAULT_REFILL_INTERVAL_SECONDS,
+        refill_concurrency: int = DEFAULT_REFILL_CONCURRENCY,
+        active_window: float = DEFAULT_ACTIVE_WINDOW_SECONDS,
+    ) -> None:
+        self._create_session = create_session
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.refill_interval = refill_interval
+        self.active_window = active_window
+        # {account_id: deque[(session_name, config_id, created_at)]}
+        self._pools: Dict[str, Deque[Tuple[str, str, float]]] = {}
+        self._refilling: Set[str] = set()
+        # {account_id: 最近一次取用会话的时间}
+        self._last_taken: Dict[str, float] = {}
+        self._refill_semaphore = asyncio.Semaphore(refill_concurrency)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def configure(self, size: int, ttl_seconds: int) -> None:
+        """热更新池深度与TTL（多余的会话直接丢弃）"""
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        for pool in self._pools.values():
+            while len(pool) > max(size, 0):
+                pool.popleft()
+
+    def _is_fresh(self, created_at: float, now: float) -> bool:
+        return now - created_at < self.ttl_seconds
+
+    def _is_active(self, account_id: str, now: float) -> bool:
+        return now - self._last_taken.get(account_id, 0) <= self.active_window
+
+    def take(self, account: "AccountManager") -> Optional[str]:
+        """取出一个可用的预建会话，池为空时返回 None"""
+        if not self.enabled:
+            return None
+        account_id = account.config.account_id
+        pool = self._pools.get(account_id)
+        session_name = None
+        now = time.time()
+        self._last_taken[account_id] = now
+        while pool:
+            name, config_id, created_at = pool.pop()  # 优先取最新创建的
+            if config_id == account.config.config_id and self._is_fresh(created_at, now):
+                session_name = name
+                break
+        if session_name:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.schedule_refill(account)
+        return session_name
+
+    def schedule_refill(self, account: "AccountManager") -> None:
+        """异步补充指定账户的会话池（已在补充中则跳过）"""
+        account_id = account.config.account_id
+        if not self.enabled or account_id in self._refilling:
+            return
+        if len(self._pools.get(account_id) or ()) >= self.size:
+            return
+        self._refilling.add(account_id)
+        asyncio.create_task(self._refill(account))
+
+    async def _refill(self, account: "AccountManager") -> None:
+        account_id = account.config.account_id
+        try:
+            async with self._refill_semaphore:
+                pool = self._pools.setdefault(account_id, deque())
+                while len(pool) < self.size and _is_healthy(account):
+                    session_name = await self._create_session(account)
+                    pool.append((session_name, account.config.config_id, time.time()))
+                    # 等待期间账户可能已被移除
+                    if self._pools.get(account_id) is not pool:
+                        break
+        except Exception as e:
+            logger.warning(f"[SESSION-POOL] [{account_id}] 预建会话失败: {type(e).__name__}: {str(e)[:100]}")
+        finally:
+            self._refilling.discard(account_id)
+
+    def discard(self, account_id: str) -> None:
+        """丢弃指定账户的全部预建会话（账户失败或被删除时调用）"""
+        self._pools.pop(account_id, None)
+        self._last_taken.pop(account_id, None)
+
+    def prune(self, accounts: Iterable["AccountManager"]) -> None:
+        """清理过期会话，以及已不存在或配置已变化的账户"""
+        current = {account.config.account_id: account for account in accounts}
+        now = time.time()
+        for account_id in list(self._last_taken):
+            if account_id not in current:
+                del self._last_taken[account_id]
+        for account_id in list(self._pools):
+            account = current.get(account_id)
+            if account is None:
+                self.discard(account_id)
+                continue
+            pool = self._pools[account_id]
+            fresh = [
+                item for item in pool
+                if item[1] == account.config.config_id and self._is_fresh(item[2], now)
+            ]
+            if len(fresh) != len(pool):
+                pool.clear()
+                pool.extend(fresh)
+
+    async def run(self, get_accounts: Callable[[], Iterable["AccountManager"]]) -> None:
+        """后台任务：定期清理并为近期活跃的健康账户补足会话"""
+        try:
+            while True:
+                try:
+                    if self.enabled:
+                        accounts = list(get_accounts())
+                        self.prune(accounts)
+                        now = time.time()
+                        for account in accounts:
+                            if not _is_healthy(account):
+                                self.discard(account.config.account_id)
+                            elif self._is_active(account.config.account_id, now):
+                                self.schedule_refill(account)
+                except Exception as e:
+                    logger.error(f"[SESSION-POOL] 后台预建任务异常: {type(e).__name__}: {str(e)[:100]}")
+                await asyncio.sleep(self.refill_interval)
+        except asyncio.CancelledError:
+            logger.info("[SESSION-POOL] 后台预建任务已停止")
+
+    def get_stats(self) -> dict:
+        return {
+            "size": self.size,
+            "ttl_seconds": self.ttl_seconds,
+            "pooled": sum(len(pool) for pool in self._pools.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _is_healthy(account: "AccountManager") -> bool:
+    return (
+        account.should_retry()
+        and not account.config.is_expired()
+        and not account.config.disabled
+    )
@@ -0,0 +1,253 @@
+"""统计数据模块
+
+负责统计数据的内存维护与写回式（write-behind）持久化：
+请求路径只修改内存中的计数器并打脏标记，由后台任务定期将快照落盘。
+"""
+import logging
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from core import storage
+from core.write_behind import WriteBehind
+
+logger = logging.getLogger(__name__)
+
+# 后台落盘间隔（秒）
+DEFAULT_FLUSH_INTERVAL_SECONDS = 5.0
+
+# 时间序列分桶配置：按分钟保留最近 1 小时，按小时保留最近 48 小时
+MINUTE_BUCKET_SECONDS = 60
+MINUTE_BUCKETS = 60
+HOUR_BUCKET_SECONDS = 3600
+HOUR_BUCKETS = 48
+
+# 时间序列名称
+SERIES_REQUESTS = "requests"
+SERIES_FAILURES = "failures"
+SERIES_RATE_LIMITS = "rate_limits"
+SERIES_CLIENT_CANCELLED = "client_cancelled"
+MODEL_SERIES_PREFIX = "model:"
+ACCOUNT_SERIES_PREFIX = "account:"
+
+# 旧版统计数据中的原始时间戳字段（加载时迁移到分桶计数）
+_LEGACY_TIMESTAMP_SERIES = {
+    "request_timestamps": SERIES_REQUESTS,
+    "failure_timestamps": SERIES_FAILURES,
+    "rate_limit_timestamps": SERIES_RATE_LIMITS,
+}
+
+
+class CounterRing:
+    """定长计数环：按固定时间宽度分桶，槽位循环复用，内存占用恒定"""
+
+    __slots__ = ("width", "size", "_slots", "_counts")
+
+    def __init__(self, width: int, size: int) -> None:
+        self.width = width
+        self.size = size
+        self._slots = array("q", [-1]) * size  # 槽位当前对应的桶序号（ts // width）
+        self._counts = array("q", [0]) * size
+
+    def add(self, ts: float, n: int = 1) -> None:
+        index = int(ts // self.width)
+        pos = index % self.size
+        if self._slots[pos] != index:
+            if self._slots[pos] > index:
+                return  # 早于窗口的旧数据
+            self._slots[pos] = index
+            self._counts[pos] = n
+        else:
+            self._counts[pos] += n
+
+    def get(self, index: int) -> int:
+        pos = index % self.size
+        return self._counts[pos] if self._slots[pos] == index else 0
+
+    def window(self, start_index: int, count: int) -> List[int]:
+        """返回从 start_index 开始连续 count 个桶的计数"""
+        return [self.get(index) for index in range(start_index, start_index + count)]
+
+    def to_dict(self) -> dict:
+        return {
+            "width": self.width,
+            "buckets": [
+                [slot, count]
+                for slot, count in zip(self._slots, self._counts)
+                if slot >= 0 and count
+            ],
+        }
+
+    def load_dict(self, data: dict) -> None:
+        if not isinstance(data, dict) or data.get("width") != self.width:
+            return
+        for item in data.get("buckets") or []:
+            try:
+                index, count = int(item[0]), int(item[1])
+            except (TypeError, ValueError, IndexError):
+                continue
+            self.add(index * self.width, count)
+
+
+class MetricSeries:
+    """单个指标的时间序列（分钟环 + 小时环）"""
+
+    __slots__ = ("minutes", "hours")
+
+    def __init__(self) -> None:
+        self.minutes = CounterRing(MINUTE_BUCKET_SECONDS, MINUTE_BUCKETS)
+        self.hours = CounterRing(HOUR_BUCKET_SECONDS, HOUR_BUCKETS)
+
+    def add(self, ts: float, n: int = 1) -> None:
+        self.minutes.add(ts, n)
+        self.hours.add(ts, n)
+
+    def to_dict(self) -> dict:
+        return {"minutes": self.minutes.to_dict(), "hours": self.hours.to_dict()}
+
+    def load_dict(self, data: dict) -> None:
+        if not isinstance(data, dict):
+            return
+        self.minutes.load_dict(data.get("minutes"))
+        self.hours.load_dict(data.get("hours"))
+
+
+class MetricsRegistry:
+    """预聚合指标存储：每个序列固定大小，查询复杂度仅与桶数相关"""
+
+    def __init__(self) -> None:
+        self._series: Dict[str, MetricSeries] = {}
+
+    def record(self, name: str, ts: Optional[float] = None, n: int = 1) -> None:
+        series = self._series.get(name)
+        if series is None:
+            series = self._series[name] = MetricSeries()
+        series.add(time.time() if ts is None else ts, n)
+
+    def names(self, prefix: str = "") -> List[str]:
+        return [name for name in self._series if name.startswith(prefix)]
+
+    def hourly(self, name: str, start_ts: float, hours: int) -> List[int]:
+        """返回从 start_ts 所在小时开始的逐小时计数"""
+        series = self._series.get(name)
+        if series is None:
+            return [0] * hours
+        return series.hours.window(int(start_ts // HOUR_BUCKET_SECONDS), hours)
+
+    def recent(self, name: str, seconds: int = 60, now: Optional[float] = None) -> int:
+        """估算最近 seconds 秒内的计数（滑动窗口，最旧的桶按比例折算）"""
+        series = self._series.get(name)
+        if series is None:
+            return 0
+        now = time.time() if now is None else now
+        ring = series.minutes
+        current = int(now // ring.width)
+        full_buckets = min(seconds // ring.width, ring.size)
+        total = sum(ring.window(current - full_buckets + 1, full_buckets))
+        # 当前桶只走过了一部分，用更早一个桶的剩余比例补足窗口
+        elapsed = now - current * ring.width
+        total += ring.get(current - full_buckets) * (ring.width - elapsed) / ring.width
+        return int(round(total))
+
+    def to_dict(self) -> dict:
+        return {name: series.to_dict() for name, series in self._series.items()}
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "MetricsRegistry":
+        registry = cls()
+        if isinstance(data, dict):
+            for name, series_data in data.items():
+                series = registry._series[name] = MetricSeries()
+                series.load_dict(series_data)
+        return registry
+
+
+def default_stats() -> dict:
+    """返回空的统计数据结构"""
+    return {
+        "total_visitors": 0,
+        "total_requests": 0,
+        "metrics": MetricsRegistry(),
+        "visitor_ips": {},
+        "account_conversations": {},
+        "recent_conversations": []
+    }
+
+
+def _normalize(data: dict) -> dict:
+    """补全缺失字段，并将旧版原始时间戳迁移为分桶计数"""
+    normalized = default_stats()
+    normalized.update(data)
+    metrics = normalized["metrics"]
+    if not isinstance(metrics, MetricsRegistry):
+        metrics = normalized["metrics"] = MetricsRegistry.from_dict(metrics)
+
+    for key, series_name in _LEGACY_TIMESTAMP_SERIES.items():
+        for ts in normalized.pop(key, None) or []:
+            metrics.record(series_name, ts)
+    for model, timestamps in (normalized.pop("model_request_timestamps", None) or {}).items():
+        for ts in timestamps or []:
+            metrics.record(f"{MODEL_SERIES_PREFIX}{model}", ts)
+    return normalized
+
+
+def _snapshot_value(value: Any) -> Any:
+    """复制可变容器（在事件循环内执行，保证落盘线程读取的是一致快照）"""
+    if isinstance(value, MetricsRegistry):
+        return value.to_dict()
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return {k: _snapshot_value(v) for k, v in value.items()}
+    return value
+
+
+class StatsStore:
+    """统计数据存储（内存计数 + 脏标记 + 后台定时落盘）
+
+    - data: 统计数据字典，请求路径直接修改其中的计数器
+    - mark_dirty(): 修改后调用，仅递增版本号，不做任何 I/O
+    - flush(): 生成快照并在线程池中序列化、写入数据库或文件（见 core.write_behind）
+    """
+
+    def __init__(self, stats_file: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS) -> None:
+        self.stats_file = stats_file
+        self.data: dict = default_stats()
+        self._version = 0  # 每次修改递增
+        self._persistence = WriteBehind(
+            stats_file,
+            load_db=storage.load_stats_sync,
+            save_db=storage.save_stats_sync,
+            snapshot=lambda: _snapshot_value(self.data),
+            version=lambda: self._version,
+            flush_interval=flush_interval,
+            tag="[STATS]",
+            label="统计数据",
+        )
+
+    @property
+    def is_dirty(self) -> bool:
+        return self._persistence.is_dirty
+
+    def mark_dirty(self) -> None:
+        """标记统计数据已修改（等待后台落盘）"""
+        self._version += 1
+
+    async def load(self) -> dict:
+        """加载统计数据（原地更新 data，保持外部引用有效）"""
+        data = await self._persistence.read()
+        self.data.clear()
+        self.data.update(_normalize(data or {}))
+        self._persistence.mark_clean()
+        return self.data
+
+    async def flush(self, force: bool = False) -> None:
+        await self._persistence.flush(force)
+
+    def start(self) -> None:
+        """启动后台落盘任务"""
+        self._persistence.start()
+
+    async def close(self) -> None:
+        """停止后台任务并执行最后一次落盘"""
+        await self._persistence.close()
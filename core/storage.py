@@ -1,15 +1,29 @@
 """
-Storage abstraction supporting file and PostgreSQL backends.
+Storage abstraction supporting file, PostgreSQL and SQLite backends.
 
-If DATABASE_URL is set, PostgreSQL is used.
+If DATABASE_URL is set, a database is used:
+- sqlite:///data/gemini.db (relative) or sqlite:////data/gemini.db (absolute)
+  selects the embedded SQLite backend (WAL mode, no server required);
+- anything else is treated as a PostgreSQL connection string.
+
+All database work runs on a dedicated "storage-db-loop" thread that owns the
+asyncpg pool. The async functions below can be awaited from any event loop
+(e.g. FastAPI handlers) without blocking it; the *_sync wrappers block the
+calling thread and are meant only for worker threads (browser automation)
+and startup code that runs before the event loop.
 """
 
 import asyncio
+import functools
 import json
 import logging
 import os
+import sqlite3
 import threading
-from typing import Optional
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Awaitable, Callable, List, Optional
 
 from dotenv import load_dotenv
 
@@ -19,20 +33,68 @@ logger = logging.getLogger(__name__)
 
 _db_pool = None
 _db_pool_lock = None
+
+# Accounts are stored one row per account in the accounts table;
+# the legacy kv_store blob is migrated on startup.
+ACCOUNTS_LEGACY_KEY = "accounts"
+ACCOUNTS_BACKUP_KEY = "accounts_legacy"
+ACCOUNTS_VERSION_KEY = "accounts_version"
+
+# Account change feed: every account write publishes the changed ids
+# (PostgreSQL NOTIFY on ACCOUNTS_CHANNEL, SQLite rows in the ACCOUNT_CHANGES_STREAM log).
+# None instead of a list means "unknown / everything", e.g. a full replace.
+ACCOUNTS_CHANNEL = "accounts_changed"
+ACCOUNT_CHANGES_STREAM = "account_changes"
+ACCOUNT_CHANGES_KEEP = 1000
+# NOTIFY payloads are limited to 8000 bytes; larger id lists degrade to a full reload
+NOTIFY_PAYLOAD_LIMIT = 7000
+# Poll interval for the SQLite / file mtime watchers (seconds)
+ACCOUNT_CHANGE_POLL_SECONDS = 0.5
+# Liveness probe interval for the LISTEN connection (seconds)
+LISTEN_KEEPALIVE_SECONDS = 30
+LISTEN_MAX_RETRY_SECONDS = 60
+# Identifies this process so it can skip its own change events
+INSTANCE_ID = uuid.uuid4().hex
+# Accounts version marker most recently written by this process (see get_local_accounts_version)
+_local_accounts_version: Optional[float] = None
 _db_loop = None
 _db_thread = None
 _db_loop_lock = threading.Lock()
 
+SQLITE_URL_PREFIX = "sqlite:///"
+BACKEND_FILE = "file"
+BACKEND_POSTGRES = "postgres"
+BACKEND_SQLITE = "sqlite"
+_sqlite_conn: Optional[sqlite3.Connection] = None
+
 
 def _get_database_url() -> str:
     return os.environ.get("DATABASE_URL", "").strip()
 
 
 def is_database_enabled() -> bool:
-    """Return True when DATABASE_URL is configured."""
+    """Return True when DATABASE_URL is configured (PostgreSQL or SQLite)."""
     return bool(_get_database_url())
 
 
+def get_backend() -> str:
+    """Return the active backend: "postgres", "sqlite" or "file"."""
+    db_url = _get_database_url()
+    if not db_url:
+        return BACKEND_FILE
+    if db_url.startswith(SQLITE_URL_PREFIX):
+        return BACKEND_SQLITE
+    return BACKEND_POSTGRES
+
+
+def _is_sqlite() -> bool:
+    return get_backend() == BACKEND_SQLITE
+
+
+def _get_sqlite_path() -> str:
+    return _get_database_url()[len(SQLITE_URL_PREFIX):]
+
+
 def _ensure_db_loop() -> asyncio.AbstractEventLoop:
     global _db_loop, _db_thread
     if _db_loop and _db_thread and _db_thread.is_alive():
@@ -59,6 +121,22 @@ def _run_in_db_loop(coro):
     return future.result()
 
 
+def _on_db_loop(func):
+    """Run the decorated coroutine on the storage loop (the pool is bound to it).
+
+    Awaiting it from another event loop only waits on a future, so the caller's
+    loop keeps serving other requests during the database round-trip.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = _ensure_db_loop()
+        coro = func(*args, **kwargs)
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+    return wrapper
+
+
 async def _get_pool():
     """Get (or create) the asyncpg connection pool."""
     global _db_pool, _db_pool_lock
@@ -103,11 +181,310 @@ async def _init_tables(pool) -> None:
             )
             """
         )
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS accounts (
+                id TEXT PRIMARY KEY,
+                position BIGINT NOT NULL,
+                data JSONB NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS logs (
+                id BIGSERIAL PRIMARY KEY,
+                stream TEXT NOT NULL,
+                data JSONB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        await conn.execute("CREATE INDEX IF NOT EXISTS logs_stream_id ON logs (stream, id)")
+        await _migrate_accounts_blob(conn)
         logger.info("[STORAGE] Database tables initialized")
 
 
+async def _migrate_accounts_blob(conn) -> None:
+    """Move the legacy kv_store "accounts" blob into the accounts table (one row per account).
+
+    The blob is kept under "accounts_legacy" so it is never migrated twice.
+    """
+    async with conn.transaction():
+        row = await conn.fetchrow(
+            "SELECT value FROM kv_store WHERE key = $1 FOR UPDATE", ACCOUNTS_LEGACY_KEY
+        )
+        if not row:
+            return
+        value = row["value"]
+        accounts = json.loads(value) if isinstance(value, str) else value
+        existing = await conn.fetchval("SELECT COUNT(*) FROM accounts")
+        if existing:
+            logger.warning("[STORAGE] accounts table is not empty, skipping legacy blob migration")
+        else:
+            rows = [
+                (account_id, position, json.dumps(acc, ensure_ascii=False))
+                for position, (account_id, acc) in enumerate(_with_ids(accounts or []))
+            ]
+            await conn.executemany(
+                "INSERT INTO accounts (id, position, data) VALUES ($1, $2, $3) ON CONFLICT (id) DO NOTHING",
+                rows,
+            )
+            logger.info(f"[STORAGE] Migrated {len(rows)} accounts from kv_store blob to accounts table")
+        await conn.execute(
+            "UPDATE kv_store SET key = $2 WHERE key = $1", ACCOUNTS_LEGACY_KEY, ACCOUNTS_BACKUP_KEY
+        )
+        await _touch_accounts_version(conn)
+
+
+def _with_ids(accounts: list) -> list:
+    """Pair each account with its id (accounts without an id get the positional account_N id)."""
+    pairs = []
+    for index, acc in enumerate(accounts, 1):
+        account_id = acc.get("id") or f"account_{index}"
+        pairs.append((account_id, {**acc, "id": account_id}))
+    return pairs
+
+
+def _change_payload(account_ids: Optional[list]) -> str:
+    ids = list(dict.fromkeys(account_ids)) if account_ids is not None else None
+    payload = json.dumps({"ids": ids, "origin": INSTANCE_ID}, ensure_ascii=False)
+    if ids is not None and len(payload.encode("utf-8")) > NOTIFY_PAYLOAD_LIMIT:
+        payload = json.dumps({"ids": None, "origin": INSTANCE_ID})
+    return payload
+
+
+async def _touch_accounts_version(conn, account_ids: Optional[list] = None) -> None:
+    """Bump the accounts version marker (read by get_accounts_updated_at) and notify listeners.
+
+    The notification is delivered when the surrounding transaction commits.
+    """
+    global _local_accounts_version
+    await conn.execute("SELECT pg_notify($1, $2)", ACCOUNTS_CHANNEL, _change_payload(account_ids))
+    version = await conn.fetchval(
+        """
+        INSERT INTO kv_store (key, value, updated_at)
+        VALUES ($1, '{}'::jsonb, CURRENT_TIMESTAMP)
+        ON CONFLICT (key) DO UPDATE SET updated_at = CURRENT_TIMESTAMP
+        RETURNING EXTRACT(EPOCH FROM updated_at)
+        """,
+        ACCOUNTS_VERSION_KEY,
+    )
+    _local_accounts_version = float(version)
+
+
+# ==================== SQLite backend ====================
+# The connection is only used from the storage-db-loop thread (every public
+# function runs there), so SQLite sees a single writer and needs no extra locking.
+# Autocommit mode; multi-statement writes use explicit BEGIN IMMEDIATE transactions.
+
+def _get_sqlite() -> sqlite3.Connection:
+    global _sqlite_conn
+    if _sqlite_conn is not None:
+        return _sqlite_conn
+    path = _get_sqlite_path()
+    if not path:
+        raise ValueError("DATABASE_URL sqlite path is empty")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS kv_store (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS accounts (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stream TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS logs_stream_id ON logs (stream, id);
+        """
+    )
+    _sqlite_conn = conn
+    logger.info(f"[STORAGE] SQLite database initialized: {path} (WAL)")
+    return conn
+
+
+@contextmanager
+def _sqlite_transaction():
+    conn = _get_sqlite()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        # COMMIT 失败（如 SQLITE_BUSY）时事务仍处于打开状态，同样需要回滚
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+def _sqlite_kv_get(key: str) -> Optional[dict]:
+    row = _get_sqlite().execute("SELECT value FROM kv_store WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _sqlite_kv_set(conn: sqlite3.Connection, key: str, value: dict, updated_at: Optional[float] = None) -> None:
+    conn.execute(
+        """
+        INSERT INTO kv_store (key, value, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """,
+        (key, json.dumps(value, ensure_ascii=False), time.time() if updated_at is None else updated_at),
+    )
+
+
+def _sqlite_insert_log(conn: sqlite3.Connection, stream: str, entry: dict, keep: int) -> None:
+    conn.execute(
+        "INSERT INTO logs (stream, data, created_at) VALUES (?, ?, ?)",
+        (stream, json.dumps(entry, ensure_ascii=False), time.time()),
+    )
+    conn.execute(
+        """
+        DELETE FROM logs WHERE stream = ? AND id <= (
+            SELECT id FROM logs WHERE stream = ? ORDER BY id DESC LIMIT 1 OFFSET ?
+        )
+        """,
+        (stream, stream, keep),
+    )
+
+
+def _sqlite_touch_accounts_version(conn: sqlite3.Connection, account_ids: Optional[list] = None) -> None:
+    global _local_accounts_version
+    version = time.time()
+    _sqlite_kv_set(conn, ACCOUNTS_VERSION_KEY, {}, version)
+    _local_accounts_version = version
+    _sqlite_insert_log(conn, ACCOUNT_CHANGES_STREAM, json.loads(_change_payload(account_ids)), ACCOUNT_CHANGES_KEEP)
+
+
+def _sqlite_load_accounts() -> list:
+    rows = _get_sqlite().execute("SELECT data FROM accounts ORDER BY position, id").fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+
+def _sqlite_load_account(account_id: str) -> Optional[dict]:
+    row = _get_sqlite().execute("SELECT data FROM accounts WHERE id = ?", (account_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _sqlite_get_accounts_updated_at() -> Optional[float]:
+    row = _get_sqlite().execute(
+        "SELECT updated_at FROM kv_store WHERE key = ?", (ACCOUNTS_VERSION_KEY,)
+    ).fetchone()
+    return float(row[0]) if row else None
+
+
+def _sqlite_save_accounts(accounts: list) -> None:
+    pairs = _with_ids(accounts)
+    keep_ids = {account_id for account_id, _ in pairs}
+    now = time.time()
+    with _sqlite_transaction() as conn:
+        existing = [row[0] for row in conn.execute("SELECT id FROM accounts")]
+        conn.executemany(
+            "DELETE FROM accounts WHERE id = ?",
+            [(account_id,) for account_id in existing if account_id not in keep_ids],
+        )
+        conn.executemany(
+            """
+            INSERT INTO accounts (id, position, data, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                position = excluded.position,
+                data = excluded.data,
+                updated_at = excluded.updated_at
+            WHERE accounts.data IS NOT excluded.data
+               OR accounts.position IS NOT excluded.position
+            """,
+            [
+                (account_id, position, json.dumps(acc, ensure_ascii=False), now)
+                for position, (account_id, acc) in enumerate(pairs)
+            ],
+        )
+        _sqlite_touch_accounts_version(conn)
+
+
+def _sqlite_upsert_account(account: dict) -> dict:
+    now = time.time()
+    with _sqlite_transaction() as conn:
+        row = conn.execute("SELECT data FROM accounts WHERE id = ?", (account["id"],)).fetchone()
+        if row:
+            record = {**json.loads(row[0]), **account}
+            conn.execute(
+                "UPDATE accounts SET data = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(record, ensure_ascii=False), now, account["id"]),
+            )
+        else:
+            record = dict(account)
+            conn.execute(
+                """
+                INSERT INTO accounts (id, position, data, updated_at)
+                VALUES (?, (SELECT COALESCE(MAX(position) + 1, 0) FROM accounts), ?, ?)
+                """,
+                (account["id"], json.dumps(record, ensure_ascii=False), now),
+            )
+        _sqlite_touch_accounts_version(conn, [account["id"]])
+    return record
+
+
+def _sqlite_patch_accounts(account_ids: list, fields: dict) -> int:
+    now = time.time()
+    count = 0
+    with _sqlite_transaction() as conn:
+        for account_id in dict.fromkeys(account_ids):
+            row = conn.execute("SELECT data FROM accounts WHERE id = ?", (account_id,)).fetchone()
+            if not row:
+                continue
+            record = {**json.loads(row[0]), **fields}
+            conn.execute(
+                "UPDATE accounts SET data = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(record, ensure_ascii=False), now, account_id),
+            )
+            count += 1
+        _sqlite_touch_accounts_version(conn, list(account_ids))
+    return count
+
+
+def _sqlite_delete_accounts(account_ids: list) -> list:
+    deleted = []
+    with _sqlite_transaction() as conn:
+        for account_id in dict.fromkeys(account_ids):
+            if conn.execute("DELETE FROM accounts WHERE id = ?", (account_id,)).rowcount:
+                deleted.append(account_id)
+        _sqlite_touch_accounts_version(conn, deleted)
+    return deleted
+
+
+def _sqlite_append_log(stream: str, entry: dict, keep: int) -> None:
+    with _sqlite_transaction() as conn:
+        _sqlite_insert_log(conn, stream, entry, keep)
+
+
+def _sqlite_load_log(stream: str, limit: int) -> list:
+    rows = _get_sqlite().execute(
+        "SELECT data FROM logs WHERE stream = ? ORDER BY id DESC LIMIT ?", (stream, limit)
+    ).fetchall()
+    return [json.loads(row[0]) for row in reversed(rows)]
+
+
+# ==================== Key/value storage ====================
+
+@_on_db_loop
 async def db_get(key: str) -> Optional[dict]:
     """Fetch a value from the database."""
+    if _is_sqlite():
+        return _sqlite_kv_get(key)
     pool = await _get_pool()
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
@@ -121,8 +498,12 @@ async def db_get(key: str) -> Optional[dict]:
         return value
 
 
+@_on_db_loop
 async def db_set(key: str, value: dict) -> None:
     """Persist a value to the database."""
+    if _is_sqlite():
+        _sqlite_kv_set(_get_sqlite(), key, value)
+        return
     pool = await _get_pool()
     async with pool.acquire() as conn:
         await conn.execute(
@@ -140,6 +521,11 @@ async def db_set(key: str, value: dict) -> None:
 
 # ==================== Accounts storage ====================
 
+def _decode_row(value) -> dict:
+    return json.loads(value) if isinstance(value, str) else value
+
+
+@_on_db_loop
 async def load_accounts() -> Optional[list]:
     """
     Load account configuration from database when enabled.
@@ -148,17 +534,41 @@ async def load_accounts() -> Optional[list]:
     if not is_database_enabled():
         return None
     try:
-        data = await db_get("accounts")
+        if _is_sqlite():
+            data = _sqlite_load_accounts()
+        else:
+            pool = await _get_pool()
+            async with pool.acquire() as conn:
+                rows = await conn.fetch("SELECT data FROM accounts ORDER BY position, id")
+            data = [_decode_row(row["data"]) for row in rows]
         if data:
             logger.info(f"[STORAGE] Loaded {len(data)} accounts from database")
-            return data
-        logger.info("[STORAGE] No accounts found in database")
-        return []
+        else:
+            logger.info("[STORAGE] No accounts found in database")
+        return data
     except Exception as e:
         logger.error(f"[STORAGE] Database read failed: {e}")
     return None
 
 
+@_on_db_loop
+async def load_account(account_id: str) -> Optional[dict]:
+    """Load a single account row (None when missing or database disabled)."""
+    if not is_database_enabled():
+        return None
+    try:
+        if _is_sqlite():
+            return _sqlite_load_account(account_id)
+        pool = await _get_pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow("SELECT data FROM accounts WHERE id = $1", account_id)
+        return _decode_row(row["data"]) if row else None
+    except Exception as e:
+        logger.error(f"[STORAGE] Database account read failed: {e}")
+    return None
+
+
+@_on_db_loop
 async def get_accounts_updated_at() -> Optional[float]:
     """
     Get the accounts updated_at timestamp (epoch seconds).
@@ -167,11 +577,13 @@ async def get_accounts_updated_at() -> Optional[float]:
     if not is_database_enabled():
         return None
     try:
+        if _is_sqlite():
+            return _sqlite_get_accounts_updated_at()
         pool = await _get_pool()
         async with pool.acquire() as conn:
             row = await conn.fetchrow(
                 "SELECT EXTRACT(EPOCH FROM updated_at) AS ts FROM kv_store WHERE key = $1",
-                "accounts",
+                ACCOUNTS_VERSION_KEY,
             )
             if not row or row["ts"] is None:
                 return None
@@ -186,12 +598,50 @@ def get_accounts_updated_at_sync() -> Optional[float]:
     return _run_in_db_loop(get_accounts_updated_at())
 
 
+def get_local_accounts_version() -> Optional[float]:
+    """
+    Return the accounts version marker last written by this process (None if it has not written yet).
+    When it equals get_accounts_updated_at(), the latest account change is our own and
+    the in-memory accounts are already up to date.
+    """
+    return _local_accounts_version
+
+
+@_on_db_loop
 async def save_accounts(accounts: list) -> bool:
-    """Save account configuration to database when enabled."""
+    """Replace the whole account list (rows not in the list are deleted)."""
     if not is_database_enabled():
         return False
     try:
-        await db_set("accounts", accounts)
+        if _is_sqlite():
+            _sqlite_save_accounts(accounts)
+            logger.info(f"[STORAGE] Saved {len(accounts)} accounts to database")
+            return True
+        pairs = _with_ids(accounts)
+        pool = await _get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "DELETE FROM accounts WHERE NOT (id = ANY($1::text[]))",
+                    [account_id for account_id, _ in pairs],
+                )
+                await conn.executemany(
+                    """
+                    INSERT INTO accounts (id, position, data, updated_at)
+                    VALUES ($1, $2, $3, CURRENT_TIMESTAMP)
+                    ON CONFLICT (id) DO UPDATE SET
+                        position = EXCLUDED.position,
+                        data = EXCLUDED.data,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE accounts.data IS DISTINCT FROM EXCLUDED.data
+                       OR accounts.position IS DISTINCT FROM EXCLUDED.position
+                    """,
+                    [
+                        (account_id, position, json.dumps(acc, ensure_ascii=False))
+                        for position, (account_id, acc) in enumerate(pairs)
+                    ],
+                )
+                await _touch_accounts_version(conn)
         logger.info(f"[STORAGE] Saved {len(accounts)} accounts to database")
         return True
     except Exception as e:
@@ -199,18 +649,113 @@ async def save_accounts(accounts: list) -> bool:
     return False
 
 
+@_on_db_loop
+async def upsert_account(account: dict) -> Optional[dict]:
+    """Insert an account or merge fields into the existing row; return the stored record."""
+    if not is_database_enabled():
+        return None
+    try:
+        if _is_sqlite():
+            return _sqlite_upsert_account(account)
+        pool = await _get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    """
+                    INSERT INTO accounts (id, position, data, updated_at)
+                    VALUES ($1, (SELECT COALESCE(MAX(position) + 1, 0) FROM accounts), $2, CURRENT_TIMESTAMP)
+                    ON CONFLICT (id) DO UPDATE SET
+                        data = accounts.data || EXCLUDED.data,
+                        updated_at = CURRENT_TIMESTAMP
+                    RETURNING data
+                    """,
+                    account["id"],
+                    json.dumps(account, ensure_ascii=False),
+                )
+                await _touch_accounts_version(conn, [account["id"]])
+        return _decode_row(row["data"])
+    except Exception as e:
+        logger.error(f"[STORAGE] Database account upsert failed: {e}")
+    return None
+
+
+@_on_db_loop
+async def patch_accounts(account_ids: list, fields: dict) -> Optional[int]:
+    """Merge fields into the given account rows; return the number of rows updated."""
+    if not is_database_enabled():
+        return None
+    try:
+        if _is_sqlite():
+            return _sqlite_patch_accounts(account_ids, fields)
+        pool = await _get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                result = await conn.execute(
+                    """
+                    UPDATE accounts SET data = data || $2::jsonb, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ANY($1::text[])
+                    """,
+                    list(account_ids),
+                    json.dumps(fields, ensure_ascii=False),
+                )
+                await _touch_accounts_version(conn, list(account_ids))
+        return int(result.split()[-1])
+    except Exception as e:
+        logger.error(f"[STORAGE] Database account patch failed: {e}")
+    return None
+
+
+@_on_db_loop
+async def delete_accounts(account_ids: list) -> Optional[list]:
+    """Delete the given account rows; return the ids that were actually deleted."""
+    if not is_database_enabled():
+        return None
+    try:
+        if _is_sqlite():
+            return _sqlite_delete_accounts(account_ids)
+        pool = await _get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    "DELETE FROM accounts WHERE id = ANY($1::text[]) RETURNING id",
+                    list(account_ids),
+                )
+                await _touch_accounts_version(conn, [row["id"] for row in rows])
+        return [row["id"] for row in rows]
+    except Exception as e:
+        logger.error(f"[STORAGE] Database account delete failed: {e}")
+    return None
+
+
 def load_accounts_sync() -> Optional[list]:
     """Sync wrapper for load_accounts (safe in sync/async call sites)."""
     return _run_in_db_loop(load_accounts())
 
 
+def load_account_sync(account_id: str) -> Optional[dict]:
+    return _run_in_db_loop(load_account(account_id))
+
+
 def save_accounts_sync(accounts: list) -> bool:
     """Sync wrapper for save_accounts (safe in sync/async call sites)."""
     return _run_in_db_loop(save_accounts(accounts))
 
 
+def upsert_account_sync(account: dict) -> Optional[dict]:
+    return _run_in_db_loop(upsert_account(account))
+
+
+def patch_accounts_sync(account_ids: list, fields: dict) -> Optional[int]:
+    return _run_in_db_loop(patch_accounts(account_ids, fields))
+
+
+def delete_accounts_sync(account_ids: list) -> Optional[list]:
+    return _run_in_db_loop(delete_accounts(account_ids))
+
+
 # ==================== Settings storage ====================
 
+@_on_db_loop
 async def load_settings() -> Optional[dict]:
     if not is_database_enabled():
         return None
@@ -221,6 +766,7 @@ async def load_settings() -> Optional[dict]:
     return None
 
 
+@_on_db_loop
 async def save_settings(settings: dict) -> bool:
     if not is_database_enabled():
         return False
@@ -235,6 +781,7 @@ async def save_settings(settings: dict) -> bool:
 
 # ==================== Stats storage ====================
 
+@_on_db_loop
 async def load_stats() -> Optional[dict]:
     if not is_database_enabled():
         return None
@@ -245,6 +792,7 @@ async def load_stats() -> Optional[dict]:
     return None
 
 
+@_on_db_loop
 async def save_stats(stats: dict) -> bool:
     if not is_database_enabled():
         return False
@@ -270,3 +818,256 @@ def load_stats_sync() -> Optional[dict]:
 
 def save_stats_sync(stats: dict) -> bool:
     return _run_in_db_loop(save_stats(stats))
+
+
+# ==================== Session affinity storage ====================
+
+@_on_db_loop
+async def load_session_affinity() -> Optional[dict]:
+    if not is_database_enabled():
+        return None
+    try:
+        return await db_get("session_affinity")
+    except Exception as e:
+        logger.error(f"[STORAGE] Session affinity read failed: {e}")
+    return None
+
+
+@_on_db_loop
+async def save_session_affinity(data: dict) -> bool:
+    if not is_database_enabled():
+        return False
+    try:
+        await db_set("session_affinity", data)
+        return True
+    except Exception as e:
+        logger.error(f"[STORAGE] Session affinity write failed: {e}")
+    return False
+
+
+def load_session_affinity_sync() -> Optional[dict]:
+    return _run_in_db_loop(load_session_affinity())
+
+
+def save_session_affinity_sync(data: dict) -> bool:
+    return _run_in_db_loop(save_session_affinity(data))
+
+
+# ==================== Append-only logs ====================
+# Bounded per-stream histories (e.g. uptime heartbeats): each append is a single
+# row insert plus an index-range trim, instead of rewriting the whole history.
+
+@_on_db_loop
+async def append_log(stream: str, entry: dict, keep: int) -> bool:
+    """Append an entry to a stream, keeping only the newest `keep` entries."""
+    if not is_database_enabled():
+        return False
+    try:
+        if _is_sqlite():
+            _sqlite_append_log(stream, entry, keep)
+            return True
+        pool = await _get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "INSERT INTO logs (stream, data) VALUES ($1, $2)",
+                    stream,
+                    json.dumps(entry, ensure_ascii=False),
+                )
+                await conn.execute(
+                    """
+                    DELETE FROM logs WHERE stream = $1 AND id <= (
+                        SELECT id FROM logs WHERE stream = $1 ORDER BY id DESC LIMIT 1 OFFSET $2
+                    )
+                    """,
+                    stream,
+                    keep,
+                )
+        return True
+    except Exception as e:
+        logger.error(f"[STORAGE] Log append failed: {e}")
+    return False
+
+
+@_on_db_loop
+async def load_log(stream: str, limit: int) -> Optional[list]:
+    """Load the newest `limit` entries of a stream (oldest first)."""
+    if not is_database_enabled():
+        return None
+    try:
+        if _is_sqlite():
+            return _sqlite_load_log(stream, limit)
+        pool = await _get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT data FROM logs WHERE stream = $1 ORDER BY id DESC LIMIT $2", stream, limit
+            )
+        return [_decode_row(row["data"]) for row in reversed(rows)]
+    except Exception as e:
+        logger.error(f"[STORAGE] Log read failed: {e}")
+    return None
+
+
+def append_log_nowait(stream: str, entry: dict, keep: int) -> None:
+    """Schedule append_log on the storage loop without waiting (for hot sync paths)."""
+    asyncio.run_coroutine_threadsafe(append_log(stream, entry, keep), _ensure_db_loop())
+
+
+def load_log_sync(stream: str, limit: int) -> Optional[list]:
+    return _run_in_db_loop(load_log(stream, limit))
+
+
+# ==================== Account change feed ====================
+
+AccountChangeHandler = Callable[[Optional[List[str]]], Awaitable[None]]
+
+
+def _parse_change(payload) -> tuple:
+    """Return (is_foreign, ids) for a change event; events written by this process are not foreign."""
+    try:
+        data = json.loads(payload) if isinstance(payload, str) else payload
+    except (TypeError, ValueError):
+        return True, None
+    if not isinstance(data, dict):
+        return True, None
+    if data.get("origin") == INSTANCE_ID:
+        return False, None
+    ids = data.get("ids")
+    return True, (list(ids) if isinstance(ids, list) else None)
+
+
+def _merge_changes(changes: List[Optional[List[str]]]) -> Optional[List[str]]:
+    """Combine several change events; any unknown (None) change set makes the result unknown."""
+    merged: List[str] = []
+    for ids in changes:
+        if ids is None:
+            return None
+        merged.extend(ids)
+    return list(dict.fromkeys(merged))
+
+
+async def watch_account_changes(on_change: AccountChangeHandler) -> None:
+    """Await on_change(ids) for account changes made by other processes, until cancelled.
+
+    ids lists the changed (added, updated or deleted) account ids, or is None when
+    the change set is unknown and everything should be re-read. Must be awaited
+    from the consumer's event loop; events that arrive while on_change runs are merged.
+    """
+    backend = get_backend()
+    if backend == BACKEND_POSTGRES:
+        await _watch_postgres(on_change)
+    elif backend == BACKEND_SQLITE:
+        await _watch_sqlite(on_change)
+
+
+async def _watch_postgres(on_change: AccountChangeHandler) -> None:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def deliver(ids: Optional[List[str]]) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, ids)
+
+    listener = asyncio.run_coroutine_threadsafe(_pg_listen(deliver), _ensure_db_loop())
+    try:
+        while True:
+            changes = [await queue.get()]
+            while not queue.empty():
+                changes.append(queue.get_nowait())
+            await on_change(_merge_changes(changes))
+    finally:
+        listener.cancel()
+
+
+async def _pg_listen(deliver: Callable[[Optional[List[str]]], None]) -> None:
+    """Hold a dedicated LISTEN connection (runs on the storage loop), reconnecting with backoff.
+
+    Notifications sent while disconnected are lost, so every reconnect delivers None.
+    """
+    import asyncpg
+
+    def on_notify(connection, pid, channel, payload) -> None:
+        foreign, ids = _parse_change(payload)
+        if foreign:
+            deliver(ids)
+
+    retry_delay = 1
+    connected_before = False
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(_get_database_url())
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda connection: closed.set())
+            await conn.add_listener(ACCOUNTS_CHANNEL, on_notify)
+            logger.info("[STORAGE] Listening for account changes")
+            if connected_before:
+                deliver(None)
+            connected_before = True
+            retry_delay = 1
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), LISTEN_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    await conn.execute("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[STORAGE] Account change listener disconnected: {e}")
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(retry_delay)
+        retry_delay = min(retry_delay * 2, LISTEN_MAX_RETRY_SECONDS)
+
+
+def _sqlite_mtime(path: str) -> tuple:
+    """Commits touch the WAL file (and the main file on checkpoint)."""
+    stamps = []
+    for name in (path, f"{path}-wal"):
+        try:
+            stamps.append(os.stat(name).st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return tuple(stamps)
+
+
+@_on_db_loop
+async def _read_account_changes(after_id: int) -> tuple:
+    """Return (last_id, ids) for SQLite change rows after after_id (ids None if rows were trimmed)."""
+    conn = _get_sqlite()
+    latest = conn.execute(
+        "SELECT COALESCE(MAX(id), 0) FROM logs WHERE stream = ?", (ACCOUNT_CHANGES_STREAM,)
+    ).fetchone()[0]
+    if after_id and latest > after_id and not conn.execute(
+        "SELECT 1 FROM logs WHERE id = ?", (after_id,)
+    ).fetchone():
+        return latest, None
+    rows = conn.execute(
+        "SELECT id, data FROM logs WHERE stream = ? AND id > ? ORDER BY id",
+        (ACCOUNT_CHANGES_STREAM, after_id),
+    ).fetchall()
+    changes = []
+    for _, data in rows:
+        foreign, ids = _parse_change(data)
+        if foreign:
+            changes.append(ids)
+    return (rows[-1][0] if rows else after_id), (_merge_changes(changes) if changes else [])
+
+
+async def _watch_sqlite(on_change: AccountChangeHandler) -> None:
+    path = _get_sqlite_path()
+    last_id, _ = await _read_account_changes(0)
+    last_mtime = _sqlite_mtime(path)
+    while True:
+        await asyncio.sleep(ACCOUNT_CHANGE_POLL_SECONDS)
+        mtime = _sqlite_mtime(path)
+        if mtime == last_mtime:
+            continue
+        last_mtime = mtime
+        try:
+            last_id, ids = await _read_account_changes(last_id)
+        except Exception as e:
+            logger.error(f"[STORAGE] Account change read failed: {e}")
+            continue
+        if ids is None or ids:
+            await on_change(ids)
@@ -1,5 +1,7 @@
 """
 Uptime 实时监控与心跳历史持久化。
+
+启用数据库时每次心跳只追加一行（后台写入，不阻塞请求），否则整体写入 uptime.json。
 """
 
 from collections import deque
@@ -9,11 +11,15 @@ import json
 import os
 from threading import Lock
 
+from core import storage
+
 # 北京时区 UTC+8
 BEIJING_TZ = timezone(timedelta(hours=8))
 
 # 每个服务保留最近 60 条心跳
 MAX_HEARTBEATS = 60
+# 数据库中心跳记录的 stream 前缀
+HEARTBEAT_STREAM_PREFIX = "uptime:"
 SLOW_THRESHOLD_MS = 40000
 WARNING_STATUS_CODES = {429}
 
@@ -70,7 +76,23 @@ def _save_heartbeats() -> None:
         return
 
 
+def _load_heartbeats_from_database() -> bool:
+    loaded = {}
+    for service_id in SERVICES:
+        heartbeats = storage.load_log_sync(f"{HEARTBEAT_STREAM_PREFIX}{service_id}", MAX_HEARTBEATS)
+        if heartbeats is None:
+            return False
+        loaded[service_id] = heartbeats
+    for service_id, heartbeats in loaded.items():
+        SERVICES[service_id]["heartbeats"].clear()
+        SERVICES[service_id]["heartbeats"].extend(heartbeats)
+    return True
+
+
 def load_heartbeats() -> None:
+    """加载心跳历史（会阻塞调用线程，在事件循环中请使用 asyncio.to_thread）"""
+    if storage.is_database_enabled() and _load_heartbeats_from_database():
+        return
     if not _storage_path or not os.path.exists(_storage_path):
         return
     try:
@@ -108,7 +130,10 @@ def record_request(
         heartbeat["status_code"] = status_code
 
     SERVICES[service]["heartbeats"].append(heartbeat)
-    _save_heartbeats()
+    if storage.is_database_enabled():
+        storage.append_log_nowait(f"{HEARTBEAT_STREAM_PREFIX}{service}", heartbeat, MAX_HEARTBEATS)
+    else:
+        _save_heartbeats()
 
 
 def get_realtime_status() -> Dict:
@@ -0,0 +1,132 @@
+"""写回式（write-behind）持久化模块
+
+内存中的数据由调用方直接修改并递增版本号，后台任务定期检查版本，
+有变化时在事件循环内生成快照，再在线程池中序列化并写入数据库（优先）或 JSON 文件。
+统计数据、会话绑定等存储只需提供数据库读写函数、文件路径与快照/版本回调。
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Callable, Optional
+
+from core import storage
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehind:
+    """脏版本 + 后台定时落盘（数据库优先，降级到文件）
+
+    - load_db / save_db: 数据库读写函数（在线程池中调用，save_db 返回 False 表示降级到文件）
+    - snapshot(): 在事件循环内生成可序列化的一致快照
+    - version(): 返回当前数据版本，与上次落盘版本不同即视为脏数据
+    - prepare(): 可选，读取版本前调用（如先清理过期条目，使其计入本轮版本）
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        load_db: Callable[[], Optional[dict]],
+        save_db: Callable[[dict], bool],
+        snapshot: Callable[[], dict],
+        version: Callable[[], int],
+        flush_interval: float,
+        tag: str,
+        label: str,
+        prepare: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.file_path = file_path
+        self.flush_interval = flush_interval
+        self._load_db = load_db
+        self._save_db = save_db
+        self._snapshot = snapshot
+        self._version = version
+        self._prepare = prepare
+        self._tag = tag
+        self._label = label
+        self._flushed_version = version()  # 最近一次成功落盘时的版本
+        self._flush_lock = asyncio.Lock()
+        self._flusher_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_dirty(self) -> bool:
+        return self._version() != self._flushed_version
+
+    def mark_clean(self) -> None:
+        """将当前版本视为已落盘（加载完成后调用）"""
+        self._flushed_version = self._version()
+
+    async def read(self) -> Optional[dict]:
+        """在线程池中读取已持久化的数据，不存在或读取失败时返回 None"""
+        return await asyncio.to_thread(self._read)
+
+    def _read(self) -> Optional[dict]:
+        if storage.is_database_enabled():
+            try:
+                data = self._load_db()
+                if isinstance(data, dict):
+                    return data
+            except Exception as e:
+                logger.error(f"{self._tag} 数据库加载{self._label}失败: {str(e)[:50]}")
+        try:
+            if os.path.exists(self.file_path):
+                with open(self.file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return data
+        except Exception:
+            pass
+        return None
+
+    async def flush(self, force: bool = False) -> None:
+        """将脏数据落盘（快照在事件循环内生成，序列化与 I/O 在线程池中执行）"""
+        async with self._flush_lock:
+            if self._prepare is not None:
+                self._prepare()
+            version = self._version()
+            if not force and version == self._flushed_version:
+                return
+            snapshot = self._snapshot()
+            try:
+                await asyncio.to_thread(self._write, snapshot)
+                self._flushed_version = version
+            except Exception as e:
+                logger.error(f"{self._tag} 保存{self._label}失败: {str(e)[:50]}")
+
+    def _write(self, snapshot: dict) -> None:
+        if storage.is_database_enabled():
+            try:
+                if self._save_db(snapshot):
+                    return
+            except Exception as e:
+                logger.error(f"{self._tag} 数据库保存{self._label}失败: {str(e)[:50]}")
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        tmp_file = f"{self.file_path}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_file, self.file_path)
+
+    async def _run_flusher(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            logger.info(f"{self._tag} {self._label}落盘任务已停止")
+
+    def start(self) -> None:
+        """启动后台落盘任务"""
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.create_task(self._run_flusher())
+
+    async def close(self) -> None:
+        """停止后台任务并执行最后一次落盘"""
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+        await self.flush()
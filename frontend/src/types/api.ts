@@ -16,6 +16,28 @@ export interface AccountQuotaStatus {
   is_expired: boolean
 }
 
+export interface CircuitBreakerTransition {
+  from: 'closed' | 'open' | 'half_open'
+  to: 'closed' | 'open' | 'half_open'
+  at: number
+  reason: string
+}
+
+export interface CircuitBreakerInfo {
+  state: 'closed' | 'open' | 'half_open'
+  trips: number
+  open_remaining_seconds: number
+  trial_in_flight: boolean
+  transitions: CircuitBreakerTransition[]
+}
+
+export interface RateLimitBackoff {
+  strikes: number
+  duration_seconds: number
+  recovery_seconds: number | null
+  probe_in_flight: boolean
+}
+
 export interface AdminAccount {
   id: string
   status: string
@@ -28,6 +50,10 @@ export interface AdminAccount {
   cooldown_seconds: number
   cooldown_reason: string | null
   conversation_count: number
+  in_flight?: number
+  ttft_ewma_ms?: number | null
+  circuit_breaker?: CircuitBreakerInfo
+  rate_limit_backoff?: Record<string, RateLimitBackoff>
   quota_status: AccountQuotaStatus
 }
 
@@ -101,11 +127,29 @@ export interface Settings {
     max_account_switch_tries: number
     account_failure_threshold: number
     rate_limit_cooldown_seconds: number
+    rate_limit_base_cooldown_seconds?: number
     session_cache_ttl_seconds: number
+    session_pool_size?: number
+    session_pool_ttl_seconds?: number
+    max_concurrent_per_account?: number
+    max_concurrent_total?: number
+    queue_max_waiters?: number
+    queue_timeout_seconds?: number
+    cooldown_wait_seconds?: number
+    scheduler_strategy?: 'round_robin' | 'least_outstanding' | 'ewma_ttft' | 'power_of_two'
     auto_refresh_accounts_seconds: number
     scheduled_refresh_enabled?: boolean
     scheduled_refresh_interval_minutes?: number
   }
+  http?: {
+    stream_http2?: boolean
+    chat_max_connections?: number
+    chat_max_keepalive_connections?: number
+    stream_max_connections?: number
+    stream_max_keepalive_connections?: number
+    auth_max_connections?: number
+    auth_max_keepalive_connections?: number
+  }
   public_display: {
     logo_url?: string
     chat_url?: string
@@ -155,12 +199,12 @@ export interface AdminLogsResponse extends LogsResponse {
   stats: AdminLogStats
 }
 
-export type PublicLogStatus = 'success' | 'error' | 'timeout' | 'in_progress'
+export type PublicLogStatus = 'success' | 'error' | 'timeout' | 'cancelled' | 'in_progress'
 
 export interface PublicLogEvent {
   time: string
   type: 'start' | 'select' | 'retry' | 'switch' | 'complete'
-  status?: 'success' | 'error' | 'timeout'
+  status?: 'success' | 'error' | 'timeout' | 'cancelled'
   content: string
 }
 
@@ -183,6 +227,72 @@ export interface AdminStatsTrend {
   failed_requests: number[]
   rate_limited_requests: number[]
   model_requests?: Record<string, number[]>
+  account_requests?: Record<string, number[]>
+}
+
+export interface HttpClientMetrics {
+  http2_enabled: boolean
+  requests: number
+  new_connections: number
+  tls_handshakes: number
+  http2_requests: number
+  reused_requests: number
+  reuse_rate: number
+}
+
+export interface SessionPoolStats {
+  size: number
+  ttl_seconds: number
+  pooled: number
+  hits: number
+  misses: number
+}
+
+export interface JwtRefresherStats {
+  refreshed: number
+  failed: number
+  key_fetches: number
+  local_mints: number
+  key_invalidations: number
+}
+
+export interface AccountsCacheStats {
+  cached_accounts: number
+  source: 'env' | 'db' | 'file' | null
+  hits: number
+  misses: number
+  hit_rate: number
+  invalidations: number
+}
+
+export interface ConcurrencyStats {
+  max_per_account: number
+  max_total: number
+  max_waiters: number
+  wait_timeout_seconds: number
+  total_in_flight: number
+  waiters: number
+  cooldown_waiters?: number
+  rejected: number
+  timed_out: number
+  cooldown_waits?: number
+}
+
+export interface SessionCacheStats {
+  size: number
+  max_size: number
+  ttl_seconds: number
+  hits: number
+  misses: number
+  hit_rate: number
+  evictions: number
+  expirations: number
+  active_locks: number
+}
+
+export interface SchedulerStats {
+  strategy: string
+  tracked_accounts: number
 }
 
 export interface AdminStats {
@@ -192,6 +302,13 @@ export interface AdminStats {
   rate_limited_accounts: number
   idle_accounts: number
   trend: AdminStatsTrend
+  http_clients?: Record<string, HttpClientMetrics>
+  session_pool?: SessionPoolStats
+  jwt_refresher?: JwtRefresherStats
+  accounts_cache?: AccountsCacheStats
+  concurrency?: ConcurrencyStats
+  scheduler?: SchedulerStats
+  session_cache?: SessionCacheStats
 }
 
 export interface PublicStats {
@@ -1,4 +1,4 @@
-import json, time, os, asyncio, uuid, ssl, re, yaml, shutil, base64
+import json, time, os, asyncio, uuid, ssl, re, yaml, shutil, base64, math
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Union, Dict, Any
 from pathlib import Path
@@ -6,13 +6,22 @@ import logging
 from dotenv import load_dotenv
 
 import httpx
-import aiofiles
 from fastapi import FastAPI, HTTPException, Header, Request, Body, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from util.streaming_parser import parse_json_array_stream_async
+from util.streaming_parser import parse_json_array_bytes_async
+from util.disconnect import DisconnectWatcher, GuardedStreamingResponse
+from util.sse import (
+    SSEChunkEncoder,
+    DELTA_ROLE,
+    DELTA_CONTENT,
+    DELTA_REASONING,
+    DELTA_MEDIA,
+    DELTA_FINISH,
+    DELTA_ERROR,
+)
 from collections import deque
 from threading import Lock
 
@@ -32,6 +41,7 @@ os.makedirs(DATA_DIR, exist_ok=True)
 ACCOUNTS_FILE = os.path.join(DATA_DIR, "accounts.json")
 SETTINGS_FILE = os.path.join(DATA_DIR, "settings.yaml")
 STATS_FILE = os.path.join(DATA_DIR, "stats.json")
+SESSION_AFFINITY_FILE = os.path.join(DATA_DIR, "session_affinity.json")
 TASK_HISTORY_FILE = os.path.join(DATA_DIR, "task_history.json")
 TASK_HISTORY_TMP_FILE = os.path.join(DATA_DIR, "task_history.json.tmp")
 TASK_HISTORY_MTIME: float = 0.0
@@ -61,12 +71,16 @@ from core.google_api import (
     save_image_to_hf
 )
 from core.account import (
+    AccountBusyError,
     AccountManager,
     MultiAccountManager,
+    accounts_cache,
     format_account_expiration,
     load_multi_account_config,
-    load_accounts_from_source,
+    load_accounts_from_source_async,
     reload_accounts as _reload_accounts,
+    apply_account_changes as _apply_account_changes,
+    watch_account_changes as _watch_account_changes,
     update_accounts_config as _update_accounts_config,
     delete_account as _delete_account,
     update_account_disabled_status as _update_account_disabled_status,
@@ -84,6 +98,27 @@ from core.config import config_manager, config
 # 数据库存储支持
 from core import storage
 
+# 统计数据存储
+from core.http_clients import (
+    CLIENT_AUTH,
+    CLIENT_CHAT,
+    CLIENT_STREAM,
+    build_http_client,
+    get_all_client_metrics,
+)
+from core.jwt import JWTRefresher
+from core.session_cache import SessionAffinityStore
+from core.session_pool import SessionPool
+from core.stats import (
+    StatsStore,
+    SERIES_REQUESTS,
+    SERIES_FAILURES,
+    SERIES_RATE_LIMITS,
+    SERIES_CLIENT_CANCELLED,
+    MODEL_SERIES_PREFIX,
+    ACCOUNT_SERIES_PREFIX
+)
+
 # 模型到配额类型的映射
 MODEL_TO_QUOTA_TYPE = {
     "gemini-imagen": "images",
@@ -96,88 +131,9 @@ MODEL_TO_QUOTA_TYPE = {
 log_buffer = deque(maxlen=1000)
 log_lock = Lock()
 
-# 统计数据持久化
-stats_lock = asyncio.Lock()  # 改为异步锁
-
-async def load_stats():
-    """加载统计数据（异步）。"""
-    data = None
-    if storage.is_database_enabled():
-        try:
-            data = await asyncio.to_thread(storage.load_stats_sync)
-            if not isinstance(data, dict):
-                data = None
-        except Exception as e:
-            logger.error(f"[STATS] 数据库加载失败: {str(e)[:50]}")
-    if data is None:
-        try:
-            if os.path.exists(STATS_FILE):
-                async with aiofiles.open(STATS_FILE, 'r', encoding='utf-8') as f:
-                    content = await f.read()
-                    data = json.loads(content)
-        except Exception:
-            pass
-
-    # 如果没有加载到数据，返回默认值
-    if data is None:
-        data = {
-            "total_visitors": 0,
-            "total_requests": 0,
-            "request_timestamps": [],
-            "model_request_timestamps": {},
-            "failure_timestamps": [],
-            "rate_limit_timestamps": [],
-            "visitor_ips": {},
-            "account_conversations": {},
-            "recent_conversations": []
-        }
-
-    # 将列表转换为 deque（限制大小防止内存无限增长）
-    if isinstance(data.get("request_timestamps"), list):
-        data["request_timestamps"] = deque(data["request_timestamps"], maxlen=20000)
-    if isinstance(data.get("failure_timestamps"), list):
-        data["failure_timestamps"] = deque(data["failure_timestamps"], maxlen=10000)
-    if isinstance(data.get("rate_limit_timestamps"), list):
-        data["rate_limit_timestamps"] = deque(data["rate_limit_timestamps"], maxlen=10000)
-
-    return data
-
-async def save_stats(stats):
-    """保存统计数据（异步，避免阻塞事件循环）"""
-    # 将 deque 转换为 list 以便 JSON 序列化
-    stats_to_save = stats.copy()
-    if isinstance(stats_to_save.get("request_timestamps"), deque):
-        stats_to_save["request_timestamps"] = list(stats_to_save["request_timestamps"])
-    if isinstance(stats_to_save.get("failure_timestamps"), deque):
-        stats_to_save["failure_timestamps"] = list(stats_to_save["failure_timestamps"])
-    if isinstance(stats_to_save.get("rate_limit_timestamps"), deque):
-        stats_to_save["rate_limit_timestamps"] = list(stats_to_save["rate_limit_timestamps"])
-
-    if storage.is_database_enabled():
-        try:
-            saved = await asyncio.to_thread(storage.save_stats_sync, stats_to_save)
-            if saved:
-                return
-        except Exception as e:
-            logger.error(f"[STATS] 数据库保存失败: {str(e)[:50]}")
-    try:
-        async with aiofiles.open(STATS_FILE, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(stats_to_save, ensure_ascii=False, indent=2))
-    except Exception as e:
-        logger.error(f"[STATS] 保存统计数据失败: {str(e)[:50]}")
-
-# 初始化统计数据（需要在启动时异步加载）
-global_stats = {
-    "total_visitors": 0,
-    "total_requests": 0,
-    "request_timestamps": deque(maxlen=20000),
-    "model_request_timestamps": {},
-    "failure_timestamps": deque(maxlen=10000),
-    "rate_limit_timestamps": deque(maxlen=10000),
-    "visitor_ips": {},
-    "account_conversations": {},
-    "recent_conversations": []
-}
+# 统计数据（内存计数 + 后台定时落盘，见 core/stats.py）
+stats_store = StatsStore(STATS_FILE)
+global_stats = stats_store.data
 
 # 任务历史记录（内存存储，容器重启后清空）
 task_history = deque(maxlen=100)  # 最多保留100条历史记录
@@ -307,6 +263,13 @@ def build_recent_conversation_entry(
             "status": "timeout",
             "content": "请求超时",
         })
+    elif status == "cancelled":
+        events.append({
+            "time": end_time,
+            "type": "complete",
+            "status": "cancelled",
+            "content": "客户端已断开",
+        })
     else:
         detail = error_detail or "请求失败"
         events.append({
@@ -431,41 +394,30 @@ MODEL_MAPPING = {
 }
 
 # ---------- HTTP 客户端 ----------
-# 对话操作客户端（用于JWT获取、创建会话、发送消息）
-http_client = httpx.AsyncClient(
-    proxy=(PROXY_FOR_CHAT or None),
-    verify=False,
-    http2=False,
-    timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=60.0),
-    limits=httpx.Limits(
-        max_keepalive_connections=100,
-        max_connections=200
+def _build_http_clients() -> tuple:
+    """按当前代理与连接池配置构建三个用途独立的 HTTP 客户端"""
+    http_cfg = config.http
+    return (
+        # 对话操作客户端（用于JWT获取、创建会话、上传文件）
+        build_http_client(
+            CLIENT_CHAT, PROXY_FOR_CHAT, TIMEOUT_SECONDS,
+            http_cfg.chat_max_connections, http_cfg.chat_max_keepalive_connections,
+        ),
+        # 对话流式客户端（用于 widgetStreamAssist 流式响应，可启用 HTTP/2 多路复用）
+        build_http_client(
+            CLIENT_STREAM, PROXY_FOR_CHAT, TIMEOUT_SECONDS,
+            http_cfg.stream_max_connections, http_cfg.stream_max_keepalive_connections,
+            http2=http_cfg.stream_http2,
+        ),
+        # 账户操作客户端（用于注册/登录/刷新）
+        build_http_client(
+            CLIENT_AUTH, PROXY_FOR_AUTH, TIMEOUT_SECONDS,
+            http_cfg.auth_max_connections, http_cfg.auth_max_keepalive_connections,
+        ),
     )
-)
 
-# 对话流式客户端（用于流式响应）
-http_client_chat = httpx.AsyncClient(
-    proxy=(PROXY_FOR_CHAT or None),
-    verify=False,
-    http2=False,
-    timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=60.0),
-    limits=httpx.Limits(
-        max_keepalive_connections=100,
-        max_connections=200
-    )
-)
 
-# 账户操作客户端（用于注册/登录/刷新）
-http_client_auth = httpx.AsyncClient(
-    proxy=(PROXY_FOR_AUTH or None),
-    verify=False,
-    http2=False,
-    timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=60.0),
-    limits=httpx.Limits(
-        max_keepalive_connections=100,
-        max_connections=200
-    )
-)
+http_client, http_client_chat, http_client_auth = _build_http_clients()
 
 # 打印代理配置日志
 logger.info(f"[PROXY] Account operations (register/login/refresh): {PROXY_FOR_AUTH if PROXY_FOR_AUTH else 'disabled'}")
@@ -485,6 +437,28 @@ def get_base_url(request: Request) -> str:
     return f"{forwarded_proto}://{forwarded_host}"
 
 
+# 客户端指定冷却等待时间的请求头（秒）
+COOLDOWN_WAIT_HEADER = "x-cooldown-wait"
+
+
+def get_cooldown_wait_seconds(request: Request) -> float:
+    """账户全部冷却时的最长等待时间（0表示不等待）
+
+    请求头只能在配置值以内缩短等待，不能超过管理员配置的 cooldown_wait_seconds；
+    非数字、NaN、inf 等无效值一律忽略，使用配置值。
+    """
+    configured = config.retry.cooldown_wait_seconds
+    header_value = request.headers.get(COOLDOWN_WAIT_HEADER)
+    if header_value:
+        try:
+            value = float(header_value)
+        except ValueError:
+            return configured
+        if math.isfinite(value):
+            return min(max(value, 0.0), configured)
+    return configured
+
+
 
 # ---------- 常量定义 ----------
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
@@ -505,6 +479,43 @@ multi_account_mgr = load_multi_account_config(
     global_stats
 )
 
+
+def _configure_concurrency_limiter() -> None:
+    """按当前配置设置并发准入控制（账户重载后 limiter 实例会被沿用）"""
+    multi_account_mgr.limiter.configure(
+        config.retry.max_concurrent_per_account,
+        config.retry.max_concurrent_total,
+        config.retry.queue_max_waiters,
+        config.retry.queue_timeout_seconds,
+    )
+
+
+
+def _configure_account_scheduler() -> None:
+    """按当前配置设置账户调度策略与429初始冷却时长（账户管理器在重载时保持不变）"""
+    multi_account_mgr.scheduler.configure(config.retry.scheduler_strategy)
+    multi_account_mgr.configure_rate_limit_cooldown(config.retry.rate_limit_base_cooldown_seconds)
+
+
+_configure_concurrency_limiter()
+_configure_account_scheduler()
+
+# 会话绑定持久化（缓存实例在账户重载时沿用，store 始终指向同一个缓存）
+session_affinity_store = SessionAffinityStore(multi_account_mgr.global_session_cache, SESSION_AFFINITY_FILE)
+
+# 会话预热池（新对话/账户切换时直接取用预建的 Session）
+async def _create_pooled_session(account_manager: AccountManager) -> str:
+    return await create_google_session(account_manager, http_client, USER_AGENT, touch=False)
+
+session_pool = SessionPool(
+    _create_pooled_session,
+    config.retry.session_pool_size,
+    config.retry.session_pool_ttl_seconds,
+)
+
+# JWT 预刷新（最近使用过的账户在 JWT 到期前于后台刷新，请求无需等待 getoxsrf）
+jwt_refresher = JWTRefresher()
+
 # ---------- 自动注册/刷新服务 ----------
 register_service = None
 login_service = None
@@ -708,15 +719,52 @@ else:
 _last_known_accounts_version: float | None = None
 
 
+async def _on_accounts_changed(account_ids: Optional[list]) -> None:
+    """其他进程修改了账户：只重新读取变化的账户（None 表示按差异整体重载）"""
+    global multi_account_mgr, _last_known_accounts_version
+    try:
+        multi_account_mgr = await _apply_account_changes(
+            account_ids,
+            multi_account_mgr,
+            http_client,
+            USER_AGENT,
+            ACCOUNT_FAILURE_THRESHOLD,
+            RATE_LIMIT_COOLDOWN_SECONDS,
+            SESSION_CACHE_TTL_SECONDS,
+            global_stats
+        )
+        if storage.is_database_enabled():
+            # 已通过变更推送同步，兜底校验无需再次重载
+            _last_known_accounts_version = await storage.get_accounts_updated_at()
+    except Exception as e:
+        logger.error(f"[ACCOUNT-SYNC] 应用账户变更失败: {type(e).__name__}: {str(e)[:100]}")
+
+
+async def account_change_feed_task():
+    """后台任务：监听账户变更推送（PostgreSQL LISTEN/NOTIFY，SQLite / 文件 mtime），毫秒级增量同步"""
+    restarted = False
+    while True:
+        try:
+            if restarted:
+                await _on_accounts_changed(None)  # 监听中断期间的变更无法得知，按差异整体重载
+            await _watch_account_changes(_on_accounts_changed)
+            return
+        except asyncio.CancelledError:
+            logger.info("[ACCOUNT-SYNC] 账户变更监听已停止")
+            break
+        except Exception as e:
+            logger.error(f"[ACCOUNT-SYNC] 账户变更监听异常: {type(e).__name__}: {str(e)[:100]}")
+            restarted = True
+            await asyncio.sleep(10)
+
+
 async def auto_refresh_accounts_task():
-    """后台任务：定期检查数据库中的账号变化，自动刷新"""
+    """后台任务：兜底校验，定期比较数据库中的账号版本，变化且未经推送同步时按差异重载"""
     global multi_account_mgr, _last_known_accounts_version
 
     # 初始化：记录当前账号更新时间
     if storage.is_database_enabled() and not os.environ.get("ACCOUNTS_CONFIG"):
-        _last_known_accounts_version = await asyncio.to_thread(
-            storage.get_accounts_updated_at_sync
-        )
+        _last_known_accounts_version = await storage.get_accounts_updated_at()
 
     while True:
         try:
@@ -738,16 +786,20 @@ async def auto_refresh_accounts_task():
                 continue
 
             # 获取数据库中的账号更新时间
-            db_version = await asyncio.to_thread(storage.get_accounts_updated_at_sync)
+            db_version = await storage.get_accounts_updated_at()
             if db_version is None:
                 continue
 
+            # 最新版本由本进程写入（写入时内存已同步，变更推送也会跳过自身事件），无需重载
+            if db_version == storage.get_local_accounts_version():
+                _last_known_accounts_version = db_version
+
             # 比较更新时间变化
             if _last_known_accounts_version != db_version:
                 logger.info("[AUTO-REFRESH] 检测到账号变化，正在自动刷新...")
 
                 # 重新加载账号配置
-                multi_account_mgr = _reload_accounts(
+                multi_account_mgr = await _reload_accounts(
                     multi_account_mgr,
                     http_client,
                     USER_AGENT,
@@ -771,7 +823,6 @@ async def auto_refresh_accounts_task():
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化后台任务"""
-    global global_stats
 
     # 文件迁移逻辑：将根目录的旧文件迁移到 data 目录
     old_accounts = "accounts.json"
@@ -782,29 +833,42 @@ async def startup_event():
         except Exception as e:
             logger.warning(f"{logger_prefix} 文件迁移失败: {e}")
 
-    # 加载统计数据
-    global_stats = await load_stats()
-    global_stats.setdefault("request_timestamps", [])
-    global_stats.setdefault("model_request_timestamps", {})
-    global_stats.setdefault("failure_timestamps", [])
-    global_stats.setdefault("rate_limit_timestamps", [])
-    global_stats.setdefault("recent_conversations", [])
+    # 加载统计数据（原地更新 global_stats）并启动后台落盘任务
+    await stats_store.load()
+    stats_store.start()
     uptime_tracker.configure_storage(os.path.join(DATA_DIR, "uptime.json"))
-    uptime_tracker.load_heartbeats()
+    await asyncio.to_thread(uptime_tracker.load_heartbeats)
     logger.info(f"[SYSTEM] 统计数据已加载: {global_stats['total_requests']} 次请求, {global_stats['total_visitors']} 位访客")
 
+    # 恢复会话绑定（账户重载时缓存实例会被沿用，无需重新绑定）并启动后台落盘任务
+    restored = await session_affinity_store.load(set(multi_account_mgr.accounts))
+    session_affinity_store.start()
+    logger.info(f"[SYSTEM] 会话绑定已恢复: {restored} 个对话")
+
     # 启动缓存清理任务
     asyncio.create_task(multi_account_mgr.start_background_cleanup())
     logger.info("[SYSTEM] 后台缓存清理任务已启动（间隔: 5分钟）")
 
-    # 启动自动刷新账号任务（仅数据库模式有效）
+    # 启动会话预热任务（每次巡检时读取最新的账户管理器）
+    asyncio.create_task(session_pool.run(lambda: multi_account_mgr.accounts.values()))
+    if session_pool.enabled:
+        logger.info(f"[SYSTEM] 会话预热池已启动（每账户 {session_pool.size} 个，有效期 {session_pool.ttl_seconds}秒）")
+
+    # 启动 JWT 预刷新任务
+    asyncio.create_task(jwt_refresher.run(lambda: multi_account_mgr.accounts.values()))
+    logger.info(f"[SYSTEM] JWT 预刷新任务已启动（间隔: {jwt_refresher.interval:g}秒）")
+
+    # 启动账户变更监听与兜底校验任务（兜底校验仅数据库模式有效）
     if os.environ.get("ACCOUNTS_CONFIG"):
         logger.info("[SYSTEM] 自动刷新账号已跳过（使用 ACCOUNTS_CONFIG）")
-    elif storage.is_database_enabled() and AUTO_REFRESH_ACCOUNTS_SECONDS > 0:
-        asyncio.create_task(auto_refresh_accounts_task())
-        logger.info(f"[SYSTEM] 自动刷新账号任务已启动（间隔: {AUTO_REFRESH_ACCOUNTS_SECONDS}秒）")
-    elif storage.is_database_enabled():
-        logger.info("[SYSTEM] 自动刷新账号功能已禁用（配置为0）")
+    else:
+        asyncio.create_task(account_change_feed_task())
+        logger.info(f"[SYSTEM] 账户变更监听已启动（存储: {storage.get_backend()}）")
+        if storage.is_database_enabled() and AUTO_REFRESH_ACCOUNTS_SECONDS > 0:
+            asyncio.create_task(auto_refresh_accounts_task())
+            logger.info(f"[SYSTEM] 账号兜底校验任务已启动（间隔: {AUTO_REFRESH_ACCOUNTS_SECONDS}秒）")
+        elif storage.is_database_enabled():
+            logger.info("[SYSTEM] 账号兜底校验已禁用（配置为0）")
 
     # 启动自动登录刷新轮询（始终启动，但默认禁用）
     if login_service:
@@ -816,6 +880,13 @@ async def startup_event():
     else:
         logger.info("[SYSTEM] 自动登录刷新未启用或依赖不可用")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时落盘统计数据与会话绑定"""
+    await stats_store.close()
+    await session_affinity_store.close()
+    logger.info("[SYSTEM] 统计数据已保存")
+
 # ---------- 日志脱敏函数 ----------
 def get_sanitized_logs(limit: int = 100) -> list:
     """获取脱敏后的日志列表，按请求ID分组并提取关键事件"""
@@ -1032,21 +1103,6 @@ class ChatRequest(BaseModel):
     temperature: Optional[float] = 0.7
     top_p: Optional[float] = 1.0
 
-def create_chunk(id: str, created: int, model: str, delta: dict, finish_reason: Union[str, None]) -> str:
-    chunk = {
-        "id": id,
-        "object": "chat.completion.chunk",
-        "created": created,
-        "model": model,
-        "choices": [{
-            "index": 0,
-            "delta": delta,
-            "logprobs": None,  # OpenAI 标准字段
-            "finish_reason": finish_reason
-        }],
-        "system_fingerprint": None  # OpenAI 标准字段（可选）
-    }
-    return json.dumps(chunk)
 # ---------- Auth endpoints (API) ----------
 
 @app.post("/login")
@@ -1073,9 +1129,6 @@ async def admin_logout(request: Request):
 @app.get("/admin/stats")
 @require_login()
 async def admin_stats(request: Request):
-    now = time.time()
-    window_seconds = 12 * 3600
-
     active_accounts = 0
     failed_accounts = 0
     rate_limited_accounts = 0
@@ -1107,50 +1160,24 @@ async def admin_stats(request: Request):
     start_ts = start_dt.timestamp()
     labels = [(start_dt + timedelta(hours=i)).strftime("%H:00") for i in range(12)]
 
-    def bucketize(timestamps: list) -> list:
-        buckets = [0] * 12
-        for ts in timestamps:
-            idx = int((ts - start_ts) // 3600)
-            if 0 <= idx < 12:
-                buckets[idx] += 1
-        return buckets
-
-    async with stats_lock:
-        global_stats.setdefault("request_timestamps", deque(maxlen=20000))
-        global_stats.setdefault("failure_timestamps", deque(maxlen=10000))
-        global_stats.setdefault("rate_limit_timestamps", deque(maxlen=10000))
-        global_stats.setdefault("model_request_timestamps", {})
-
-        # 清理过期数据，保持 deque 类型
-        cleaned_request_ts = [ts for ts in global_stats["request_timestamps"] if now - ts < window_seconds]
-        global_stats["request_timestamps"] = deque(cleaned_request_ts, maxlen=20000)
-
-        cleaned_failure_ts = [ts for ts in global_stats["failure_timestamps"] if now - ts < window_seconds]
-        global_stats["failure_timestamps"] = deque(cleaned_failure_ts, maxlen=10000)
-
-        cleaned_rate_limit_ts = [ts for ts in global_stats["rate_limit_timestamps"] if now - ts < window_seconds]
-        global_stats["rate_limit_timestamps"] = deque(cleaned_rate_limit_ts, maxlen=10000)
-
-        model_request_timestamps = {}
-        for model, timestamps in global_stats["model_request_timestamps"].items():
-            model_request_timestamps[model] = [
-                ts for ts in timestamps
-                if now - ts < window_seconds
-            ]
-        global_stats["model_request_timestamps"] = model_request_timestamps
-
-        await save_stats(global_stats)
-
-        request_timestamps = list(global_stats["request_timestamps"])
-        failure_timestamps = list(global_stats["failure_timestamps"])
-        rate_limit_timestamps = list(global_stats["rate_limit_timestamps"])
-        model_request_timestamps = global_stats.get("model_request_timestamps", {})
-        model_requests = {}
-        for model in MODEL_MAPPING.keys():
-            model_requests[model] = bucketize(model_request_timestamps.get(model, []))
-        for model, timestamps in model_request_timestamps.items():
-            if model not in model_requests:
-                model_requests[model] = bucketize(timestamps)
+    # 预聚合的逐小时计数，查询开销只与桶数相关
+    metrics = global_stats["metrics"]
+
+    def hourly(series_name: str) -> list:
+        return metrics.hourly(series_name, start_ts, 12)
+
+    model_requests = {}
+    for model in MODEL_MAPPING.keys():
+        model_requests[model] = hourly(f"{MODEL_SERIES_PREFIX}{model}")
+    for series_name in metrics.names(MODEL_SERIES_PREFIX):
+        model = series_name[len(MODEL_SERIES_PREFIX):]
+        if model not in model_requests:
+            model_requests[model] = hourly(series_name)
+
+    account_requests = {
+        account_id: hourly(f"{ACCOUNT_SERIES_PREFIX}{account_id}")
+        for account_id in multi_account_mgr.accounts
+    }
 
     return {
         "total_accounts": total_accounts,
@@ -1160,11 +1187,22 @@ async def admin_stats(request: Request):
         "idle_accounts": idle_accounts,
         "trend": {
             "labels": labels,
-            "total_requests": bucketize(request_timestamps),
-            "failed_requests": bucketize(failure_timestamps),
-            "rate_limited_requests": bucketize(rate_limit_timestamps),
+            "total_requests": hourly(SERIES_REQUESTS),
+            "failed_requests": hourly(SERIES_FAILURES),
+            "rate_limited_requests": hourly(SERIES_RATE_LIMITS),
             "model_requests": model_requests,
-        }
+            "account_requests": account_requests,
+        },
+        "http_clients": get_all_client_metrics(),
+        "session_pool": session_pool.get_stats(),
+        "jwt_refresher": jwt_refresher.get_stats(),
+        "accounts_cache": accounts_cache.get_stats(),
+        "concurrency": multi_account_mgr.limiter.get_stats(),
+        "scheduler": multi_account_mgr.scheduler.get_stats(),
+        "session_cache": {
+            **multi_account_mgr.global_session_cache.get_stats(),
+            "active_locks": len(multi_account_mgr.session_locks),
+        },
     }
 
 @app.get("/admin/accounts")
@@ -1178,6 +1216,7 @@ async def admin_get_accounts(request: Request):
         status, status_color, remaining_display = format_account_expiration(remaining_hours)
         cooldown_seconds, cooldown_reason = account_manager.get_cooldown_info()
         quota_status = account_manager.get_quota_status()
+        ttft_ewma = multi_account_mgr.scheduler.ttft_ewma.get(account_id)
 
         accounts_info.append({
             "id": config.account_id,
@@ -1192,6 +1231,13 @@ async def admin_get_accounts(request: Request):
             "cooldown_reason": cooldown_reason,
             "conversation_count": account_manager.conversation_count,
             "session_usage_count": account_manager.session_usage_count,
+            "in_flight": multi_account_mgr.limiter.in_flight.get(account_id, 0),
+            "ttft_ewma_ms": int(ttft_ewma * 1000) if ttft_ewma is not None else None,
+            "circuit_breaker": account_manager.breaker.to_dict(),
+            "rate_limit_backoff": {
+                (key or "account"): backoff.to_dict()
+                for key, backoff in account_manager.rate_limit_backoff.items()
+            },
             "quota_status": quota_status  # 新增配额状态
         })
 
@@ -1202,7 +1248,7 @@ async def admin_get_accounts(request: Request):
 async def admin_get_config(request: Request):
     """获取完整账户配置"""
     try:
-        accounts_data = load_accounts_from_source()
+        accounts_data = await load_accounts_from_source_async()
         return {"accounts": accounts_data}
     except Exception as e:
         logger.error(f"[CONFIG] 获取配置失败: {str(e)}")
@@ -1214,7 +1260,7 @@ async def admin_update_config(request: Request, accounts_data: list = Body(...))
     """更新整个账户配置"""
     global multi_account_mgr
     try:
-        multi_account_mgr = _update_accounts_config(
+        multi_account_mgr = await _update_accounts_config(
             accounts_data, multi_account_mgr, http_client, USER_AGENT,
             ACCOUNT_FAILURE_THRESHOLD, RATE_LIMIT_COOLDOWN_SECONDS,
             SESSION_CACHE_TTL_SECONDS, global_stats
@@ -1322,7 +1368,7 @@ async def admin_delete_account(request: Request, account_id: str):
     """删除单个账户"""
     global multi_account_mgr
     try:
-        multi_account_mgr = _delete_account(
+        multi_account_mgr = await _delete_account(
             account_id, multi_account_mgr, http_client, USER_AGENT,
             ACCOUNT_FAILURE_THRESHOLD, RATE_LIMIT_COOLDOWN_SECONDS,
             SESSION_CACHE_TTL_SECONDS, global_stats
@@ -1345,7 +1391,7 @@ async def admin_bulk_delete_accounts(request: Request, account_ids: list[str]):
         raise HTTPException(400, "账户ID列表不能为空")
 
     try:
-        multi_account_mgr, success_count, errors = _bulk_delete_accounts(
+        multi_account_mgr, success_count, errors = await _bulk_delete_accounts(
             account_ids,
             multi_account_mgr,
             http_client,
@@ -1366,7 +1412,7 @@ async def admin_disable_account(request: Request, account_id: str):
     """手动禁用账户"""
     global multi_account_mgr
     try:
-        multi_account_mgr = _update_account_disabled_status(
+        multi_account_mgr = await _update_account_disabled_status(
             account_id, True, multi_account_mgr, http_client, USER_AGENT,
             ACCOUNT_FAILURE_THRESHOLD, RATE_LIMIT_COOLDOWN_SECONDS,
             SESSION_CACHE_TTL_SECONDS, global_stats
@@ -1382,7 +1428,7 @@ async def admin_enable_account(request: Request, account_id: str):
     """启用账户（同时重置错误禁用状态）"""
     global multi_account_mgr
     try:
-        multi_account_mgr = _update_account_disabled_status(
+        multi_account_mgr = await _update_account_disabled_status(
             account_id, False, multi_account_mgr, http_client, USER_AGENT,
             ACCOUNT_FAILURE_THRESHOLD, RATE_LIMIT_COOLDOWN_SECONDS,
             SESSION_CACHE_TTL_SECONDS, global_stats
@@ -1391,6 +1437,7 @@ async def admin_enable_account(request: Request, account_id: str):
         # 重置运行时错误状态（允许手动恢复错误禁用的账户）
         if account_id in multi_account_mgr.accounts:
             account_mgr = multi_account_mgr.accounts[account_id]
+            account_mgr.breaker.reset()
             account_mgr.is_available = True
             account_mgr.error_count = 0
             account_mgr.last_429_time = 0.0
@@ -1406,13 +1453,14 @@ async def admin_enable_account(request: Request, account_id: str):
 async def admin_bulk_enable_accounts(request: Request, account_ids: list[str]):
     """批量启用账户，单次最多50个"""
     global multi_account_mgr
-    success_count, errors = _bulk_update_account_disabled_status(
+    success_count, errors = await _bulk_update_account_disabled_status(
         account_ids, False, multi_account_mgr
     )
     # 重置运行时错误状态
     for account_id in account_ids:
         if account_id in multi_account_mgr.accounts:
             account_mgr = multi_account_mgr.accounts[account_id]
+            account_mgr.breaker.reset()
             account_mgr.is_available = True
             account_mgr.error_count = 0
             account_mgr.last_429_time = 0.0
@@ -1423,7 +1471,7 @@ async def admin_bulk_enable_accounts(request: Request, account_ids: list[str]):
 async def admin_bulk_disable_accounts(request: Request, account_ids: list[str]):
     """批量禁用账户，单次最多50个"""
     global multi_account_mgr
-    success_count, errors = _bulk_update_account_disabled_status(
+    success_count, errors = await _bulk_update_account_disabled_status(
         account_ids, True, multi_account_mgr
     )
     return {"status": "success", "success_count": success_count, "errors": errors}
@@ -1475,11 +1523,21 @@ async def admin_get_settings(request: Request):
             "max_account_switch_tries": config.retry.max_account_switch_tries,
             "account_failure_threshold": config.retry.account_failure_threshold,
             "rate_limit_cooldown_seconds": config.retry.rate_limit_cooldown_seconds,
+            "rate_limit_base_cooldown_seconds": config.retry.rate_limit_base_cooldown_seconds,
             "session_cache_ttl_seconds": config.retry.session_cache_ttl_seconds,
+            "session_pool_size": config.retry.session_pool_size,
+            "session_pool_ttl_seconds": config.retry.session_pool_ttl_seconds,
+            "max_concurrent_per_account": config.retry.max_concurrent_per_account,
+            "max_concurrent_total": config.retry.max_concurrent_total,
+            "queue_max_waiters": config.retry.queue_max_waiters,
+            "queue_timeout_seconds": config.retry.queue_timeout_seconds,
+            "cooldown_wait_seconds": config.retry.cooldown_wait_seconds,
+            "scheduler_strategy": config.retry.scheduler_strategy,
             "auto_refresh_accounts_seconds": config.retry.auto_refresh_accounts_seconds,
             "scheduled_refresh_enabled": config.retry.scheduled_refresh_enabled,
             "scheduled_refresh_interval_minutes": config.retry.scheduled_refresh_interval_minutes
         },
+        "http": config.http.model_dump(),
         "public_display": {
             "logo_url": config.public_display.logo_url,
             "chat_url": config.public_display.chat_url
@@ -1544,22 +1602,37 @@ async def admin_update_settings(request: Request, new_settings: dict = Body(...)
         retry.setdefault("auto_refresh_accounts_seconds", config.retry.auto_refresh_accounts_seconds)
         retry.setdefault("scheduled_refresh_enabled", config.retry.scheduled_refresh_enabled)
         retry.setdefault("scheduled_refresh_interval_minutes", config.retry.scheduled_refresh_interval_minutes)
+        retry.setdefault("session_pool_size", config.retry.session_pool_size)
+        retry.setdefault("session_pool_ttl_seconds", config.retry.session_pool_ttl_seconds)
+        retry.setdefault("max_concurrent_per_account", config.retry.max_concurrent_per_account)
+        retry.setdefault("max_concurrent_total", config.retry.max_concurrent_total)
+        retry.setdefault("queue_max_waiters", config.retry.queue_max_waiters)
+        retry.setdefault("queue_timeout_seconds", config.retry.queue_timeout_seconds)
+        retry.setdefault("cooldown_wait_seconds", config.retry.cooldown_wait_seconds)
+        retry.setdefault("scheduler_strategy", config.retry.scheduler_strategy)
+        retry.setdefault("rate_limit_base_cooldown_seconds", config.retry.rate_limit_base_cooldown_seconds)
         new_settings["retry"] = retry
 
+        http = dict(new_settings.get("http") or {})
+        for key, value in config.http.model_dump().items():
+            http.setdefault(key, value)
+        new_settings["http"] = http
+
         # 保存旧配置用于对比
         old_proxy_for_auth = PROXY_FOR_AUTH
         old_proxy_for_chat = PROXY_FOR_CHAT
+        old_http_config = config.http.model_dump()
         old_retry_config = {
             "account_failure_threshold": ACCOUNT_FAILURE_THRESHOLD,
             "rate_limit_cooldown_seconds": RATE_LIMIT_COOLDOWN_SECONDS,
             "session_cache_ttl_seconds": SESSION_CACHE_TTL_SECONDS
         }
 
-        # 保存到 YAML
-        config_manager.save_yaml(new_settings)
+        # 保存到 YAML（数据库/文件 I/O 放到线程池，避免阻塞事件循环）
+        await asyncio.to_thread(config_manager.save_yaml, new_settings)
 
         # 热更新配置
-        config_manager.reload()
+        await asyncio.to_thread(config_manager.reload)
 
         # 更新全局变量（实时生效）
         API_KEY = config.basic.api_key
@@ -1583,49 +1656,22 @@ async def admin_update_settings(request: Request, new_settings: dict = Body(...)
         SESSION_CACHE_TTL_SECONDS = config.retry.session_cache_ttl_seconds
         AUTO_REFRESH_ACCOUNTS_SECONDS = config.retry.auto_refresh_accounts_seconds
         SESSION_EXPIRE_HOURS = config.session.expire_hours
+        session_pool.configure(config.retry.session_pool_size, config.retry.session_pool_ttl_seconds)
+        _configure_concurrency_limiter()
+        _configure_account_scheduler()
 
         # 检查是否需要重建 HTTP 客户端（代理变化）
-        if old_proxy_for_auth != PROXY_FOR_AUTH or old_proxy_for_chat != PROXY_FOR_CHAT:
-            logger.info(f"[CONFIG] Proxy configuration changed, rebuilding HTTP clients")
+        if (
+            old_proxy_for_auth != PROXY_FOR_AUTH
+            or old_proxy_for_chat != PROXY_FOR_CHAT
+            or old_http_config != config.http.model_dump()
+        ):
+            logger.info(f"[CONFIG] Proxy or HTTP pool configuration changed, rebuilding HTTP clients")
             await http_client.aclose()
             await http_client_chat.aclose()
             await http_client_auth.aclose()
 
-            # 重新创建对话客户端
-            http_client = httpx.AsyncClient(
-                proxy=(PROXY_FOR_CHAT or None),
-                verify=False,
-                http2=False,
-                timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=60.0),
-                limits=httpx.Limits(
-                    max_keepalive_connections=100,
-                    max_connections=200
-                )
-            )
-
-            # 重新创建对话流式客户端
-            http_client_chat = httpx.AsyncClient(
-                proxy=(PROXY_FOR_CHAT or None),
-                verify=False,
-                http2=False,
-                timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=60.0),
-                limits=httpx.Limits(
-                    max_keepalive_connections=100,
-                    max_connections=200
-                )
-            )
-
-            # 重新创建账户操作客户端
-            http_client_auth = httpx.AsyncClient(
-                proxy=(PROXY_FOR_AUTH or None),
-                verify=False,
-                http2=False,
-                timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=60.0),
-                limits=httpx.Limits(
-                    max_keepalive_connections=100,
-                    max_connections=200
-                )
-            )
+            http_client, http_client_chat, http_client_auth = _build_http_clients()
 
             # 打印新的代理配置
             logger.info(f"[PROXY] Account operations (register/login/refresh): {PROXY_FOR_AUTH if PROXY_FOR_AUTH else 'disabled'}")
@@ -1650,10 +1696,12 @@ async def admin_update_settings(request: Request, new_settings: dict = Body(...)
         if retry_changed:
             logger.info(f"[CONFIG] 重试策略已变化，更新账户管理器配置")
             # 更新所有账户管理器的配置
-            multi_account_mgr.cache_ttl = SESSION_CACHE_TTL_SECONDS
+            multi_account_mgr.global_session_cache.configure(ttl_seconds=SESSION_CACHE_TTL_SECONDS)
             for account_id, account_mgr in multi_account_mgr.accounts.items():
                 account_mgr.account_failure_threshold = ACCOUNT_FAILURE_THRESHOLD
                 account_mgr.rate_limit_cooldown_seconds = RATE_LIMIT_COOLDOWN_SECONDS
+            # 冷却时长变化后重新计算可用索引与恢复时间
+            multi_account_mgr.refresh_availability()
 
         logger.info(f"[CONFIG] 系统设置已更新并实时生效")
         return {"status": "success", "message": "设置已保存并实时生效！"}
@@ -1822,12 +1870,32 @@ async def chat_impl(
 
     monitor_recorded = False
 
+    slot_account: Optional[AccountManager] = None  # 当前占用并发槽位的账户
+    cooldown_wait = get_cooldown_wait_seconds(request)
+    # 判断请求类型以传递quota_type（使用字典映射），用于按配额选择账户和429按类型冷却
+    # 普通对话模型返回None（text配额是基础配额，所有请求都需要）
+    quota_type = MODEL_TO_QUOTA_TYPE.get(req.model)
+
+    def hold_slot(account: AccountManager) -> None:
+        """记录新占用的槽位，并释放之前占用的槽位"""
+        nonlocal slot_account
+        if slot_account is not None:
+            multi_account_mgr.release_account(slot_account)
+        slot_account = account
+
+    def release_slot() -> None:
+        nonlocal slot_account
+        if slot_account is not None:
+            multi_account_mgr.release_account(slot_account)
+            slot_account = None
+
     async def finalize_result(
         status: str,
         status_code: Optional[int] = None,
         error_detail: Optional[str] = None
     ) -> None:
         nonlocal monitor_recorded
+        release_slot()
         if monitor_recorded:
             return
         monitor_recorded = True
@@ -1839,7 +1907,9 @@ async def chat_impl(
         else:
             latency_ms = int(duration_s * 1000)
 
-        uptime_tracker.record_request("api_service", status == "success", latency_ms, status_code)
+        # 客户端主动断开不计入服务可用性
+        if status != "cancelled":
+            uptime_tracker.record_request("api_service", status == "success", latency_ms, status_code)
 
         entry = build_recent_conversation_entry(
             request_id=request_id,
@@ -1851,18 +1921,18 @@ async def chat_impl(
             error_detail=error_detail,
         )
 
-        async with stats_lock:
-            global_stats.setdefault("failure_timestamps", [])
-            global_stats.setdefault("rate_limit_timestamps", [])
-            global_stats.setdefault("recent_conversations", [])
-            if status != "success":
-                if status_code == 429:
-                    global_stats["rate_limit_timestamps"].append(time.time())
-                else:
-                    global_stats["failure_timestamps"].append(time.time())
-            global_stats["recent_conversations"].append(entry)
-            global_stats["recent_conversations"] = global_stats["recent_conversations"][-60:]
-            await save_stats(global_stats)
+        if status == "cancelled":
+            global_stats["metrics"].record(SERIES_CLIENT_CANCELLED)
+        elif status != "success":
+            if status_code == 429:
+                global_stats["metrics"].record(SERIES_RATE_LIMITS)
+            else:
+                global_stats["metrics"].record(SERIES_FAILURES)
+        recent_conversations = global_stats["recent_conversations"]
+        recent_conversations.append(entry)
+        if len(recent_conversations) > 60:
+            del recent_conversations[:-60]
+        stats_store.mark_dirty()
 
     def classify_error_status(status_code: Optional[int], error: Exception) -> str:
         if status_code == 504:
@@ -1880,13 +1950,9 @@ async def chat_impl(
         client_ip = request.client.host if request.client else "unknown"
 
     # 记录请求统计
-    async with stats_lock:
-        timestamp = time.time()
-        global_stats["total_requests"] += 1
-        global_stats["request_timestamps"].append(timestamp)
-        global_stats.setdefault("model_request_timestamps", {})
-        global_stats["model_request_timestamps"].setdefault(req.model, []).append(timestamp)
-        await save_stats(global_stats)
+    global_stats["total_requests"] += 1
+    global_stats["metrics"].record(SERIES_REQUESTS)
+    stats_store.mark_dirty()
 
     # 2. 模型校验
 
@@ -1899,21 +1965,28 @@ async def chat_impl(
             detail=f"Model '{req.model}' not found. Available models: {all_models}"
         )
 
+    # 模型校验通过后再按模型计数（避免任意模型名产生新的序列）
+    global_stats["metrics"].record(f"{MODEL_SERIES_PREFIX}{req.model}")
+
     # 保存模型信息到 request.state（用于 Uptime 追踪）
     request.state.model = req.model
 
     # 3. 生成会话指纹，获取Session锁（防止同一对话的并发请求冲突）
     conv_key = get_conversation_key([m.model_dump() for m in req.messages], client_ip)
-    session_lock = await multi_account_mgr.acquire_session_lock(conv_key)
 
     # 4. 在锁的保护下检查缓存和处理Session（保证同一对话的请求串行化）
-    async with session_lock:
+    async with multi_account_mgr.session_lock(conv_key):
         cached_session = multi_account_mgr.global_session_cache.get(conv_key)
 
         if cached_session:
             # 使用已绑定的账户
             account_id = cached_session["account_id"]
-            account_manager = await multi_account_mgr.get_account(account_id, request_id)
+            try:
+                account_manager = await multi_account_mgr.acquire_account(account_id, request_id, cooldown_wait_seconds=cooldown_wait)
+            except AccountBusyError as e:
+                await finalize_result("error", e.status_code, f"HTTP {e.status_code}: {e.detail}")
+                raise
+            hold_slot(account_manager)
             google_session = cached_session["session_id"]
             is_new_conversation = False
             logger.info(f"[CHAT] [{account_id}] [req_{request_id}] 继续会话: {google_session[-12:]}")
@@ -1924,8 +1997,13 @@ async def chat_impl(
 
             for attempt in range(max_account_tries):
                 try:
-                    account_manager = await multi_account_mgr.get_account(None, request_id)
-                    google_session = await create_google_session(account_manager, http_client, USER_AGENT, request_id)
+                    account_manager = await multi_account_mgr.acquire_account(
+                        None, request_id, cooldown_wait_seconds=cooldown_wait, quota_type=quota_type
+                    )
+                    hold_slot(account_manager)
+                    google_session = session_pool.take(account_manager)
+                    if google_session is None:
+                        google_session = await create_google_session(account_manager, http_client, USER_AGENT, request_id)
                     # 线程安全地绑定账户到此对话
                     await multi_account_mgr.set_session_cache(
                         conv_key,
@@ -1937,6 +2015,10 @@ async def chat_impl(
                     # 记录账号池状态（账户可用）
                     uptime_tracker.record_request("account_pool", True)
                     break
+                except AccountBusyError as e:
+                    # 并发准入失败：直接返回 429/503，不再尝试其他账户
+                    await finalize_result("error", e.status_code, f"HTTP {e.status_code}: {e.detail}")
+                    raise
                 except Exception as e:
                     last_error = e
                     error_type = type(e).__name__
@@ -2020,10 +2102,10 @@ async def chat_impl(
         while retry_count <= max_retries:
             try:
                 # 安全：使用.get()防止缓存被清理导致KeyError
-                cached = multi_account_mgr.global_session_cache.get(conv_key)
+                cached = multi_account_mgr.global_session_cache.get(conv_key, count=False)
                 if not cached:
                     logger.warning(f"[CHAT] [{account_manager.config.account_id}] [req_{request_id}] 缓存已清理，重建Session")
-                    new_sess = await create_google_session(account_manager, http_client, USER_AGENT, request_id)
+                    new_sess = session_pool.take(account_manager) or await create_google_session(account_manager, http_client, USER_AGENT, request_id)
                     await multi_account_mgr.set_session_cache(
                         conv_key,
                         account_manager.config.account_id,
@@ -2047,34 +2129,29 @@ async def chat_impl(
                     current_text = build_full_context_text(req.messages)
 
                 # C. 发起对话
-                async for chunk in stream_chat_generator(
+                async for event in stream_chat_generator(
                     current_session,
                     current_text,
                     current_file_ids,
                     req.model,
                     chat_id,
-                    created_time,
                     account_manager,
-                    req.stream,
                     request_id,
                     request
                 ):
-                    yield chunk
+                    yield event
 
-                # 请求成功，重置账户失败计数
-                account_manager.is_available = True
-                account_manager.error_count = 0
+                # 请求成功，重置账户失败计数（熔断器半开试探成功时关闭熔断，并结束该配额的连续限流）
+                account_manager.record_success(quota_type)
                 account_manager.conversation_count += 1  # 增加对话次数
 
                 # 记录账号池状态（请求成功）
                 uptime_tracker.record_request("account_pool", True)
 
                 # 保存对话次数到统计数据
-                async with stats_lock:
-                    if "account_conversations" not in global_stats:
-                        global_stats["account_conversations"] = {}
-                    global_stats["account_conversations"][account_manager.config.account_id] = account_manager.conversation_count
-                    await save_stats(global_stats)
+                global_stats["account_conversations"][account_manager.config.account_id] = account_manager.conversation_count
+                global_stats["metrics"].record(f"{ACCOUNT_SERIES_PREFIX}{account_manager.config.account_id}")
+                stats_store.mark_dirty()
 
                 await finalize_result("success", 200, None)
 
@@ -2096,10 +2173,6 @@ async def chat_impl(
                 # 记录账号池状态（请求失败）
                 uptime_tracker.record_request("account_pool", False, status_code=status_code)
 
-                # 判断请求类型以传递quota_type（使用字典映射）
-                quota_type = MODEL_TO_QUOTA_TYPE.get(req.model)
-                # 普通对话模型返回None（text配额是基础配额，所有请求都需要）
-
                 # 使用统一的错误处理入口
                 if is_http_exception:
                     account_manager.handle_http_error(status_code, str(e.detail) if hasattr(e, 'detail') else "", request_id, quota_type)
@@ -2113,42 +2186,45 @@ async def chat_impl(
                     logger.warning(f"[CHAT] [{account_manager.config.account_id}] [req_{request_id}] 正在重试 ({retry_count}/{max_retries})")
 
                     # 快速失败：检查是否还有可用账户（避免无效重试）
-                    available_count = sum(
-                        1 for acc in multi_account_mgr.accounts.values()
-                        if (acc.should_retry() and
-                            not acc.config.is_expired() and
-                            not acc.config.disabled and
-                            acc.config.account_id not in failed_accounts)
+                    available_count = multi_account_mgr.available_count(exclude=failed_accounts, quota_type=quota_type)
+
+                    # 启用冷却等待且有账户将在时限内恢复时不快速失败，交给 acquire_account 等待
+                    can_wait = cooldown_wait > 0 and multi_account_mgr.will_recover_within(
+                        cooldown_wait, exclude=failed_accounts, quota_type=quota_type
                     )
 
-                    if available_count == 0:
+                    if available_count == 0 and not can_wait:
                         logger.error(f"[CHAT] [req_{request_id}] 所有账户均不可用，快速失败")
                         await finalize_result("error", 503, "All accounts unavailable")
-                        if req.stream: yield f"data: {json.dumps({'error': {'message': 'All accounts unavailable'}})}\n\n"
+                        yield DELTA_ERROR, 'All accounts unavailable'
                         return
 
                     # 尝试切换到其他账户（客户端会传递完整上下文）
                     try:
-                        # 获取新账户，跳过已失败的账户
-                        max_account_tries = min(MAX_ACCOUNT_SWITCH_TRIES, available_count)  # 限制尝试次数
+                        # 获取新账户（排除已失败的账户）并占用并发槽位，切换次数受 MAX_ACCOUNT_SWITCH_TRIES 限制
                         new_account = None
-
-                        for _ in range(max_account_tries):
-                            candidate = await multi_account_mgr.get_account(None, request_id)
-                            if candidate.config.account_id not in failed_accounts:
-                                new_account = candidate
-                                break
+                        if len(failed_accounts) <= MAX_ACCOUNT_SWITCH_TRIES:
+                            try:
+                                new_account = await multi_account_mgr.acquire_account(
+                                    None, request_id, exclude=failed_accounts,
+                                    cooldown_wait_seconds=cooldown_wait, quota_type=quota_type
+                                )
+                            except AccountBusyError:
+                                raise
+                            except HTTPException:
+                                pass  # 没有未失败的可用账户
 
                         if not new_account:
                             logger.error(f"[CHAT] [req_{request_id}] 所有可用账户均已失败")
                             await finalize_result("error", 503, "All available accounts failed")
-                            if req.stream: yield f"data: {json.dumps({'error': {'message': 'All available accounts failed'}})}\n\n"
+                            yield DELTA_ERROR, 'All available accounts failed'
                             return
 
                         logger.info(f"[CHAT] [req_{request_id}] 切换账户: {account_manager.config.account_id} -> {new_account.config.account_id}")
+                        hold_slot(new_account)
 
                         # 创建新 Session
-                        new_sess = await create_google_session(new_account, http_client, USER_AGENT, request_id)
+                        new_sess = session_pool.take(new_account) or await create_google_session(new_account, http_client, USER_AGENT, request_id)
 
                         # 更新缓存绑定到新账户
                         await multi_account_mgr.set_session_cache(
@@ -2175,35 +2251,63 @@ async def chat_impl(
                         status = classify_error_status(status_code, create_err)
 
                         await finalize_result(status, status_code, f"Account Failover Failed: {str(create_err)[:200]}")
-                        if req.stream: yield f"data: {json.dumps({'error': {'message': 'Account Failover Failed'}})}\n\n"
+                        yield DELTA_ERROR, 'Account Failover Failed'
                         return
                 else:
                     # 已达到最大重试次数
                     logger.error(f"[CHAT] [req_{request_id}] 已达到最大重试次数 ({max_retries})，请求失败")
                     status = classify_error_status(status_code, e)
                     await finalize_result(status, status_code, error_detail)
-                    if req.stream: yield f"data: {json.dumps({'error': {'message': f'Max retries ({max_retries}) exceeded: {e}'}})}\n\n"
+                    yield DELTA_ERROR, f'Max retries ({max_retries}) exceeded: {e}'
                     return
 
+    async def record_client_cancelled() -> None:
+        logger.warning(f"[CHAT] [{account_manager.config.account_id}] [req_{request_id}] 客户端已断开，已中止上游请求")
+        await finalize_result("cancelled", 499, "Client disconnected")
+
     if req.stream:
-        return StreamingResponse(response_wrapper(), media_type="text/event-stream")
-    
-    full_content = ""
-    full_reasoning = ""
-    async for chunk_str in response_wrapper():
-        if chunk_str.startswith("data: [DONE]"): break
-        if chunk_str.startswith("data: "):
+        encoder = SSEChunkEncoder(chat_id, created_time, req.model)
+        stream_started = False
+
+        async def sse_stream():
+            # 客户端断开时由 ASGI 服务取消响应任务（或在 yield 处关闭生成器），
+            # 异常沿生成器链传播，上游流与媒体下载随之关闭
+            nonlocal stream_started
+            stream_started = True
             try:
-                data = json.loads(chunk_str[6:])
-                delta = data["choices"][0]["delta"]
-                if "content" in delta:
-                    full_content += delta["content"]
-                if "reasoning_content" in delta:
-                    full_reasoning += delta["reasoning_content"]
-            except json.JSONDecodeError as e:
-                logger.error(f"[CHAT] [{account_manager.config.account_id}] [req_{request_id}] JSON解析失败: {str(e)}")
-            except (KeyError, IndexError) as e:
-                logger.error(f"[CHAT] [{account_manager.config.account_id}] [req_{request_id}] 响应格式错误 ({type(e).__name__}): {str(e)}")
+                async for kind, text in response_wrapper():
+                    yield encoder.encode(kind, text)
+            except (asyncio.CancelledError, GeneratorExit):
+                await record_client_cancelled()
+                raise
+            finally:
+                release_slot()
+
+        async def on_response_closed() -> None:
+            # 客户端在响应开始前断开时生成器不会启动：在此释放槽位并记录取消
+            release_slot()
+            if not stream_started:
+                await record_client_cancelled()
+
+        return GuardedStreamingResponse(sse_stream(), on_close=on_response_closed, media_type="text/event-stream")
+
+    # 非流式：直接消费结构化增量事件，最后一次性拼接；期间监听客户端断开
+    content_parts = []
+    reasoning_parts = []
+    try:
+        async with DisconnectWatcher(request) as watcher:
+            async for kind, text in response_wrapper():
+                if kind == DELTA_CONTENT or kind == DELTA_MEDIA:
+                    content_parts.append(text)
+                elif kind == DELTA_REASONING:
+                    reasoning_parts.append(text)
+    finally:
+        release_slot()
+    if watcher.interrupted:
+        await record_client_cancelled()
+        return Response(status_code=499)
+    full_content = "".join(content_parts)
+    full_reasoning = "".join(reasoning_parts)
 
     # 构建响应消息
     message = {"role": "assistant", "content": full_content}
@@ -2272,9 +2376,13 @@ def parse_images_from_response(data_list: list) -> tuple[list, str]:
     return file_ids, session_name
 
 
-async def stream_chat_generator(session: str, text_content: str, file_ids: List[str], model_name: str, chat_id: str, created_time: int, account_manager: AccountManager, is_stream: bool = True, request_id: str = "", request: Request = None):
+async def stream_chat_generator(session: str, text_content: str, file_ids: List[str], model_name: str, chat_id: str, account_manager: AccountManager, request_id: str = "", request: Request = None):
+    """调用 widgetStreamAssist 并产出结构化增量事件 (kind, text)
+
+    kind 取值见 util.sse 中的 DELTA_*；SSE 格式化由调用方按需完成。
+    """
     start_time = time.time()
-    full_content = ""
+    content_parts = []
     first_response_time = None
 
     # 记录发送给API的内容
@@ -2311,15 +2419,13 @@ async def stream_chat_generator(session: str, text_content: str, file_ids: List[
             "modelId": target_model_id
         }
 
-    if is_stream:
-        chunk = create_chunk(chat_id, created_time, model_name, {"role": "assistant"}, None)
-        yield f"data: {chunk}\n\n"
+    yield DELTA_ROLE, "assistant"
 
     # 使用流式请求
     json_objects = []  # 收集所有响应对象用于图片解析
     file_ids_info = None  # 保存图片信息
 
-    async with http_client.stream(
+    async with http_client_chat.stream(
         "POST",
         "https://biz-discoveryengine.googleapis.com/v1alpha/locations/global/widgetStreamAssist",
         headers=headers,
@@ -2328,11 +2434,13 @@ async def stream_chat_generator(session: str, text_content: str, file_ids: List[
         if r.status_code != 200:
             error_text = await r.aread()
             uptime_tracker.record_request(model_name, False, status_code=r.status_code)
+            if r.status_code == 401:
+                account_manager.invalidate_jwt()  # 重试时重新获取签名密钥
             raise HTTPException(status_code=r.status_code, detail=f"Upstream Error {error_text.decode()}")
 
         # 使用异步解析器处理 JSON 数组流
         try:
-            async for json_obj in parse_json_array_stream_async(r.aiter_lines()):
+            async for json_obj in parse_json_array_bytes_async(r.aiter_bytes()):
                 json_objects.append(json_obj)  # 收集响应
 
                 # 提取文本内容
@@ -2346,15 +2454,19 @@ async def stream_chat_generator(session: str, text_content: str, file_ids: List[
                     # 区分思考过程和正常内容
                     if content_obj.get("thought"):
                         # 思考过程使用 reasoning_content 字段（类似 OpenAI o1）
-                        chunk = create_chunk(chat_id, created_time, model_name, {"reasoning_content": text}, None)
-                        yield f"data: {chunk}\n\n"
+                        yield DELTA_REASONING, text
                     else:
                         if first_response_time is None:
                             first_response_time = time.time()
+                            # 首字延迟用于调度器的EWMA统计与请求级延迟记录
+                            multi_account_mgr.scheduler.record_ttft(
+                                account_manager.config.account_id, first_response_time - start_time
+                            )
+                            if request is not None and request.state.first_response_time is None:
+                                request.state.first_response_time = first_response_time
                         # 正常内容使用 content 字段
-                        full_content += text
-                        chunk = create_chunk(chat_id, created_time, model_name, {"content": text}, None)
-                        yield f"data: {chunk}\n\n"
+                        content_parts.append(text)
+                        yield DELTA_CONTENT, text
 
             # 提取图片信息（在 async with 块内）
             if json_objects:
@@ -2400,20 +2512,17 @@ async def stream_chat_generator(session: str, text_content: str, file_ids: List[
                     logger.error(f"[IMAGE] [{account_manager.config.account_id}] [req_{request_id}] 图片{idx}下载失败: {type(result).__name__}: {str(result)[:100]}")
                     # 降级处理：返回错误提示而不是静默失败
                     error_msg = f"\n\n⚠️ 图片 {idx} 下载失败\n\n"
-                    chunk = create_chunk(chat_id, created_time, model_name, {"content": error_msg}, None)
-                    yield f"data: {chunk}\n\n"
+                    yield DELTA_MEDIA, error_msg
                     continue
 
                 try:
                     markdown = process_media(result, mime, chat_id, fid, base_url, idx, request_id, account_manager.config.account_id)
                     success_count += 1
-                    chunk = create_chunk(chat_id, created_time, model_name, {"content": markdown}, None)
-                    yield f"data: {chunk}\n\n"
+                    yield DELTA_MEDIA, markdown
                 except Exception as save_error:
                     logger.error(f"[MEDIA] [{account_manager.config.account_id}] [req_{request_id}] 媒体{idx}处理失败: {str(save_error)[:100]}")
                     error_msg = f"\n\n⚠️ 媒体 {idx} 处理失败\n\n"
-                    chunk = create_chunk(chat_id, created_time, model_name, {"content": error_msg}, None)
-                    yield f"data: {chunk}\n\n"
+                    yield DELTA_MEDIA, error_msg
 
             logger.info(f"[IMAGE] [{account_manager.config.account_id}] [req_{request_id}] 图片处理完成: {success_count}/{len(file_ids)} 成功")
 
@@ -2421,9 +2530,9 @@ async def stream_chat_generator(session: str, text_content: str, file_ids: List[
             logger.error(f"[IMAGE] [{account_manager.config.account_id}] [req_{request_id}] 图片处理失败: {type(e).__name__}: {str(e)[:100]}")
             # 降级处理：通知用户图片处理失败
             error_msg = f"\n\n⚠️ 图片处理失败: {type(e).__name__}\n\n"
-            chunk = create_chunk(chat_id, created_time, model_name, {"content": error_msg}, None)
-            yield f"data: {chunk}\n\n"
+            yield DELTA_MEDIA, error_msg
 
+    full_content = "".join(content_parts)
     if full_content:
         response_preview = full_content[:500] + "...(已截断)" if len(full_content) > 500 else full_content
         logger.info(f"[CHAT] [{account_manager.config.account_id}] [req_{request_id}] AI响应: {response_preview}")
@@ -2437,10 +2546,7 @@ async def stream_chat_generator(session: str, text_content: str, file_ids: List[
     total_time = time.time() - start_time
     logger.info(f"[API] [{account_manager.config.account_id}] [req_{request_id}] 响应完成: {total_time:.2f}秒")
     
-    if is_stream:
-        final_chunk = create_chunk(chat_id, created_time, model_name, {}, "stop")
-        yield f"data: {final_chunk}\n\n"
-        yield "data: [DONE]\n\n"
+    yield DELTA_FINISH, "stop"
 
 # ---------- 公开端点（无需认证） ----------
 @app.get("/public/uptime")
@@ -2454,39 +2560,27 @@ async def get_public_uptime(days: int = 90):
 @app.get("/public/stats")
 async def get_public_stats():
     """获取公开统计信息"""
-    async with stats_lock:
-        # 清理1小时前的请求时间戳
-        current_time = time.time()
-        recent_requests = [
-            ts for ts in global_stats["request_timestamps"]
-            if current_time - ts < 3600
-        ]
-
-        # 计算每分钟请求数
-        recent_minute = [
-            ts for ts in recent_requests
-            if current_time - ts < 60
-        ]
-        requests_per_minute = len(recent_minute)
-
-        # 计算负载状态
-        if requests_per_minute < 10:
-            load_status = "low"
-            load_color = "#10b981"  # 绿色
-        elif requests_per_minute < 30:
-            load_status = "medium"
-            load_color = "#f59e0b"  # 黄色
-        else:
-            load_status = "high"
-            load_color = "#ef4444"  # 红色
+    # 计算每分钟请求数（基于分钟桶的滑动窗口）
+    requests_per_minute = global_stats["metrics"].recent(SERIES_REQUESTS, 60)
+
+    # 计算负载状态
+    if requests_per_minute < 10:
+        load_status = "low"
+        load_color = "#10b981"  # 绿色
+    elif requests_per_minute < 30:
+        load_status = "medium"
+        load_color = "#f59e0b"  # 黄色
+    else:
+        load_status = "high"
+        load_color = "#ef4444"  # 红色
 
-        return {
-            "total_visitors": global_stats["total_visitors"],
-            "total_requests": global_stats["total_requests"],
-            "requests_per_minute": requests_per_minute,
-            "load_status": load_status,
-            "load_color": load_color
-        }
+    return {
+        "total_visitors": global_stats["total_visitors"],
+        "total_requests": global_stats["total_requests"],
+        "requests_per_minute": requests_per_minute,
+        "load_status": load_status,
+        "load_color": load_color
+    }
 
 @app.get("/public/display")
 async def get_public_display():
@@ -2503,24 +2597,21 @@ async def get_public_logs(request: Request, limit: int = 100):
         client_ip = request.client.host
         current_time = time.time()
 
-        async with stats_lock:
-            # 清理24小时前的IP记录
-            if "visitor_ips" not in global_stats:
-                global_stats["visitor_ips"] = {}
-            global_stats["visitor_ips"] = {
-                ip: timestamp for ip, timestamp in global_stats["visitor_ips"].items()
-                if current_time - timestamp <= 86400
-            }
-
-            # 记录新访问（24小时内同一IP只计数一次）
-            if client_ip not in global_stats["visitor_ips"]:
-                global_stats["visitor_ips"][client_ip] = current_time
-                global_stats["total_visitors"] = global_stats.get("total_visitors", 0) + 1
-
-            global_stats.setdefault("recent_conversations", [])
-            await save_stats(global_stats)
-
-            stored_logs = list(global_stats.get("recent_conversations", []))
+        # 清理24小时前的IP记录
+        visitor_ips = global_stats["visitor_ips"]
+        expired_ips = [ip for ip, timestamp in visitor_ips.items() if current_time - timestamp > 86400]
+        for ip in expired_ips:
+            del visitor_ips[ip]
+
+        # 记录新访问（24小时内同一IP只计数一次）
+        if client_ip not in visitor_ips:
+            visitor_ips[client_ip] = current_time
+            global_stats["total_visitors"] = global_stats.get("total_visitors", 0) + 1
+            stats_store.mark_dirty()
+        elif expired_ips:
+            stats_store.mark_dirty()
+
+        stored_logs = list(global_stats["recent_conversations"])
 
         sanitized_logs = get_sanitized_logs(limit=min(limit, 1000))
 
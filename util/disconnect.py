@@ -0,0 +1,75 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+
+class DisconnectWatcher:
+    """
+    在后台轮询 `request.is_disconnected()`，客户端断开后取消当前任务。
+
+    取消会在当前任务正在等待的位置抛出 CancelledError，从而关闭上游
+    流式连接（async with 退出）并取消 asyncio.gather 中尚未完成的下载。
+    由本监视器触发的取消在退出时被吸收，调用方通过 `interrupted` 判断处理是否被中断；
+    `disconnected` 仅表示检测到了断开（处理可能已在取消送达前完成，此时结果仍然有效）。
+
+    用法：
+        async with DisconnectWatcher(request) as watcher:
+            ...  # 耗时的上游处理
+        if watcher.interrupted:
+            ...  # 记录客户端取消
+    """
+
+    def __init__(self, request: Request, poll_interval: float = 0.5) -> None:
+        self._request = request
+        self._poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self.disconnected = False
+        self.interrupted = False
+
+    async def __aenter__(self) -> "DisconnectWatcher":
+        self._task = asyncio.current_task()
+        self._watcher = asyncio.create_task(self._watch())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self._watcher.cancel()
+        if self.disconnected and exc_type is asyncio.CancelledError:
+            self._task.uncancel()
+            self.interrupted = True
+            return True
+        if self.disconnected and exc_type is None:
+            # 取消未中断处理（已在内部被吸收）：恢复取消计数，结果照常返回
+            self._task.uncancel()
+        return False
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            if await self._request.is_disconnected():
+                self.disconnected = True
+                self._task.cancel()
+                return
+
+
+class GuardedStreamingResponse(StreamingResponse):
+    """
+    响应结束后总会执行 `on_close` 的 StreamingResponse。
+
+    客户端在响应头发送前断开时，ASGI 服务会直接取消响应任务，
+    body 生成器从未开始迭代，其 finally 也就永远不会执行；
+    依赖生成器 finally 释放的资源（如并发槽位）需通过 on_close 兜底。
+    on_close 须可重复调用（生成器正常结束时可能已自行清理）。
+    """
+
+    def __init__(self, content, on_close: Callable[[], Awaitable[None]], **kwargs) -> None:
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._on_close()
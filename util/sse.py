@@ -0,0 +1,90 @@
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Optional
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+# stream_chat_generator 产出的结构化增量事件类型：(kind, text)
+DELTA_ROLE = "role"
+DELTA_CONTENT = "content"
+DELTA_REASONING = "reasoning"
+DELTA_MEDIA = "media"  # 媒体 Markdown 或媒体处理提示，作为正文内容输出
+DELTA_FINISH = "finish"
+DELTA_ERROR = "error"
+
+
+class SSEChunkEncoder:
+    """
+    OpenAI 兼容的 chat.completion.chunk 预序列化编码器。
+
+    同一次响应中 id / created / model 均不变，因此在构造时把信封的
+    前缀与后缀序列化成字节并缓存，之后每个分片只需转义 delta 中的文本，
+    直接拼接出可发送的 SSE 字节。输出与
+    `json.dumps(chunk)` 逐字节一致（默认分隔符、ensure_ascii=True）。
+
+    用法：
+        encoder = SSEChunkEncoder(chat_id, created, model)
+        yield encoder.role("assistant")
+        yield encoder.content(text)
+        yield encoder.finish("stop")
+        yield SSE_DONE
+
+    也可以用 encode(kind, text) 直接编码 stream_chat_generator 的增量事件。
+    """
+
+    __slots__ = ("_prefix", "_suffix", "_field_prefixes")
+
+    def __init__(self, chat_id: str, created: int, model: str) -> None:
+        envelope = json.dumps({
+            "id": chat_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+        })
+        # 去掉结尾的 '}'，接上 choices 直到 delta 的值
+        self._prefix = b"data: " + envelope[:-1].encode() + b', "choices": [{"index": 0, "delta": '
+        self._suffix = b', "logprobs": null, "finish_reason": null}], "system_fingerprint": null}\n\n'
+        self._field_prefixes = {}
+
+    def _field(self, field: str, text: str) -> bytes:
+        field_prefix = self._field_prefixes.get(field)
+        if field_prefix is None:
+            field_prefix = self._field_prefixes[field] = self._prefix + b"{" + encode_basestring_ascii(field).encode() + b": "
+        return b"".join((field_prefix, encode_basestring_ascii(text).encode(), b"}", self._suffix))
+
+    def role(self, role: str) -> bytes:
+        return self._field("role", role)
+
+    def content(self, text: str) -> bytes:
+        return self._field("content", text)
+
+    def reasoning(self, text: str) -> bytes:
+        return self._field("reasoning_content", text)
+
+    def finish(self, finish_reason: Optional[str] = "stop") -> bytes:
+        reason = b"null" if finish_reason is None else encode_basestring_ascii(finish_reason).encode()
+        return (
+            self._prefix
+            + b'{}, "logprobs": null, "finish_reason": '
+            + reason
+            + b'}], "system_fingerprint": null}\n\n'
+        )
+
+    def encode(self, kind: str, text: Optional[str]) -> bytes:
+        """将一个结构化增量事件编码为 SSE 字节"""
+        if kind == DELTA_CONTENT or kind == DELTA_MEDIA:
+            return self.content(text)
+        if kind == DELTA_REASONING:
+            return self.reasoning(text)
+        if kind == DELTA_ROLE:
+            return self.role(text)
+        if kind == DELTA_FINISH:
+            return self.finish(text) + SSE_DONE
+        if kind == DELTA_ERROR:
+            return sse_error(text)
+        raise ValueError(f"未知的增量事件类型: {kind}")
+
+
+def sse_error(message: str) -> bytes:
+    """编码一个 SSE 错误事件"""
+    return b"data: " + json.dumps({"error": {"message": message}}).encode() + b"\n\n"
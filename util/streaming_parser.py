@@ -1,5 +1,6 @@
 import json
-from typing import Iterator, Dict, Any, Iterable, AsyncIterator
+import re
+from typing import Iterator, Dict, Any, Iterable, AsyncIterator, List
 from itertools import chain
 
 def parse_json_array_stream(line_iterator: Iterable[str]) -> Iterator[Dict[str, Any]]:
@@ -253,3 +254,146 @@ async def parse_json_array_stream_async(line_iterator: AsyncIterator[str]) -> As
     if brace_level != 0:
         print(f"警告: JSON流意外结束，括号层级为 {brace_level}，可能数据不完整。")
 
+
+
+# 结构字符：对象边界与字符串起止（转义只会出现在字符串内部，单独处理）
+_STRUCTURAL_RE = re.compile(rb'[{}"]')
+
+
+class JSONArrayStreamParser:
+    """
+    增量式 JSON 数组流解析器（按字节块工作）。
+
+    与逐字符版本不同，它直接在 bytearray 缓冲区上用正则/`bytes.find`
+    批量跳过非结构字符，只在对象闭合时对该对象的字节切片做一次
+    `json.loads`。UTF-8 多字节序列中不会出现 ASCII 结构字符，
+    因此无需先解码即可安全扫描，分块边界落在任何位置都不影响结果。
+
+    用法：
+        parser = JSONArrayStreamParser()
+        for chunk in chunks:
+            for obj in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._scan_pos = 0  # 下次扫描的起始位置
+        self._obj_start = -1  # 当前对象在缓冲区中的起始位置
+        self._depth = 0
+        self._in_string = False
+        self._in_array = False
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """追加一个字节块，返回本次解析出的所有完整顶层对象。"""
+        if not chunk:
+            return []
+        buffer = self._buffer
+        buffer += chunk
+
+        if not self._in_array:
+            start = buffer.find(b"[")
+            if start < 0:
+                return []
+            self._in_array = True
+            self._scan_pos = start + 1
+
+        results = []
+        pos = self._scan_pos
+        end = len(buffer)
+        while pos < end:
+            if self._in_string:
+                quote = buffer.find(b'"', pos)
+                if quote < 0:
+                    pos = end
+                    break
+                # 统计引号前连续反斜杠的数量，奇数表示该引号被转义
+                backslash = quote - 1
+                while backslash >= 0 and buffer[backslash] == 0x5C:  # '\\'
+                    backslash -= 1
+                pos = quote + 1
+                if (quote - 1 - backslash) % 2 == 0:
+                    self._in_string = False
+                continue
+
+            match = _STRUCTURAL_RE.search(buffer, pos)
+            if match is None:
+                pos = end
+                break
+            idx = match.start()
+            char = buffer[idx]
+            pos = idx + 1
+            if char == 0x22:  # '"'
+                if self._depth > 0:
+                    self._in_string = True
+            elif char == 0x7B:  # '{'
+                if self._depth == 0:
+                    self._obj_start = idx
+                self._depth += 1
+            elif self._depth > 0:  # '}'
+                self._depth -= 1
+                if self._depth == 0:
+                    obj_bytes = buffer[self._obj_start:pos]
+                    try:
+                        results.append(json.loads(obj_bytes.decode("utf-8"), strict=False))
+                    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                        raise ValueError(f"解析JSON对象失败: {e}\n内容: {obj_bytes[:500]!r}") from e
+                    # 丢弃已消费的前缀，缓冲区只保留未完成的数据
+                    del buffer[:pos]
+                    self._obj_start = -1
+                    pos = 0
+                    end = len(buffer)
+
+        if self._depth == 0:
+            # 对象之间的分隔符/空白无需保留
+            del buffer[:pos]
+            pos = 0
+        self._scan_pos = pos
+        return results
+
+    def close(self) -> None:
+        """结束解析，检查数据流是否完整。"""
+        if not self._in_array:
+            raise ValueError("数据流不是以一个JSON数组 ( '[' ) 开始。")
+        if self._depth != 0:
+            print(f"警告: JSON流意外结束，括号层级为 {self._depth}，可能数据不完整。")
+
+
+def parse_json_array_bytes(chunk_iterator: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """
+    解析一个以字节块形式到达的 JSON 数组流（同步版本）。
+
+    Args:
+        chunk_iterator: 一个产生字节块的迭代器，例如 `httpx.Response.iter_bytes()`
+
+    Yields:
+        一个从流中解析出的JSON对象的字典。
+
+    Raises:
+        ValueError: 如果流不是一个JSON数组，或者某个对象格式错误。
+    """
+    parser = JSONArrayStreamParser()
+    for chunk in chunk_iterator:
+        yield from parser.feed(chunk)
+    parser.close()
+
+
+async def parse_json_array_bytes_async(chunk_iterator: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    解析一个以字节块形式到达的 JSON 数组流（异步版本）。
+
+    Args:
+        chunk_iterator: 一个产生字节块的异步迭代器，例如 `httpx.Response.aiter_bytes()`
+
+    Yields:
+        一个从流中解析出的JSON对象的字典。
+
+    Raises:
+        ValueError: 如果流不是一个JSON数组，或者某个对象格式错误。
+    """
+    parser = JSONArrayStreamParser()
+    async for chunk in chunk_iterator:
+        for obj in parser.feed(chunk):
+            yield obj
+    parser.close()